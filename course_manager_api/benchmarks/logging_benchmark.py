@@ -0,0 +1,113 @@
+"""
+Measure the cost of course manager logging during a bulk download at different log levels.
+
+Every setting runs in a fresh interpreter with its COURSE_LOG_* environment and downloads
+the same set of files with download_file_async from a local HTTP server standing in for
+Canvas, so only the logging cost differs between settings. The log output is captured
+and its volume reported. Run from the course_manager_api directory:
+
+    python benchmarks/logging_benchmark.py --files 200 --file-size 2000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SETTINGS = {
+    "warning": {"COURSE_LOG_LEVEL": "WARNING"},
+    "info": {"COURSE_LOG_LEVEL": "INFO"},
+    "debug": {"COURSE_LOG_LEVEL": "DEBUG"},
+    "debug_unlimited": {"COURSE_LOG_LEVEL": "DEBUG", "COURSE_LOG_RATE_LIMIT": "0"},
+    "debug_text_unlimited": {"COURSE_LOG_LEVEL": "DEBUG", "COURSE_LOG_RATE_LIMIT": "0", "COURSE_LOG_FORMAT": "text"},
+}
+
+_PROBE = """
+import asyncio, json, os, statistics, sys, tempfile, time
+from aiohttp import web
+
+args = json.loads({args!r})
+payload = os.urandom(args["file_size"])
+
+async def serve(request):
+    return web.Response(body=payload, content_type="application/pdf")
+
+async def main():
+    from canvas_downloader import download_file_async
+    from course_logging import flush_logging
+    app = web.Application()
+    app.router.add_route("*", "/files/{{file_id}}", serve)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    semaphore = asyncio.Semaphore(args["concurrency"])
+    latencies = []
+    with tempfile.TemporaryDirectory() as target:
+        async def download(index):
+            async with semaphore:
+                start_time = time.perf_counter()
+                await download_file_async(f"http://127.0.0.1:{{port}}/files/{{index}}", "1234~" + "x" * 64,
+                                          os.path.join(target, f"file_{{index}}.pdf"))
+                latencies.append(time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+        await asyncio.gather(*(download(index) for index in range(args["files"])))
+        elapsed = time.perf_counter() - start_time
+    flush_logging()
+    await runner.cleanup()
+    latencies.sort()
+    sys.stderr.write("LOGGING_BENCHMARK " + json.dumps({{
+        "total_s": elapsed,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }}) + "\\n")
+
+asyncio.run(main())
+"""
+
+
+def _run(name: str, env_overrides: dict, args) -> dict:
+    env = {key: value for key, value in os.environ.items() if not key.startswith("COURSE_LOG_")}
+    env.update(env_overrides)
+    probe_args = {
+        "files": args.files,
+        "file_size": args.file_size,
+        "concurrency": args.concurrency,
+    }
+    # Logs go to stdout and results to stderr, so the log volume can be measured
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(args=json.dumps(probe_args))],
+        capture_output=True, check=True, cwd=os.getcwd(), env=env,
+    )
+    for line in completed.stderr.decode().splitlines():
+        if line.startswith("LOGGING_BENCHMARK "):
+            result = json.loads(line[len("LOGGING_BENCHMARK "):])
+            return {
+                "setting": name,
+                **result,
+                "log_lines": completed.stdout.count(b"\n"),
+                "log_bytes": len(completed.stdout),
+                "token_leaked": b"1234~xxxx" in completed.stdout,
+            }
+    raise RuntimeError(f"Benchmark probe produced no result:\n{completed.stderr.decode()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=2_000_000, help="Size of each downloaded file in bytes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--settings", nargs="*", default=list(SETTINGS), choices=list(SETTINGS))
+    args = parser.parse_args()
+
+    results = [_run(name, SETTINGS[name], args) for name in args.settings]
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, float):
+                result[key] = round(value, 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
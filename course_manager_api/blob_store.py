@@ -0,0 +1,299 @@
+"""
+Content-addressed store of Canvas file bodies shared by all users.
+
+Every student of a course used to fetch the same course files from Canvas again. Bodies are
+now stored once under their sha256 and looked up by Canvas file id plus `updated_at`, so a
+new version of a file is a new key and identical files share one object. The store doesn't
+grant access by itself: callers fetch the file's metadata with the requesting user's token
+first and only consult the store when Canvas allows it. Objects are verified against their
+sha256 before they are served, the total size is capped by CANVAS_BLOB_MAX_BYTES and the
+least recently used objects are evicted first. Bodies are handed out as open files, which stay
+readable when the object is evicted while it is being sent.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+
+from course_logging import get_logger
+
+logger = get_logger("blob_store")
+
+COURSE_DATA_DIR = "course_data"
+# Directory of the shared file bodies and their index
+CANVAS_BLOB_DIR = os.getenv("CANVAS_BLOB_DIR", os.path.join(COURSE_DATA_DIR, ".blobs"))
+# Maximum total size in bytes of the stored bodies, 0 disables the store
+CANVAS_BLOB_MAX_BYTES = int(os.getenv("CANVAS_BLOB_MAX_BYTES", 5 * 1024 * 1024 * 1024))
+# Verify the sha256 of an object before serving it
+CANVAS_BLOB_VERIFY = os.getenv("CANVAS_BLOB_VERIFY", "True").lower() in ("true", "1", "yes")
+
+BLOB_REQUESTS = Counter(
+    "course_data_manager_blob_store_requests_total",
+    "Lookups in the shared Canvas file store by result",
+    ["result"]
+)
+
+BLOB_BYTES = Gauge(
+    "course_data_manager_blob_store_bytes",
+    "Total size of the bodies in the shared Canvas file store"
+)
+
+_READ_BYTES = 1024 * 1024
+
+
+def blob_key(file_id, file_info):
+    """Store key of a Canvas file version"""
+    return f"{file_id}@{file_info.get('updated_at') or ''}"
+
+
+def _sha256_of(path):
+    with open(path, "rb") as f:
+        return _sha256_of_file(f)
+
+
+def _sha256_of_file(f):
+    """sha256 of an open file from its start, the file is left at its start"""
+    digest = hashlib.sha256()
+    f.seek(0)
+    while True:
+        chunk = f.read(_READ_BYTES)
+        if not chunk:
+            f.seek(0)
+            return digest.hexdigest()
+        digest.update(chunk)
+
+
+class Blob:
+    """
+    A stored body: its path, sha256, size in bytes and content type. Blobs returned by get and
+    put_file hold the body open in file, read it from there and close it when done; the path
+    may be gone once the object was evicted.
+    """
+
+    def __init__(self, path, sha256, size, content_type, file=None):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+        self.file = file
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class BlobWriter:
+    """Hashes and writes a body to a temporary file, added to the store by commit"""
+
+    def __init__(self, store, key, content_type):
+        self.store = store
+        self.key = key
+        self.content_type = content_type
+        self.size = 0
+        self._digest = hashlib.sha256()
+        handle, self._temp_path = tempfile.mkstemp(dir=store.temp_dir)
+        self._file = os.fdopen(handle, "wb")
+        self._done = False
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self._digest.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self, expected_size=None):
+        """Add the written body to the store, returns the Blob or None when it doesn't have the expected size"""
+        self._file.close()
+        self._done = True
+        if expected_size and self.size != int(expected_size):
+            logger.warning("Not storing %s, wrote %s bytes but Canvas reports %s", self.key, self.size, expected_size)
+            os.remove(self._temp_path)
+            return None
+        return self.store._add(self.key, self._temp_path, self._digest.hexdigest(), self.size, self.content_type)
+
+    def abort(self):
+        """Discard the written body, does nothing after commit"""
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        os.remove(self._temp_path)
+
+
+class BlobStore:
+    """Bodies by sha256 with an index of keys, LRU evicted above max_bytes"""
+
+    def __init__(self, root=CANVAS_BLOB_DIR, max_bytes=CANVAS_BLOB_MAX_BYTES, verify=CANVAS_BLOB_VERIFY):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.index_path = os.path.join(root, "index.json")
+        self.temp_dir = os.path.join(root, "tmp")
+        self._keys = {}
+        self._objects = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(self.temp_dir, exist_ok=True)
+            self._load()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _object_path(self, sha256):
+        return os.path.join(self.root, "objects", sha256[:2], sha256)
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            keys, objects = index["keys"], index["objects"]
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable blob index %s: %s", self.index_path, e)
+            return
+        # Objects removed from disk behind our back are forgotten
+        self._objects = {sha256: entry for sha256, entry in objects.items() if os.path.exists(self._object_path(sha256))}
+        self._keys = {key: sha256 for key, sha256 in keys.items() if sha256 in self._objects}
+        self._bytes = sum(entry["size"] for entry in self._objects.values())
+        BLOB_BYTES.set(self._bytes)
+
+    def _save(self):
+        # Written to a temporary file first so a crash never leaves a truncated index
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"keys": self._keys, "objects": self._objects}, f)
+        os.replace(temp_path, self.index_path)
+
+    def _remove_object(self, sha256):
+        entry = self._objects.pop(sha256)
+        self._bytes -= entry["size"]
+        self._keys = {key: value for key, value in self._keys.items() if value != sha256}
+        try:
+            os.remove(self._object_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def _add(self, key, temp_path, sha256, size, content_type, open_file=False):
+        path = self._object_path(sha256)
+        with self._lock:
+            if size > self.max_bytes:
+                os.remove(temp_path)
+                return None
+            if sha256 in self._objects:
+                # Same content under another key or stored by a concurrent download
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+                self._objects[sha256] = {"size": size, "content_type": content_type}
+                self._bytes += size
+            self._objects[sha256]["last_access"] = time.time()
+            self._keys[key] = sha256
+            # Least recently used objects go first
+            while self._bytes > self.max_bytes:
+                oldest = min(self._objects, key=lambda digest: self._objects[digest].get("last_access", 0))
+                logger.debug("Evicting %s", oldest, bytes=self._objects[oldest]["size"])
+                self._remove_object(oldest)
+            self._save()
+            BLOB_BYTES.set(self._bytes)
+            # Opened before the lock is released, a concurrent _add could evict it right after
+            return Blob(path, sha256, size, content_type, open(path, "rb") if open_file else None)
+
+    def writer(self, key, content_type, expected_size=None):
+        """BlobWriter for a body, None when the store is disabled or the body can't fit"""
+        if not self.enabled or (expected_size and int(expected_size) > self.max_bytes):
+            return None
+        return BlobWriter(self, key, content_type)
+
+    async def put_file(self, key, path, content_type, expected_size=None):
+        """Move a downloaded file into the store, returns the opened Blob or None when it wasn't stored"""
+        if not self.enabled:
+            return None
+        size = os.path.getsize(path)
+        if (expected_size and size != int(expected_size)) or size > self.max_bytes:
+            return None
+        sha256 = await asyncio.to_thread(_sha256_of, path)
+        return self._add(key, path, sha256, size, content_type, open_file=True)
+
+    def put_bytes(self, key, content, content_type, expected_size=None):
+        """Store a body held in memory, returns the Blob or None when it wasn't stored"""
+        writer = self.writer(key, content_type, len(content))
+        if writer is None:
+            return None
+        writer.write(content)
+        return writer.commit(expected_size)
+
+    async def get(self, key):
+        """
+        Stored body of a file version.
+
+        Callers check with the requesting user's token that Canvas grants access to the file
+        before looking it up.
+
+        Returns:
+            The opened Blob, or None on a miss or when the stored object failed verification
+        """
+        if not self.enabled:
+            return None
+        path = f = None
+        with self._lock:
+            sha256 = self._keys.get(key)
+            entry = self._objects.get(sha256) if sha256 else None
+            if entry is not None:
+                entry["last_access"] = time.time()
+                path = self._object_path(sha256)
+                # Opened under the lock, an eviction afterwards only unlinks the path
+                try:
+                    f = open(path, "rb")
+                except FileNotFoundError:
+                    pass
+        if entry is None:
+            self._record("miss")
+            return None
+        try:
+            valid = f is not None and (not self.verify or await asyncio.to_thread(_sha256_of_file, f) == sha256)
+        except BaseException:
+            f.close()
+            raise
+        if not valid:
+            if f is not None:
+                f.close()
+            logger.warning("Discarding corrupt object %s of %s", sha256, key)
+            with self._lock:
+                if sha256 in self._objects:
+                    self._remove_object(sha256)
+                    self._save()
+                BLOB_BYTES.set(self._bytes)
+            self._record("corrupt")
+            return None
+        self._record("hit")
+        return Blob(path, sha256, entry["size"], entry["content_type"], f)
+
+    def _record(self, result):
+        BLOB_REQUESTS.labels(result=result).inc()
+        with self._lock:
+            if result == "hit":
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "objects": len(self._objects),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -1,11 +1,23 @@
 import os
 import json
+import time
+import asyncio
+import datetime
+import hashlib
+import re
+import tempfile
 import aiohttp
 import ssl
 import certifi
+from contextlib import asynccontextmanager
 from fastapi import HTTPException
-from fastapi.responses import Response
-import traceback
+from fastapi.responses import Response, FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from course_logging import get_logger
+from range_download import download_ranges, is_large_file
+from blob_store import BlobStore, blob_key
+from download_strategy import DownloadStrategyCache, strategy_key, DOWNLOAD_HEDGE, DOWNLOAD_HEDGE_DELAY
 
 """
 Canvas Downloader Module
@@ -14,18 +26,70 @@ This module provides functions for downloading different types of content from C
 It's designed to be used with the Course Data Manager API.
 """
 
-async def download_file_async(url, token, temp_file_path):
-    """Download a file from Canvas asynchronously"""
-    print(f"[DOWNLOAD_FILE] Starting download from URL: {url}")
-    print(f"[DOWNLOAD_FILE] Target path: {temp_file_path}")
-    print(f"[DOWNLOAD_FILE] Token length: {len(token)}")
+logger = get_logger("canvas_downloader")
+download_file_logger = get_logger("download_file")
+download_file_content_logger = get_logger("download_file_content")
+get_course_item_logger = get_logger("get_course_item")
+
+# Size of the reads from streamed Canvas downloads, bounds the memory held per streamed file
+CANVAS_STREAM_CHUNK_BYTES = int(os.getenv("CANVAS_STREAM_CHUNK_BYTES", 256 * 1024))
+# Large files are downloaded here in parts, unfinished downloads are resumed from it
+CANVAS_DOWNLOAD_DIR = os.getenv("CANVAS_DOWNLOAD_DIR", os.path.join("course_data", ".downloads"))
+# Serializes downloads of the same file version into the same partial file: [lock, holders and waiters]
+_PART_LOCKS = {}
+_FILE_ID_PATTERN = re.compile(r"/files/(\d+)")
+
+@asynccontextmanager
+async def _part_lock(part_path):
+    """Hold the lock of a partial file, the entry is dropped once nobody holds or waits for it"""
+    entry = _PART_LOCKS.setdefault(part_path, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _PART_LOCKS[part_path]
+
+def _part_path(file_id, version):
+    """Stable path of the partial download of a file version, so a later request resumes it"""
+    return os.path.join(CANVAS_DOWNLOAD_DIR, f"{file_id}-{hashlib.sha1(version.encode()).hexdigest()[:12]}.part")
+
+async def _canvas_file_info(session, url, headers, ssl_context):
+    """Canvas metadata (size, updated_at) of the file a download URL points to, None if unknown"""
+    match = _FILE_ID_PATTERN.search(url)
+    if not match:
+        return None
+    api_url = f"https://clemson.instructure.com/api/v1/files/{match.group(1)}"
+    try:
+        async with session.get(api_url, headers=headers, ssl=ssl_context) as response:
+            if response.status != 200:
+                return None
+            return await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        download_file_logger.warning("Failed to get file metadata of %s: %s", url, e)
+        return None
+
+async def download_file_async(url, token, temp_file_path, expected_size=None):
+    """
+    Download a file from Canvas asynchronously
+
+    Files of at least CANVAS_LARGE_FILE_BYTES, by expected_size (the Canvas file `size`) or
+    the Content-Length, are downloaded in parallel parts and verified against that size.
+    Without expected_size the size and version are looked up in the Canvas metadata of a
+    /files/<id> URL, whose partial download is then kept in CANVAS_DOWNLOAD_DIR for resuming.
+    """
+    download_file_logger.info("Starting download from URL: %s", url)
+    download_file_logger.debug("Target path: %s", temp_file_path)
+    download_file_logger.debug("Token length: %s", len(token))
     
     ssl_context = ssl.create_default_context(cafile=certifi.where())
     
     headers = {
         "Authorization": f"Bearer {token}"
     }
-    print(f"[DOWNLOAD_FILE] Headers: {headers}")
+    download_file_logger.debug("Headers: %s", headers)
     
     try:
         total_size = 0
@@ -33,43 +97,63 @@ async def download_file_async(url, token, temp_file_path):
         
         async with aiohttp.ClientSession() as session:
             # Log request start time
-            import time
             start_time = time.time()
-            print(f"[DOWNLOAD_FILE] Starting request at {start_time}")
+            download_file_logger.debug("Starting request at %s", start_time)
             
             # First try to make a HEAD request to get content-length and other metadata
+            content_length = None
             try:
                 async with session.head(url, headers=headers, ssl=ssl_context) as head_response:
-                    print(f"[DOWNLOAD_FILE] HEAD response status: {head_response.status}")
-                    print(f"[DOWNLOAD_FILE] HEAD response headers: {head_response.headers}")
+                    download_file_logger.debug("HEAD response status: %s", head_response.status)
+                    download_file_logger.debug("HEAD response headers: %s", head_response.headers)
                     content_length = head_response.headers.get('Content-Length')
                     if content_length:
-                        print(f"[DOWNLOAD_FILE] Content length: {content_length} bytes")
+                        download_file_logger.debug("Content length: %s bytes", content_length)
                     content_type = head_response.headers.get('Content-Type')
                     if content_type:
-                        print(f"[DOWNLOAD_FILE] Content type: {content_type}")
+                        download_file_logger.debug("Content type: %s", content_type)
             except Exception as head_error:
-                print(f"[DOWNLOAD_FILE] HEAD request failed (non-fatal): {str(head_error)}")
+                download_file_logger.warning("HEAD request failed (non-fatal): %s", head_error)
+            
+            file_info = None
+            if expected_size is None:
+                file_info = await _canvas_file_info(session, url, headers, ssl_context)
+                expected_size = (file_info or {}).get("size")
+
+            # Large files are fetched in parts with Range requests and resumed on failures
+            if is_large_file(expected_size or content_length):
+                size = int(expected_size or content_length)
+                download_file_logger.debug("Downloading large file in parts")
+                if file_info and file_info.get("id"):
+                    version = str(file_info.get("updated_at") or "")
+                    part_path = _part_path(file_info["id"], version)
+                else:
+                    version, part_path = None, f"{temp_file_path}.part"
+                async with _part_lock(part_path):
+                    await download_ranges(session, url, headers, temp_file_path, size, version=version,
+                                          ssl_context=ssl_context, part_path=part_path)
+                download_file_logger.info("Download completed in %.2f seconds", time.time() - start_time, bytes=size)
+                return temp_file_path
             
             # Now make the actual GET request to download the file
-            print(f"[DOWNLOAD_FILE] Sending GET request to download file")
+            download_file_logger.debug("Sending GET request to download file")
             
             try:
                 async with session.get(url, headers=headers, ssl=ssl_context) as response:
-                    print(f"[DOWNLOAD_FILE] GET response status: {response.status}")
-                    print(f"[DOWNLOAD_FILE] GET response headers: {response.headers}")
+                    download_file_logger.debug("GET response status: %s", response.status)
+                    download_file_logger.debug("GET response headers: %s", response.headers)
                     
                     # Check if the response is successful
                     if response.status != 200:
                         response_text = await response.text()
-                        print(f"[DOWNLOAD_FILE] ERROR: Failed to download file. Status: {response.status}, Response: {response_text}")
+                        download_file_logger.error("Failed to download file. Status: %s, Response: %s", response.status, response_text)
                         raise Exception(f"Failed to download file: {response_text}")
                     
                     # Create directory if it doesn't exist
                     os.makedirs(os.path.dirname(temp_file_path), exist_ok=True)
                     
                     # Download the file in chunks
-                    print(f"[DOWNLOAD_FILE] Writing file to: {temp_file_path}")
+                    download_file_logger.debug("Writing file to: %s", temp_file_path)
                     with open(temp_file_path, "wb") as f:
                         chunk_count = 0
                         while True:
@@ -83,37 +167,33 @@ async def download_file_async(url, token, temp_file_path):
                             
                             # Log progress for every 10 chunks or large files
                             if chunk_count % 10 == 0 or chunk_size > 1000000:
-                                print(f"[DOWNLOAD_FILE] Downloaded {total_size} bytes so far ({chunk_count} chunks)")
+                                download_file_logger.debug("Downloaded %s bytes so far (%s chunks)", total_size, chunk_count)
                 
                 # Log successful download completion and file size
                 end_time = time.time()
                 duration = end_time - start_time
-                print(f"[DOWNLOAD_FILE] Download completed in {duration:.2f} seconds")
-                print(f"[DOWNLOAD_FILE] Total file size: {total_size} bytes")
+                download_file_logger.info("Download completed in %.2f seconds", duration, bytes=total_size)
+                download_file_logger.debug("Total file size: %s bytes", total_size)
                 
                 # Verify file exists and has content
                 if os.path.exists(temp_file_path):
                     file_size = os.path.getsize(temp_file_path)
-                    print(f"[DOWNLOAD_FILE] Verified file on disk: {temp_file_path}, size: {file_size} bytes")
+                    download_file_logger.debug("Verified file on disk: %s, size: %s bytes", temp_file_path, file_size)
                     
                     if file_size == 0:
-                        print(f"[DOWNLOAD_FILE] WARNING: Downloaded file is empty (0 bytes)")
+                        download_file_logger.warning("Downloaded file is empty (0 bytes)")
                 else:
-                    print(f"[DOWNLOAD_FILE] ERROR: File does not exist after download: {temp_file_path}")
+                    download_file_logger.error("File does not exist after download: %s", temp_file_path)
                     raise Exception("File does not exist after download")
             
             except Exception as e:
-                print(f"[DOWNLOAD_FILE] ERROR during download: {str(e)}")
-                import traceback
-                print(f"[DOWNLOAD_FILE] Traceback: {traceback.format_exc()}")
+                download_file_logger.error("Error during download: %s", e, exc_info=True)
                 raise
         
         return temp_file_path
     
     except Exception as e:
-        print(f"[DOWNLOAD_FILE] FATAL ERROR: {str(e)}")
-        import traceback
-        print(f"[DOWNLOAD_FILE] Traceback: {traceback.format_exc()}")
+        download_file_logger.error("Fatal error: %s", e, exc_info=True)
         raise
 
 async def download_page_async(url, token, temp_file_path):
@@ -220,7 +300,7 @@ async def download_assignment(course_id: str, assignment_id: str, token: str, fi
         async with session.get(api_url, headers=headers) as response:
             if response.status != 200:
                 error_text = await response.text()
-                print(f"Assignment download error: {error_text}")
+                logger.warning("Assignment download error: %s", error_text)
                 raise HTTPException(status_code=response.status, detail=f"Failed to get assignment: {error_text}")
             
             data = await response.json()
@@ -268,7 +348,7 @@ async def download_quiz(course_id: str, quiz_id: str, token: str, filename: str
         async with session.get(api_url, headers=headers) as response:
             if response.status != 200:
                 error_text = await response.text()
-                print(f"Quiz download error: {error_text}")
+                logger.warning("Quiz download error: %s", error_text)
                 raise HTTPException(status_code=response.status, detail=f"Failed to get quiz: {error_text}")
             
             quiz_data = await response.json()
@@ -285,7 +365,7 @@ async def download_quiz(course_id: str, quiz_id: str, token: str, filename: str
                     async with session.get(submissions_url, headers=headers) as submissions_response:
                         if submissions_response.status == 200:
                             submissions = await submissions_response.json()
-                            print(f"Submissions response: {submissions}")
+                            logger.debug("Submissions response: %s", submissions)
                             
                             if submissions.get('quiz_submissions') and len(submissions['quiz_submissions']) > 0:
                                 # Sort submissions by attempt number (descending) to get the most recent one
@@ -296,20 +376,19 @@ async def download_quiz(course_id: str, quiz_id: str, token: str, filename: str
                                 )
                                 submission = sorted_submissions[0]
                                 submission_id = submission['id']
-                                print(f"Found submission ID: {submission_id}, attempt: {submission.get('attempt')}")
+                                logger.debug("Found submission ID: %s, attempt: %s", submission_id, submission.get('attempt'))
                                 
                                 # Use the submission ID to get questions with student answers
                                 submission_questions_url = f"https://clemson.instructure.com/api/v1/quiz_submissions/{submission_id}/questions"
                                 async with session.get(submission_questions_url, headers=headers) as questions_response:
                                     if questions_response.status == 200:
                                         questions_data = await questions_response.json()
-                                        print(f"Direct submission questions response: {questions_data is not None}")
+                                        logger.debug("Direct submission questions response: %s", questions_data is not None)
                                         if questions_data and 'quiz_submission_questions' in questions_data:
                                             quiz_questions = {'quiz_questions': questions_data['quiz_submission_questions']}
                 
                 except Exception as e:
-                    print(f"Error fetching quiz submission: {str(e)}")
-                    traceback.print_exc()
+                    logger.warning("Error fetching quiz submission: %s", e, exc_info=True)
                     # Continue without submission data if there's an error
             # Start building the HTML content for the quiz
             html_content = f"""
@@ -412,7 +491,7 @@ async def download_page_content(course_id: str, page_id: str, token: str, filena
         async with session.get(api_url, headers=headers) as response:
             if response.status != 200:
                 error_text = await response.text()
-                print(f"Page download error: {error_text}")
+                logger.warning("Page download error: %s", error_text)
                 raise HTTPException(status_code=response.status, detail=f"Failed to get page: {error_text}")
             
             data = await response.json()
@@ -454,7 +533,7 @@ async def download_discussion(course_id: str, discussion_id: str, token: str, fi
         async with session.get(api_url, headers=headers) as response:
             if response.status != 200:
                 error_text = await response.text()
-                print(f"Discussion download error: {error_text}")
+                logger.warning("Discussion download error: %s", error_text)
                 raise HTTPException(status_code=response.status, detail=f"Failed to get discussion: {error_text}")
             
             data = await response.json()
@@ -492,532 +571,504 @@ async def download_discussion(course_id: str, discussion_id: str, token: str, fi
                 headers={"Content-Disposition": f'attachment; filename="{filename}"'}
             )
 
+class _FileDownload:
+    """What the download methods need to know about one Canvas file"""
+
+    def __init__(self, course_id, file_id, token, file_info, ssl_context):
+        self.course_id = course_id
+        self.file_id = file_id
+        self.file_info = file_info
+        self.ssl_context = ssl_context
+        self.auth_headers = {"Authorization": f"Bearer {token}", "Accept": "*/*"}
+        # The Canvas session cookie variant used by the preview method
+        self.cookie_headers = {"Cookie": f"_csrf_token={token}; canvas_session={token}", "Accept": "*/*"}
+
+
+# Each method resolves the URL and headers the file body is requested with, or None when
+# it doesn't apply to the file. They are listed in their default order.
+
+async def _api_download_url(session, download):
+    # The most reliable way to download from Canvas, the API download endpoint
+    return f"https://clemson.instructure.com/api/v1/files/{download.file_id}/download", download.auth_headers
+
+async def _file_info_url(session, download):
+    # According to Canvas docs, file.url might be a pre-signed URL that doesn't need auth
+    url = download.file_info.get("url")
+    return (url, {}) if url else None
+
+async def _file_info_url_with_auth(session, download):
+    url = download.file_info.get("url")
+    return (url, download.auth_headers) if url else None
+
+async def _global_files_url(session, download):
+    return f"https://clemson.instructure.com/api/v1/files/{download.file_id}?include[]=avatar", download.auth_headers
+
+async def _verifier_url(session, download):
+    # The traditional download URL without API prefix
+    uuid = download.file_info.get("uuid", "")
+    url = f"https://clemson.instructure.com/courses/{download.course_id}/files/{download.file_id}/download?download_frd=1&verifier={uuid}"
+    return url, download.auth_headers
+
+async def _enhanced_preview_url(session, download):
+    api_url = f"https://clemson.instructure.com/api/v1/files/{download.file_id}?include[]=enhanced_preview_url"
+    async with session.get(api_url, headers=download.cookie_headers, ssl=download.ssl_context) as response:
+        if response.status != 200:
+            raise Exception(f"Preview URL lookup failed with status {response.status}")
+        api_data = await response.json()
+    preview_url = api_data.get("enhanced_preview_url") if isinstance(api_data, dict) else None
+    return (preview_url, download.cookie_headers) if preview_url else None
+
+async def _alternative_api_url(session, download):
+    alt_url = f"https://clemson.instructure.com/api/v1/files/{download.file_id}?include[]=user&include[]=usage_rights"
+    async with session.get(alt_url, headers=download.auth_headers, ssl=download.ssl_context) as response:
+        if response.status != 200:
+            raise Exception(f"Alternative API lookup failed with status {response.status}")
+        alt_data = await response.json()
+    # Look for any download URLs in the response
+    for key in ("url", "download_url", "preview_url"):
+        if isinstance(alt_data, dict) and alt_data.get(key):
+            return alt_data[key], {}
+    return None
+
+FILE_DOWNLOAD_METHODS = {
+    "api_download": _api_download_url,
+    "file_info_url": _file_info_url,
+    "file_info_url_auth": _file_info_url_with_auth,
+    "global_files": _global_files_url,
+    "verifier": _verifier_url,
+    "enhanced_preview": _enhanced_preview_url,
+    "alternative_api": _alternative_api_url,
+}
+
+# Learned order of FILE_DOWNLOAD_METHODS per course, file type and host
+DOWNLOAD_STRATEGIES = DownloadStrategyCache()
+# File bodies shared by all users, looked up after Canvas granted the user access to the file
+BLOB_STORE = BlobStore()
+
+async def _read_blob(blob):
+    # Read from the handle opened by the store, the object may be evicted meanwhile
+    try:
+        while True:
+            chunk = blob.file.read(CANVAS_STREAM_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        blob.close()
+
+def _blob_response(blob, media_type, filename):
+    return StreamingResponse(
+        _read_blob(blob),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Content-Length": str(blob.size)},
+        background=BackgroundTask(blob.close)
+    )
+
+async def _stored_while_streaming(chunks, writer, expected_size):
+    # The body is added to the shared store once it has been read completely
+    async for chunk in chunks:
+        if writer is not None:
+            writer.write(chunk)
+        yield chunk
+    if writer is not None:
+        writer.commit(expected_size)
+
+async def _fetch_large_file(session, download, url, headers):
+    """Download a large file to CANVAS_DOWNLOAD_DIR in parts, returns the path of the finished file"""
+    version = str(download.file_info.get("updated_at") or "")
+    # A stable path per file version, so a failed or interrupted download is resumed by the next request
+    part_path = _part_path(download.file_id, version)
+    os.makedirs(CANVAS_DOWNLOAD_DIR, exist_ok=True)
+    handle, target_path = tempfile.mkstemp(dir=CANVAS_DOWNLOAD_DIR)
+    os.close(handle)
+    try:
+        async with _part_lock(part_path):
+            await download_ranges(session, url, headers, target_path, download.file_info["size"],
+                                  version=version, ssl_context=download.ssl_context, part_path=part_path)
+    except BaseException:
+        os.remove(target_path)
+        raise
+    return target_path
+
+async def _fetch_file_body(session, download, url, headers):
+    """
+    Download a file with one method, raises when the response isn't the file.
+
+    Returns:
+        (content, content_type, file_path); large files are downloaded to file_path in parts
+        and their content is None, otherwise file_path is None
+    """
+    if is_large_file(download.file_info.get("size")):
+        file_path = await _fetch_large_file(session, download, url, headers)
+        return None, download.file_info.get("content-type", "application/octet-stream"), file_path
+    async with session.get(url, headers=headers, ssl=download.ssl_context, allow_redirects=True) as response:
+        if response.status != 200:
+            raise Exception(f"Failed with status {response.status}")
+        content_type = response.headers.get("Content-Type", download.file_info.get("content-type", "application/octet-stream"))
+        # Metadata endpoints answer with the file's JSON description instead of its content
+        if content_type.startswith("application/json") and "json" not in download.file_info.get("content-type", ""):
+            raise Exception("Received file metadata instead of the file content")
+        file_content = await response.read()
+    if not file_content:
+        raise Exception("Empty file content")
+    expected_size = download.file_info.get("size") or 0
+    if expected_size and len(file_content) != expected_size:
+        download_file_content_logger.warning("Downloaded size (%s) doesn't match expected size (%s)", len(file_content), expected_size)
+    return file_content, content_type, None
+
+async def _attempt_download(session, download, key, method):
+    """Try one method, records the outcome and returns the result of _fetch_file_body or None"""
+    start_time = time.perf_counter()
+    try:
+        resolved = await FILE_DOWNLOAD_METHODS[method](session, download)
+        if resolved is None:
+            return None
+        result = await _fetch_file_body(session, download, *resolved)
+    except asyncio.CancelledError:
+        DOWNLOAD_STRATEGIES.record(key, method, "cancelled", time.perf_counter() - start_time)
+        raise
+    except Exception as e:
+        download_file_content_logger.warning("Method %s failed: %s", method, e)
+        DOWNLOAD_STRATEGIES.record(key, method, "failure", time.perf_counter() - start_time)
+        return None
+    duration = time.perf_counter() - start_time
+    DOWNLOAD_STRATEGIES.record(key, method, "success", duration)
+    size = len(result[0]) if result[0] is not None else os.path.getsize(result[2])
+    download_file_content_logger.info("Method %s SUCCESS: Downloaded %s bytes in %.2f seconds", method, size, duration)
+    return result
+
+async def _download_with_strategy(session, download):
+    """
+    Fetch a file body with the download methods in their learned order.
+
+    With DOWNLOAD_HEDGE the two most promising methods are raced: the second starts when the
+    first fails or hasn't finished after DOWNLOAD_HEDGE_DELAY seconds, and the loser is cancelled.
+
+    Returns:
+        (content, content_type, file_path) as returned by _fetch_file_body, or None when no method succeeded
+    """
+    key = strategy_key(download.course_id, download.file_info)
+    methods = DOWNLOAD_STRATEGIES.order(key, list(FILE_DOWNLOAD_METHODS))
+    download_file_content_logger.debug("Download methods for %s: %s", key, methods)
+
+    if DOWNLOAD_HEDGE and len(methods) > 1:
+        first = asyncio.ensure_future(_attempt_download(session, download, key, methods[0]))
+        done, _ = await asyncio.wait({first}, timeout=DOWNLOAD_HEDGE_DELAY)
+        if done and first.result() is not None:
+            return first.result()
+        pending = set() if done else {first}
+        pending.add(asyncio.ensure_future(_attempt_download(session, download, key, methods[1])))
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        methods = methods[2:]
+
+    for method in methods:
+        result = await _attempt_download(session, download, key, method)
+        if result is not None:
+            return result
+    return None
+
+async def fetch_item_metadata(course_id: str, api_path: str, item_id: str, token: str):
+    """
+    Metadata of a Canvas item as the token's user sees it, without its rendered content.
+
+    Arguments:
+        api_path: Collection of the item in the Canvas course API, e.g. "files" or "pages"
+
+    Returns:
+        dict with the metadata, None when Canvas denies the user access to the item
+
+    Raises:
+        HTTPException: when the request fails for another reason
+    """
+    api_url = f"https://clemson.instructure.com/api/v1/courses/{course_id}/{api_path}/{item_id}"
+    ssl_context = ssl.create_default_context(cafile=certifi.where())
+    async with aiohttp.ClientSession() as session:
+        async with session.get(api_url, headers={"Authorization": f"Bearer {token.strip()}"}, ssl=ssl_context) as response:
+            if response.status in (401, 403, 404):
+                return None
+            if response.status != 200:
+                error_text = await response.text()
+                raise HTTPException(status_code=response.status, detail=f"Failed to get {api_path} metadata: {error_text}")
+            return await response.json()
+
+class FileStreamUnavailable(Exception):
+    """Raised by open_file_stream when Canvas doesn't serve the file body directly"""
+
+@asynccontextmanager
+async def open_file_stream(course_id: str, file_id: str, token: str):
+    """
+    Open the download of a Canvas file without reading its body.
+
+    Tries the download methods in their learned order and yields the file info together with
+    an async iterator over the body of the first one that answers with the file, in chunks of
+    CANVAS_STREAM_CHUNK_BYTES. Callers consume the body while the context is open, nothing is
+    buffered beyond one chunk.
+
+    Raises:
+        FileStreamUnavailable: when the file info or the body can't be fetched,
+            download_file_content may still return a fallback page
+    """
+    token = token.strip()
+    ssl_context = ssl.create_default_context(cafile=certifi.where())
+
+    async with aiohttp.ClientSession() as session:
+        api_url = f"https://clemson.instructure.com/api/v1/courses/{course_id}/files/{file_id}"
+        try:
+            async with session.get(api_url, headers={"Authorization": f"Bearer {token}"}, ssl=ssl_context) as response:
+                if response.status != 200:
+                    raise FileStreamUnavailable(f"File info request failed with status {response.status}")
+                file_info = await response.json()
+        except aiohttp.ClientError as e:
+            raise FileStreamUnavailable(f"File info request failed: {e}") from e
+
+        # Canvas granted this user access to the file, another user may have fetched it already
+        store_key = blob_key(file_id, file_info)
+        blob = await BLOB_STORE.get(store_key)
+        if blob is not None:
+            download_file_content_logger.debug("Streaming file %s from the shared store", file_id)
+            try:
+                yield file_info, _read_blob(blob)
+            finally:
+                blob.close()
+            return
+
+        download = _FileDownload(course_id, file_id, token, file_info, ssl_context)
+        key = strategy_key(course_id, file_info)
+        for method in DOWNLOAD_STRATEGIES.order(key, list(FILE_DOWNLOAD_METHODS)):
+            start_time = time.perf_counter()
+            try:
+                resolved = await FILE_DOWNLOAD_METHODS[method](session, download)
+                if resolved is None:
+                    continue
+                url, headers = resolved
+                response = await session.get(url, headers=headers, ssl=ssl_context, allow_redirects=True)
+            except Exception as e:
+                download_file_content_logger.debug("Stream via %s failed: %s", method, e)
+                DOWNLOAD_STRATEGIES.record(key, method, "failure", time.perf_counter() - start_time)
+                continue
+            content_type = response.headers.get("Content-Type", "")
+            if response.status != 200 or (content_type.startswith("application/json") and "json" not in file_info.get("content-type", "")):
+                download_file_content_logger.debug("Stream via %s failed with status %s", method, response.status)
+                response.release()
+                DOWNLOAD_STRATEGIES.record(key, method, "failure", time.perf_counter() - start_time)
+                continue
+            # Streams record the time until the response headers arrived
+            DOWNLOAD_STRATEGIES.record(key, method, "success", time.perf_counter() - start_time)
+            download_file_content_logger.debug("Streaming file %s via %s", file_id, method)
+            writer = BLOB_STORE.writer(store_key, content_type or file_info.get("content-type", "application/octet-stream"), file_info.get("size"))
+            try:
+                chunks = response.content.iter_chunked(CANVAS_STREAM_CHUNK_BYTES)
+                yield file_info, _stored_while_streaming(chunks, writer, file_info.get("size"))
+            finally:
+                response.release()
+                # Bodies that weren't read completely aren't stored
+                if writer is not None:
+                    writer.abort()
+            return
+
+    raise FileStreamUnavailable(f"No download method served file {file_id}")
+
 async def download_file_content(course_id: str, file_id: str, token: str, filename: str = None):
     """Download a file from Canvas using the file ID"""
-    print(f"[DOWNLOAD_FILE_CONTENT] Starting download for course_id={course_id}, file_id={file_id}")
-    print(f"[DOWNLOAD_FILE_CONTENT] Requested filename: {filename}")
-    print(f"[DOWNLOAD_FILE_CONTENT] Token length: {len(token)}")
+    download_file_content_logger.info("Starting download for course_id=%s, file_id=%s", course_id, file_id)
+    download_file_content_logger.debug("Requested filename: %s", filename)
+    download_file_content_logger.debug("Token length: %s", len(token))
     
     try:
-        import time
         start_time = time.time()
-        print(f"[DOWNLOAD_FILE_CONTENT] Started at: {start_time}")
+        download_file_content_logger.debug("Started at: %s", start_time)
         
         # Use URL-encoded token to avoid any special character issues
         token = token.strip()
         api_url = f"https://clemson.instructure.com/api/v1/courses/{course_id}/files/{file_id}"
         headers = {"Authorization": f"Bearer {token}"}
-        print(f"[DOWNLOAD_FILE_CONTENT] Using API URL: {api_url}")
-        print(f"[DOWNLOAD_FILE_CONTENT] Headers: {headers}")
+        download_file_content_logger.debug("Using API URL: %s", api_url)
+        download_file_content_logger.debug("Headers: %s", headers)
         
         ssl_context = ssl.create_default_context(cafile=certifi.where())
         
         async with aiohttp.ClientSession() as session:
             # First request to get file info
-            print(f"[DOWNLOAD_FILE_CONTENT] Making initial request to get file info")
+            download_file_content_logger.debug("Making initial request to get file info")
             try:
                 async with session.get(api_url, headers=headers, ssl=ssl_context) as response:
-                    print(f"[DOWNLOAD_FILE_CONTENT] File info response status: {response.status}")
-                    print(f"[DOWNLOAD_FILE_CONTENT] File info response headers: {response.headers}")
+                    download_file_content_logger.debug("File info response status: %s", response.status)
+                    download_file_content_logger.debug("File info response headers: %s", response.headers)
                     
                     if response.status != 200:
                         error_text = await response.text()
-                        print(f"[DOWNLOAD_FILE_CONTENT] ERROR: File info request failed: {error_text}")
+                        download_file_content_logger.error("File info request failed: %s", error_text)
                         raise HTTPException(status_code=response.status, detail=f"Failed to get file info: {error_text}")
                     
                     file_info = await response.json()
-                    print(f"[DOWNLOAD_FILE_CONTENT] Successfully retrieved file info: {file_info.get('display_name')}")
-                    print(f"[DOWNLOAD_FILE_CONTENT] File info: {file_info}")
+                    download_file_content_logger.info("Successfully retrieved file info: %s", file_info.get('display_name'))
+                    download_file_content_logger.debug("File info: %s", file_info)
             except Exception as file_info_error:
-                print(f"[DOWNLOAD_FILE_CONTENT] EXCEPTION during file info request: {str(file_info_error)}")
-                import traceback
-                print(f"[DOWNLOAD_FILE_CONTENT] File info traceback: {traceback.format_exc()}")
+                download_file_content_logger.error("Exception during file info request: %s", file_info_error, exc_info=True)
                 raise
-                
-                # Try multiple download methods in order of preference
-                
-                # Determine proper mime type and filename upfront
-                original_filename = file_info.get("display_name", "file")
-                content_type = file_info.get("content-type", "application/octet-stream")
-                file_size = file_info.get("size", 0)
-                file_modified = file_info.get("updated_at", "unknown")
-                
-                print(f"[DOWNLOAD_FILE_CONTENT] Original file metadata: name={original_filename}, type={content_type}, size={file_size}, modified={file_modified}")
-                
-                # Make sure we don't add .html extension when we already have a content type
-                if not filename:
-                    filename = original_filename
-                    print(f"[DOWNLOAD_FILE_CONTENT] Using original filename: {filename}")
-                else:
-                    print(f"[DOWNLOAD_FILE_CONTENT] Using provided filename: {filename}")
-                
-                # Check file properties
-                print(f"[DOWNLOAD_FILE_CONTENT] File URL available: {'url' in file_info}")
-                if 'url' in file_info:
-                    print(f"[DOWNLOAD_FILE_CONTENT] File URL: {file_info.get('url')}")
-                
-                # Method 1: Try direct Canvas download endpoint using the API v1 URL (most reliable)
-                print(f"[DOWNLOAD_FILE_CONTENT] === METHOD 1: Direct API Download ===")
-                try:
-                    # This is the most reliable way to download from Canvas - using the API
-                    direct_url = f"https://clemson.instructure.com/api/v1/files/{file_id}/download"
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 1 URL: {direct_url}")
-                    
-                    # Ensure proper auth header format based on Canvas API docs
-                    api_headers = {
-                        "Authorization": f"Bearer {token}",
-                        "Accept": "*/*"
-                    }
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 1 headers: {api_headers}")
-                    
-                    method1_start = time.time()
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 1 request starting at: {method1_start}")
-                    
-                    async with session.get(direct_url, headers=api_headers, ssl=ssl_context, allow_redirects=True) as file_response:
-                        method1_status = file_response.status
-                        method1_headers = file_response.headers
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 1 response status: {method1_status}")
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 1 response headers: {method1_headers}")
-                        
-                        if method1_status == 200:
-                            response_content_type = method1_headers.get("Content-Type", content_type)
-                            print(f"[DOWNLOAD_FILE_CONTENT] Method 1 content type: {response_content_type}")
-                            
-                            try:
-                                file_content = await file_response.read()
-                                content_length = len(file_content)
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 1 SUCCESS: Downloaded {content_length} bytes")
-                                
-                                # Check if content seems valid
-                                if content_length == 0:
-                                    print(f"[DOWNLOAD_FILE_CONTENT] WARNING: Method 1 returned empty content (0 bytes)")
-                                    raise Exception("Empty file content")
-                                
-                                if content_length < 100:
-                                    # For small content, print it to help debugging
-                                    try:
-                                        text_preview = file_content.decode('utf-8', errors='replace')[:100]
-                                        print(f"[DOWNLOAD_FILE_CONTENT] Content preview: {text_preview}")
-                                    except:
-                                        print(f"[DOWNLOAD_FILE_CONTENT] Content is binary, no preview available")
-                                
-                                # Check if expected file size matches
-                                if file_size > 0 and content_length != file_size:
-                                    print(f"[DOWNLOAD_FILE_CONTENT] WARNING: Downloaded size ({content_length}) doesn't match expected size ({file_size})")
-                                
-                                method1_end = time.time()
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 1 completed in {method1_end - method1_start:.2f} seconds")
-                                
-                                return Response(
-                                    content=file_content,
-                                    media_type=response_content_type,
-                                    headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-                                )
-                            except Exception as read_error:
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 1 read error: {str(read_error)}")
-                                raise
-                        else:
-                            error_text = await file_response.text()
-                            print(f"[DOWNLOAD_FILE_CONTENT] Method 1 failed with status {method1_status}: {error_text}")
-                            
-                            # If we get a 401 or 403, there might be authentication issues
-                            if method1_status in [401, 403]:
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 1 failed with auth error: {method1_status}")
-                                
-                            # If we get a 404, the file might not exist
-                            if method1_status == 404:
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 1 failed with 404 - file not found")
-                except Exception as e1:
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 1 exception: {str(e1)}")
-                    import traceback
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 1 traceback: {traceback.format_exc()}")
-                
-                # Method 2: Try using the URL from the file info
-                print(f"[DOWNLOAD_FILE_CONTENT] === METHOD 2: Using file_info URL ===")
-                download_url = file_info.get('url')
-                if download_url:
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 2 URL: {download_url}")
-                    try:
-                        # According to Canvas docs, the file.url might be a pre-signed URL that doesn't need auth
-                        # So we'll try without auth headers first
-                        method2_start = time.time()
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 2 request starting at: {method2_start}")
-                        
-                        async with session.get(download_url, ssl=ssl_context, allow_redirects=True) as file_response:
-                            method2_status = file_response.status
-                            method2_headers = file_response.headers
-                            print(f"[DOWNLOAD_FILE_CONTENT] Method 2 response status: {method2_status}")
-                            print(f"[DOWNLOAD_FILE_CONTENT] Method 2 response headers: {method2_headers}")
-                            
-                            if method2_status == 200:
-                                response_content_type = method2_headers.get("Content-Type", "application/octet-stream")
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 2 content type: {response_content_type}")
-                                
-                                try:
-                                    file_content = await file_response.read()
-                                    content_length = len(file_content)
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 2 SUCCESS: Downloaded {content_length} bytes")
-                                    
-                                    # Check if content seems valid
-                                    if content_length == 0:
-                                        print(f"[DOWNLOAD_FILE_CONTENT] WARNING: Method 2 returned empty content (0 bytes)")
-                                        raise Exception("Empty file content")
-                                    
-                                    if content_length < 100:
-                                        # For small content, print it to help debugging
-                                        try:
-                                            text_preview = file_content.decode('utf-8', errors='replace')[:100]
-                                            print(f"[DOWNLOAD_FILE_CONTENT] Content preview: {text_preview}")
-                                        except:
-                                            print(f"[DOWNLOAD_FILE_CONTENT] Content is binary, no preview available")
-                                    
-                                    # Check if expected file size matches
-                                    if file_size > 0 and content_length != file_size:
-                                        print(f"[DOWNLOAD_FILE_CONTENT] WARNING: Downloaded size ({content_length}) doesn't match expected size ({file_size})")
-                                    
-                                    method2_end = time.time()
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 2 completed in {method2_end - method2_start:.2f} seconds")
-                                    
-                                    if not filename:
-                                        filename = file_info.get("display_name", "canvas_file")
-                                    
-                                    return Response(
-                                        content=file_content,
-                                        media_type=response_content_type,
-                                        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-                                    )
-                                except Exception as read_error:
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 2 read error: {str(read_error)}")
-                                    raise
-                            else:
-                                error_text = await file_response.text()
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 2 failed with status {method2_status}: {error_text}")
-                        
-                        # If the first attempt failed, try again with authorization headers
-                        if method2_status != 200:
-                            print(f"[DOWNLOAD_FILE_CONTENT] Method 2 retrying with auth headers")
-                            api_headers = {
-                                "Authorization": f"Bearer {token}",
-                                "Accept": "*/*"
-                            }
-                            async with session.get(download_url, headers=api_headers, ssl=ssl_context, allow_redirects=True) as auth_response:
-                                method2_auth_status = auth_response.status
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 2 auth response status: {method2_auth_status}")
-                                
-                                if method2_auth_status == 200:
-                                    content_type = auth_response.headers.get("Content-Type", "application/octet-stream")
-                                    file_content = await auth_response.read()
-                                    content_length = len(file_content)
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 2 with auth SUCCESS: Downloaded {content_length} bytes")
-                                    
-                                    return Response(
-                                        content=file_content,
-                                        media_type=content_type,
-                                        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-                                    )
-                                else:
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 2 with auth failed: {method2_auth_status}")
-                        
-                    except Exception as e2:
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 2 exception: {str(e2)}")
-                        import traceback
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 2 traceback: {traceback.format_exc()}")
-                else:
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 2 skipped: No URL in file_info")
-                
-                # Method 3: Try global files endpoint with the specific download parameter
-                try:
-                    global_url = f"https://clemson.instructure.com/api/v1/files/{file_id}?include[]=avatar"
-                    print(f"Attempting Method 3: API files endpoint with additional parameters: {global_url}")
-                    
-                    # Ensure proper auth header format based on Canvas API docs
-                    api_headers = {
-                        "Authorization": f"Bearer {token}",
-                        "Accept": "*/*"
-                    }
-                    
-                    async with session.get(global_url, headers=api_headers, ssl=ssl_context, allow_redirects=True) as file_response:
-                        if file_response.status == 200:
-                            content_type = file_response.headers.get("Content-Type", "application/octet-stream")
-                            file_content = await file_response.read()
-                            print(f"Method 3 SUCCESS: Downloaded {len(file_content)} bytes")
-                            
-                            if not filename:
-                                filename = file_info.get("display_name", "canvas_file")
-                            
-                            return Response(
-                                content=file_content,
-                                media_type=content_type,
-                                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-                            )
-                        else:
-                            print(f"Method 3 failed with status {file_response.status}")
-                except Exception as e3:
-                    print(f"Method 3 exception: {str(e3)}")
-                
-                # Try the traditional download URL without API prefix
-                try:
-                    direct_download_url = f"https://clemson.instructure.com/courses/{course_id}/files/{file_id}/download?download_frd=1&verifier={file_info.get('uuid', '')}"
-                    print(f"Attempting Method 4: Direct download URL with verifier: {direct_download_url}")
-                    
-                    async with session.get(direct_download_url, headers=headers, ssl=ssl_context, allow_redirects=True) as file_response:
-                        if file_response.status == 200:
-                            content_type = file_response.headers.get("Content-Type", "application/octet-stream")
-                            file_content = await file_response.read()
-                            print(f"Method 4 SUCCESS: Downloaded {len(file_content)} bytes")
-                            
-                            if not filename:
-                                filename = file_info.get("display_name", "canvas_file")
-                            
-                            return Response(
-                                content=file_content,
-                                media_type=content_type,
-                                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-                            )
-                        else:
-                            print(f"Method 4 failed with status {file_response.status}")
-                except Exception as e4:
-                    print(f"Method 4 exception: {str(e4)}")
-                
-                # Method 5: Try the Canvas Files API endpoint with a different token format
-                print(f"[DOWNLOAD_FILE_CONTENT] === METHOD 5: Files API with enhanced preview URL ===")
-                try:
-                    api_method_url = f"https://clemson.instructure.com/api/v1/files/{file_id}?include[]=enhanced_preview_url"
-                    cookie_headers = {
-                        "Cookie": f"_csrf_token={token}; canvas_session={token}",
-                        "Accept": "*/*"
-                    }
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 URL: {api_method_url}")
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 cookie headers: {cookie_headers}")
-                    
-                    method5_start = time.time()
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 request starting at: {method5_start}")
-                    
-                    async with session.get(api_method_url, headers=cookie_headers, ssl=ssl_context) as api_response:
-                        method5_status = api_response.status
-                        method5_headers = api_response.headers
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 5 response status: {method5_status}")
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 5 response headers: {method5_headers}")
-                        
-                        if method5_status == 200:
-                            try:
-                                api_data = await api_response.json()
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 5 API data keys: {list(api_data.keys() if isinstance(api_data, dict) else [])}")
-                                
-                                if isinstance(api_data, dict) and "enhanced_preview_url" in api_data:
-                                    preview_url = api_data["enhanced_preview_url"]
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 found enhanced_preview_url: {preview_url}")
-                                    
-                                    # Attempt to download using the preview URL
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 attempting preview download")
-                                    try:
-                                        async with session.get(preview_url, headers=cookie_headers, ssl=ssl_context) as preview_response:
-                                            preview_status = preview_response.status
-                                            preview_headers = preview_response.headers
-                                            print(f"[DOWNLOAD_FILE_CONTENT] Method 5 preview response status: {preview_status}")
-                                            print(f"[DOWNLOAD_FILE_CONTENT] Method 5 preview headers: {preview_headers}")
-                                            
-                                            if preview_status == 200:
-                                                response_content_type = preview_headers.get("Content-Type", "application/octet-stream")
-                                                print(f"[DOWNLOAD_FILE_CONTENT] Method 5 preview content type: {response_content_type}")
-                                                
-                                                file_content = await preview_response.read()
-                                                content_length = len(file_content)
-                                                print(f"[DOWNLOAD_FILE_CONTENT] Method 5 SUCCESS: Downloaded {content_length} bytes")
-                                                
-                                                # Check if content seems valid
-                                                if content_length == 0:
-                                                    print(f"[DOWNLOAD_FILE_CONTENT] WARNING: Method 5 returned empty content (0 bytes)")
-                                                    raise Exception("Empty file content")
-                                                
-                                                method5_end = time.time()
-                                                print(f"[DOWNLOAD_FILE_CONTENT] Method 5 completed in {method5_end - method5_start:.2f} seconds")
-                                                
-                                                if not filename:
-                                                    filename = file_info.get("display_name", "canvas_file")
-                                                
-                                                return Response(
-                                                    content=file_content,
-                                                    media_type=response_content_type,
-                                                    headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-                                                )
-                                            else:
-                                                error_text = await preview_response.text()
-                                                print(f"[DOWNLOAD_FILE_CONTENT] Method 5 preview download failed with status {preview_status}: {error_text}")
-                                    except Exception as preview_error:
-                                        print(f"[DOWNLOAD_FILE_CONTENT] Method 5 preview download error: {str(preview_error)}")
-                                        raise
-                                else:
-                                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 did not find enhanced_preview_url in response")
-                            except Exception as json_error:
-                                print(f"[DOWNLOAD_FILE_CONTENT] Method 5 JSON parsing error: {str(json_error)}")
-                                raise
-                        else:
-                            error_text = await api_response.text()
-                            print(f"[DOWNLOAD_FILE_CONTENT] Method 5 failed with status {method5_status}: {error_text}")
-                except Exception as e5:
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 exception: {str(e5)}")
-                    import traceback
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 5 traceback: {traceback.format_exc()}")
-                
-                # Method 6: Try another API endpoint format as last resort
-                print(f"[DOWNLOAD_FILE_CONTENT] === METHOD 6: Alternative API endpoint format ===")
+            
+            # Make sure we don't add .html extension when we already have a content type
+            if not filename:
+                filename = file_info.get("display_name", "canvas_file")
+            download_file_content_logger.debug("Original file metadata: name=%s, type=%s, size=%s, modified=%s", file_info.get("display_name"), file_info.get("content-type"), file_info.get("size"), file_info.get("updated_at"))
+            
+            # Canvas granted this user access to the file, another user may have fetched it already
+            store_key = blob_key(file_id, file_info)
+            blob = await BLOB_STORE.get(store_key)
+            if blob is not None:
+                download_file_content_logger.debug("Serving file %s from the shared store", file_id)
+                return _blob_response(blob, blob.content_type, filename)
+            
+            # Try the download methods, the one that worked for similar files first
+            download = _FileDownload(course_id, file_id, token, file_info, ssl_context)
+            result = await _download_with_strategy(session, download)
+            if result is not None:
+                file_content, response_content_type, file_path = result
+                download_file_content_logger.debug("Completed in %.2f seconds", time.time() - start_time)
                 try:
-                    alt_url = f"https://clemson.instructure.com/api/v1/files/{file_id}?include[]=user&include[]=usage_rights"
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 6 URL: {alt_url}")
-                    
-                    method6_start = time.time()
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 6 request starting at: {method6_start}")
-                    
-                    async with session.get(alt_url, headers=headers, ssl=ssl_context) as alt_response:
-                        method6_status = alt_response.status
-                        print(f"[DOWNLOAD_FILE_CONTENT] Method 6 response status: {method6_status}")
-                        
-                        if method6_status == 200:
-                            alt_data = await alt_response.json()
-                            print(f"[DOWNLOAD_FILE_CONTENT] Method 6 received JSON data with keys: {list(alt_data.keys() if isinstance(alt_data, dict) else [])}")
-                            
-                            # Look for any download URLs in the response
-                            if isinstance(alt_data, dict):
-                                for key in ['url', 'download_url', 'preview_url']:
-                                    if key in alt_data and alt_data[key]:
-                                        download_url = alt_data[key]
-                                        print(f"[DOWNLOAD_FILE_CONTENT] Method 6 found download URL in '{key}': {download_url}")
-                                        
-                                        # Try to download with this URL
-                                        async with session.get(download_url, ssl=ssl_context, allow_redirects=True) as download_response:
-                                            if download_response.status == 200:
-                                                file_content = await download_response.read()
-                                                print(f"[DOWNLOAD_FILE_CONTENT] Method 6 SUCCESS: Downloaded {len(file_content)} bytes")
-                                                
-                                                if not filename:
-                                                    filename = file_info.get("display_name", "canvas_file")
-                                                
-                                                return Response(
-                                                    content=file_content,
-                                                    media_type=download_response.headers.get("Content-Type", "application/octet-stream"),
-                                                    headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-                                                )
-                except Exception as e6:
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 6 exception: {str(e6)}")
-                    import traceback
-                    print(f"[DOWNLOAD_FILE_CONTENT] Method 6 traceback: {traceback.format_exc()}")
-                
-                # All methods failed, create a fallback HTML but with more context
-                print(f"[DOWNLOAD_FILE_CONTENT] All download methods failed, creating fallback HTML")
-                
-                # Get additional file details for better context
-                file_type = file_info.get('content-type', 'Unknown')
-                file_size = file_info.get('size', 'Unknown')
-                file_created = file_info.get('created_at', 'Unknown')
-                file_updated = file_info.get('updated_at', 'Unknown')
-                file_display_name = file_info.get('display_name', 'File')
-                file_uuid = file_info.get('uuid', 'Unknown')
-                file_mime_class = file_info.get('mime_class', 'Unknown')
-                
-                print(f"[DOWNLOAD_FILE_CONTENT] Creating fallback HTML with file details:")
-                print(f"[DOWNLOAD_FILE_CONTENT] - Type: {file_type}")
-                print(f"[DOWNLOAD_FILE_CONTENT] - Size: {file_size}")
-                print(f"[DOWNLOAD_FILE_CONTENT] - Created: {file_created}")
-                print(f"[DOWNLOAD_FILE_CONTENT] - Updated: {file_updated}")
-                print(f"[DOWNLOAD_FILE_CONTENT] - Display Name: {file_display_name}")
-                print(f"[DOWNLOAD_FILE_CONTENT] - UUID: {file_uuid}")
-                print(f"[DOWNLOAD_FILE_CONTENT] - MIME Class: {file_mime_class}")
-                
-                # Additional debugging info
-                available_urls = []
-                if 'url' in file_info:
-                    available_urls.append(("File info URL", file_info.get('url')))
-                available_urls.append(("API download endpoint", f"https://clemson.instructure.com/api/v1/files/{file_id}/download"))
-                available_urls.append(("Direct Canvas URL", f"https://clemson.instructure.com/courses/{course_id}/files/{file_id}"))
-                available_urls.append(("Download URL with verifier", f"https://clemson.instructure.com/courses/{course_id}/files/{file_id}/download?download_frd=1&verifier={file_uuid}"))
-                
-                # Create a richer HTML fallback with file details and Canvas URI
-                html_content = f"""
-                <html>
-                <head>
-                    <title>{file_display_name}</title>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; margin: 20px; line-height: 1.6; }}
-                        h1 {{ color: #2d3b45; }}
-                        .container {{ margin: 20px auto; max-width: 800px; padding: 20px; border: 1px solid #ddd; border-radius: 5px; }}
-                        .metadata {{ background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                        .actions {{ margin-top: 20px; text-align: center; }}
-                        .actions a {{ display: inline-block; padding: 10px 20px; background-color: #0374B5; color: white; 
-                                     text-decoration: none; border-radius: 5px; margin: 0 10px; }}
-                        .actions a:hover {{ background-color: #0262A0; }}
-                        .note {{ font-style: italic; margin-top: 30px; color: #666; }}
-                        pre {{ background: #f8f8f8; padding: 10px; overflow-x: auto; }}
-                        .error {{ background: #fff0f0; color: #d32f2f; padding: 10px; border-radius: 5px; margin-top: 20px; }}
-                        .timestamp {{ color: #666; font-size: 0.8em; margin-top: 20px; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <h1>{file_display_name}</h1>
-                        
-                        <div class="metadata">
-                            <h3>File Information</h3>
-                            <p><strong>File Type:</strong> {file_type}</p>
-                            <p><strong>Size:</strong> {file_size} bytes</p>
-                            <p><strong>Created:</strong> {file_created}</p>
-                            <p><strong>Last Updated:</strong> {file_updated}</p>
-                            <p><strong>File ID:</strong> {file_id}</p>
-                            <p><strong>Course ID:</strong> {course_id}</p>
-                            <p><strong>MIME Class:</strong> {file_mime_class}</p>
-                            <p><strong>UUID:</strong> {file_uuid}</p>
-                        </div>
-                        
-                        <div class="actions">
-                            <a href="https://clemson.instructure.com/courses/{course_id}/files/{file_id}" target="_blank">
-                                View in Canvas
-                            </a>
-                            <a href="https://clemson.instructure.com/courses/{course_id}/files/{file_id}/download?download_frd=1" target="_blank">
-                                Download File
-                            </a>
-                        </div>
-                        
-                        <p class="note">Note: You may need to be logged into Canvas to access this file. This file could not be automatically downloaded.</p>
-                        
-                        <div class="error">
-                            <h3>Error Notice</h3>
-                            <p>The system was unable to directly download this file for the knowledge base. This may be due to permission settings, file type restrictions, or other Canvas API limitations.</p>
-                        </div>
-                        
-                        <div>
-                            <h3>Debug Information</h3>
-                            <p>The following download URLs were attempted:</p>
-                            <pre>"""
-                
-                # Add all attempted URLs to the debug info
-                for i, (url_name, url) in enumerate(available_urls):
-                    html_content += f"{i+1}. {url_name}: {url}\n"
-                
-                html_content += f"""</pre>
-                        </div>
-                        
-                        <p class="timestamp">Attempted download: {datetime.datetime.now().isoformat()}</p>
-                    </div>
-                </body>
-                </html>
-                """
-                
-                if not filename:
-                    filename = f"{file_display_name.replace(' ', '_')}_unavailable.html"
-                    print(f"[DOWNLOAD_FILE_CONTENT] Generated filename: {filename}")
-                
-                print(f"[DOWNLOAD_FILE_CONTENT] Returning fallback HTML response, length: {len(html_content)}")
+                    if file_path:
+                        blob = await BLOB_STORE.put_file(store_key, file_path, response_content_type, file_info.get("size"))
+                    else:
+                        BLOB_STORE.put_bytes(store_key, file_content, response_content_type, file_info.get("size"))
+                except OSError as store_error:
+                    download_file_content_logger.warning("Failed to add file %s to the shared store: %s", file_id, store_error)
+                if blob is not None:
+                    return _blob_response(blob, response_content_type, filename)
+                if file_path:
+                    # Large files are served from disk and removed once sent
+                    return FileResponse(
+                        file_path,
+                        media_type=response_content_type,
+                        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+                        background=BackgroundTask(os.remove, file_path)
+                    )
                 return Response(
-                    content=html_content,
-                    media_type="text/html",
+                    content=file_content,
+                    media_type=response_content_type,
                     headers={"Content-Disposition": f'attachment; filename="{filename}"'}
                 )
+            
+            # All methods failed, create a fallback HTML but with more context
+            download_file_content_logger.warning("All download methods failed, creating fallback HTML")
+
+            # Get additional file details for better context
+            file_type = file_info.get('content-type', 'Unknown')
+            file_size = file_info.get('size', 'Unknown')
+            file_created = file_info.get('created_at', 'Unknown')
+            file_updated = file_info.get('updated_at', 'Unknown')
+            file_display_name = file_info.get('display_name', 'File')
+            file_uuid = file_info.get('uuid', 'Unknown')
+            file_mime_class = file_info.get('mime_class', 'Unknown')
+
+            download_file_content_logger.debug("Creating fallback HTML with file details:")
+            download_file_content_logger.debug("- Type: %s", file_type)
+            download_file_content_logger.debug("- Size: %s", file_size)
+            download_file_content_logger.debug("- Created: %s", file_created)
+            download_file_content_logger.debug("- Updated: %s", file_updated)
+            download_file_content_logger.debug("- Display Name: %s", file_display_name)
+            download_file_content_logger.debug("- UUID: %s", file_uuid)
+            download_file_content_logger.debug("- MIME Class: %s", file_mime_class)
+
+            # Additional debugging info
+            available_urls = []
+            if 'url' in file_info:
+                available_urls.append(("File info URL", file_info.get('url')))
+            available_urls.append(("API download endpoint", f"https://clemson.instructure.com/api/v1/files/{file_id}/download"))
+            available_urls.append(("Direct Canvas URL", f"https://clemson.instructure.com/courses/{course_id}/files/{file_id}"))
+            available_urls.append(("Download URL with verifier", f"https://clemson.instructure.com/courses/{course_id}/files/{file_id}/download?download_frd=1&verifier={file_uuid}"))
+
+            # Create a richer HTML fallback with file details and Canvas URI
+            html_content = f"""
+            <html>
+            <head>
+                <title>{file_display_name}</title>
+                <style>
+                    body {{ font-family: Arial, sans-serif; margin: 20px; line-height: 1.6; }}
+                    h1 {{ color: #2d3b45; }}
+                    .container {{ margin: 20px auto; max-width: 800px; padding: 20px; border: 1px solid #ddd; border-radius: 5px; }}
+                    .metadata {{ background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0; }}
+                    .actions {{ margin-top: 20px; text-align: center; }}
+                    .actions a {{ display: inline-block; padding: 10px 20px; background-color: #0374B5; color: white; 
+                                 text-decoration: none; border-radius: 5px; margin: 0 10px; }}
+                    .actions a:hover {{ background-color: #0262A0; }}
+                    .note {{ font-style: italic; margin-top: 30px; color: #666; }}
+                    pre {{ background: #f8f8f8; padding: 10px; overflow-x: auto; }}
+                    .error {{ background: #fff0f0; color: #d32f2f; padding: 10px; border-radius: 5px; margin-top: 20px; }}
+                    .timestamp {{ color: #666; font-size: 0.8em; margin-top: 20px; }}
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <h1>{file_display_name}</h1>
+
+                    <div class="metadata">
+                        <h3>File Information</h3>
+                        <p><strong>File Type:</strong> {file_type}</p>
+                        <p><strong>Size:</strong> {file_size} bytes</p>
+                        <p><strong>Created:</strong> {file_created}</p>
+                        <p><strong>Last Updated:</strong> {file_updated}</p>
+                        <p><strong>File ID:</strong> {file_id}</p>
+                        <p><strong>Course ID:</strong> {course_id}</p>
+                        <p><strong>MIME Class:</strong> {file_mime_class}</p>
+                        <p><strong>UUID:</strong> {file_uuid}</p>
+                    </div>
+
+                    <div class="actions">
+                        <a href="https://clemson.instructure.com/courses/{course_id}/files/{file_id}" target="_blank">
+                            View in Canvas
+                        </a>
+                        <a href="https://clemson.instructure.com/courses/{course_id}/files/{file_id}/download?download_frd=1" target="_blank">
+                            Download File
+                        </a>
+                    </div>
+
+                    <p class="note">Note: You may need to be logged into Canvas to access this file. This file could not be automatically downloaded.</p>
+
+                    <div class="error">
+                        <h3>Error Notice</h3>
+                        <p>The system was unable to directly download this file for the knowledge base. This may be due to permission settings, file type restrictions, or other Canvas API limitations.</p>
+                    </div>
+
+                    <div>
+                        <h3>Debug Information</h3>
+                        <p>The following download URLs were attempted:</p>
+                        <pre>"""
+
+            # Add all attempted URLs to the debug info
+            for i, (url_name, url) in enumerate(available_urls):
+                html_content += f"{i+1}. {url_name}: {url}\n"
+
+            html_content += f"""</pre>
+                    </div>
+
+                    <p class="timestamp">Attempted download: {datetime.datetime.now().isoformat()}</p>
+                </div>
+            </body>
+            </html>
+            """
+
+            if not filename:
+                filename = f"{file_display_name.replace(' ', '_')}_unavailable.html"
+                download_file_content_logger.debug("Generated filename: %s", filename)
+
+            download_file_content_logger.debug("Returning fallback HTML response, length: %s", len(html_content))
+            return Response(
+                content=html_content,
+                media_type="text/html",
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
                 
     except Exception as e:
-        print(f"[DOWNLOAD_FILE_CONTENT] FATAL EXCEPTION: {str(e)}")
-        import traceback
-        error_traceback = traceback.format_exc()
-        print(f"[DOWNLOAD_FILE_CONTENT] Error traceback: {error_traceback}")
+        download_file_content_logger.error("Fatal exception: %s", e, exc_info=True)
         
         # Get as much info as possible about the file
         file_info_str = "Unknown"
@@ -1032,10 +1083,10 @@ async def download_file_content(course_id: str, file_id: str, token: str, filena
         except:
             pass
         
-        print(f"[DOWNLOAD_FILE_CONTENT] File info: {file_info_str}")
+        download_file_content_logger.debug("File info: %s", file_info_str)
         
         # Log all attempted download methods
-        print(f"[DOWNLOAD_FILE_CONTENT] Attempted download methods:")
+        download_file_content_logger.debug("Attempted download methods:")
         download_methods = {
             "Method 1": f"API download endpoint (api/v1/files/{file_id}/download)",
             "Method 2": "file_info URL",
@@ -1045,13 +1096,13 @@ async def download_file_content(course_id: str, file_id: str, token: str, filena
             "Method 6": "Alternative API endpoint"
         }
         for method, description in download_methods.items():
-            print(f"[DOWNLOAD_FILE_CONTENT] - {method}: {description}")
+            download_file_content_logger.debug("- %s: %s", method, description)
         
         # Get error type and message
         error_type = type(e).__name__
         error_msg = str(e)
-        print(f"[DOWNLOAD_FILE_CONTENT] Error type: {error_type}")
-        print(f"[DOWNLOAD_FILE_CONTENT] Error message: {error_msg}")
+        download_file_content_logger.warning("Error type: %s", error_type)
+        download_file_content_logger.warning("Error message: %s", error_msg)
         
         # Create a graceful error HTML with comprehensive debugging information
         html_content = f"""
@@ -1127,7 +1178,7 @@ async def download_file_content(course_id: str, file_id: str, token: str, filena
         if not filename:
             filename = f"error_file_{file_id}.html"
         
-        print(f"[DOWNLOAD_FILE_CONTENT] Returning error HTML response, length: {len(html_content)}")
+        download_file_content_logger.warning("Returning error HTML response, length: %s", len(html_content))
         return Response(
             content=html_content,
             media_type="text/html",
@@ -1181,112 +1232,100 @@ async def get_course_item_content(course_id: str, item_id: str, item_type: str,
     Returns:
     - Response with the content and appropriate headers
     """
-    print(f"[GET_COURSE_ITEM] Starting request for course_id={course_id}, item_id={item_id}, item_type={item_type}")
-    print(f"[GET_COURSE_ITEM] Filename: {filename}, Token length: {len(token)}")
+    get_course_item_logger.info("Starting request for course_id=%s, item_id=%s, item_type=%s", course_id, item_id, item_type)
+    get_course_item_logger.debug("Filename: %s, Token length: %s", filename, len(token))
     
     try:
         # Handle different content types using appropriate API endpoints
         item_type_lower = item_type.lower()
-        print(f"[GET_COURSE_ITEM] Processing item_type: {item_type_lower}")
+        get_course_item_logger.debug("Processing item_type: %s", item_type_lower)
         
         if item_type_lower == 'assignment':
-            print(f"[GET_COURSE_ITEM] Calling download_assignment for item_id={item_id}")
+            get_course_item_logger.debug("Calling download_assignment for item_id=%s", item_id)
             try:
                 response = await download_assignment(course_id, item_id, token, filename)
-                print(f"[GET_COURSE_ITEM] Assignment download successful")
+                get_course_item_logger.debug("Assignment download successful")
                 return response
             except Exception as assignment_error:
-                print(f"[GET_COURSE_ITEM] ERROR downloading assignment: {str(assignment_error)}")
-                import traceback
-                print(f"[GET_COURSE_ITEM] Assignment traceback: {traceback.format_exc()}")
+                get_course_item_logger.error("Error downloading assignment: %s", assignment_error, exc_info=True)
                 raise
             
         elif item_type_lower in ['page', 'wiki_page']:
-            print(f"[GET_COURSE_ITEM] Calling download_page_content for item_id={item_id}")
+            get_course_item_logger.debug("Calling download_page_content for item_id=%s", item_id)
             try:
                 response = await download_page_content(course_id, item_id, token, filename)
-                print(f"[GET_COURSE_ITEM] Page download successful")
+                get_course_item_logger.debug("Page download successful")
                 return response
             except Exception as page_error:
-                print(f"[GET_COURSE_ITEM] ERROR downloading page: {str(page_error)}")
-                import traceback
-                print(f"[GET_COURSE_ITEM] Page traceback: {traceback.format_exc()}")
+                get_course_item_logger.error("Error downloading page: %s", page_error, exc_info=True)
                 raise
             
         elif item_type_lower in ['quiz', 'quizzes/quiz']:
-            print(f"[GET_COURSE_ITEM] Calling download_quiz for item_id={item_id}")
+            get_course_item_logger.debug("Calling download_quiz for item_id=%s", item_id)
             try:
                 response = await download_quiz(course_id, item_id, token, filename)
-                print(f"[GET_COURSE_ITEM] Quiz download successful")
+                get_course_item_logger.debug("Quiz download successful")
                 return response
             except Exception as quiz_error:
-                print(f"[GET_COURSE_ITEM] ERROR downloading quiz: {str(quiz_error)}")
-                import traceback
-                print(f"[GET_COURSE_ITEM] Quiz traceback: {traceback.format_exc()}")
+                get_course_item_logger.error("Error downloading quiz: %s", quiz_error, exc_info=True)
                 raise
             
         elif item_type_lower == 'file':
-            print(f"[GET_COURSE_ITEM] Calling download_file_content for item_id={item_id}")
+            get_course_item_logger.debug("Calling download_file_content for item_id=%s", item_id)
             try:
                 response = await download_file_content(course_id, item_id, token, filename)
-                print(f"[GET_COURSE_ITEM] File download successful")
+                get_course_item_logger.debug("File download successful")
                 return response
             except Exception as file_error:
-                print(f"[GET_COURSE_ITEM] ERROR downloading file: {str(file_error)}")
-                import traceback
-                print(f"[GET_COURSE_ITEM] File traceback: {traceback.format_exc()}")
+                get_course_item_logger.error("Error downloading file: %s", file_error, exc_info=True)
                 raise
             
         elif item_type_lower in ['discussion_topic', 'discussion']:
-            print(f"[GET_COURSE_ITEM] Calling download_discussion for item_id={item_id}")
+            get_course_item_logger.debug("Calling download_discussion for item_id=%s", item_id)
             try:
                 response = await download_discussion(course_id, item_id, token, filename)
-                print(f"[GET_COURSE_ITEM] Discussion download successful")
+                get_course_item_logger.debug("Discussion download successful")
                 return response
             except Exception as discussion_error:
-                print(f"[GET_COURSE_ITEM] ERROR downloading discussion: {str(discussion_error)}")
-                import traceback
-                print(f"[GET_COURSE_ITEM] Discussion traceback: {traceback.format_exc()}")
+                get_course_item_logger.error("Error downloading discussion: %s", discussion_error, exc_info=True)
                 raise
             
         elif item_type_lower == 'externalurl':
-            print(f"[GET_COURSE_ITEM] Processing external URL for item_id={item_id}")
+            get_course_item_logger.debug("Processing external URL for item_id=%s", item_id)
             try:
                 # For external URLs, we need to get the URL from the module item first
                 api_url = f"https://clemson.instructure.com/api/v1/courses/{course_id}/modules/items/{item_id}"
                 headers = {"Authorization": f"Bearer {token}"}
-                print(f"[GET_COURSE_ITEM] Fetching external URL from: {api_url}")
+                get_course_item_logger.debug("Fetching external URL from: %s", api_url)
                 
                 async with aiohttp.ClientSession() as session:
                     async with session.get(api_url, headers=headers) as response:
-                        print(f"[GET_COURSE_ITEM] External URL response status: {response.status}")
+                        get_course_item_logger.debug("External URL response status: %s", response.status)
                         
                         if response.status == 200:
                             item_data = await response.json()
-                            print(f"[GET_COURSE_ITEM] External URL item data: {item_data}")
+                            get_course_item_logger.debug("External URL item data: %s", item_data)
                             
                             if 'external_url' in item_data:
                                 external_url = item_data['external_url']
-                                print(f"[GET_COURSE_ITEM] Found external URL: {external_url}")
+                                get_course_item_logger.debug("Found external URL: %s", external_url)
                                 return await download_external_url(external_url, token, filename)
                             else:
-                                print(f"[GET_COURSE_ITEM] No external_url found in item data")
+                                get_course_item_logger.debug("No external_url found in item data")
                         else:
                             error_text = await response.text()
-                            print(f"[GET_COURSE_ITEM] Failed to get module item: {error_text}")
+                            get_course_item_logger.warning("Failed to get module item: %s", error_text)
                 
                 # If we couldn't get the URL, use a placeholder
-                print(f"[GET_COURSE_ITEM] Using placeholder URL")
+                get_course_item_logger.debug("Using placeholder URL")
                 return await download_external_url("https://clemson.instructure.com", token, filename)
             except Exception as external_url_error:
-                print(f"[GET_COURSE_ITEM] ERROR processing external URL: {str(external_url_error)}")
-                import traceback
-                print(f"[GET_COURSE_ITEM] External URL traceback: {traceback.format_exc()}")
+                get_course_item_logger.error("Error processing external URL: %s", external_url_error, exc_info=True)
                 raise
             
         else:
             # For unsupported types, return a generic message
-            print(f"[GET_COURSE_ITEM] Unsupported item type: {item_type_lower}")
+            get_course_item_logger.debug("Unsupported item type: %s", item_type_lower)
             html_content = f"""
             <html>
             <head>
@@ -1312,7 +1351,7 @@ async def get_course_item_content(course_id: str, item_id: str, item_type: str,
             if not filename:
                 filename = f"unsupported_content_{item_type_lower}.html"
             
-            print(f"[GET_COURSE_ITEM] Returning unsupported content response with filename: {filename}")
+            get_course_item_logger.debug("Returning unsupported content response with filename: %s", filename)
             return Response(
                 content=html_content,
                 media_type="text/html",
@@ -1321,10 +1360,7 @@ async def get_course_item_content(course_id: str, item_id: str, item_type: str,
     
     except Exception as e:
         # Log the full exception for debugging
-        print(f"[GET_COURSE_ITEM] FATAL ERROR: {str(e)}")
-        import traceback
-        traceback_str = traceback.format_exc()
-        print(f"[GET_COURSE_ITEM] Traceback: {traceback_str}")
+        get_course_item_logger.error("Fatal error: %s", e, exc_info=True)
         
         # Create an error response HTML
         error_html = f"""
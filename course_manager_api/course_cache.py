@@ -0,0 +1,155 @@
+"""
+In-process cache of the course JSON files.
+
+course_info.json holds every module item, file, page and quiz of a course and used to be
+re-read and re-parsed on every request. Snapshots are cached by path and revalidated
+against the file's mtime and size, so files replaced on disk are picked up on the next
+read. The cache is capped by the total size of the cached files and evicts the least
+recently used snapshots. Each snapshot keeps the raw bytes, so endpoints returning a whole
+file send them as they are, and a lazily built index for single item lookups.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+
+    def loads(raw):
+        return orjson.loads(raw)
+
+    def dumps(data):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+except ImportError:
+    import json
+
+    def loads(raw):
+        return json.loads(raw)
+
+    def dumps(data):
+        return json.dumps(data, indent=2).encode("utf-8")
+
+# Maximum total size in bytes of the cached course files, parsed snapshots take a few times more memory
+COURSE_CACHE_MAX_BYTES = int(os.getenv("COURSE_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+
+# Sections of course_info.json and the item type their entries are indexed under
+_SECTION_TYPES = {
+    "files": "file",
+    "pages": "page",
+    "assignments": "assignment",
+    "quizzes": "quiz",
+    "discussions": "discussion",
+    "modules": "module",
+}
+
+# Item type spellings used by Canvas module items and the frontend
+_TYPE_ALIASES = {
+    "wiki_page": "page",
+    "quizzes/quiz": "quiz",
+    "discussion_topic": "discussion",
+    "subheader": "module_item",
+    "externalurl": "module_item",
+    "externaltool": "module_item",
+}
+
+
+def normalize_item_type(item_type):
+    item_type = str(item_type).lower()
+    return _TYPE_ALIASES.get(item_type, item_type)
+
+
+def _build_index(data):
+    """Items by normalized type and id, for course_info.json or a file_list.json"""
+    index = {}
+    if isinstance(data, list):
+        index["file"] = {str(entry["id"]): entry for entry in data if isinstance(entry, dict) and entry.get("id")}
+        return index
+    for section, item_type in _SECTION_TYPES.items():
+        entries = data.get(section) or []
+        items = index.setdefault(item_type, {})
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            if entry.get("id") is not None:
+                items[str(entry["id"])] = entry
+            # Pages are addressed by page_id or by their url slug
+            for key in ("page_id", "url") if item_type == "page" else ():
+                if entry.get(key) is not None:
+                    items[str(entry[key])] = entry
+    module_items = index.setdefault("module_item", {})
+    for module in data.get("modules") or []:
+        for entry in (module.get("items") or []) if isinstance(module, dict) else []:
+            if isinstance(entry, dict) and entry.get("id") is not None:
+                module_items[str(entry["id"])] = entry
+    return index
+
+
+class CourseSnapshot:
+    """Parsed content of one course JSON file as of a given mtime and size"""
+
+    def __init__(self, path, raw, mtime_ns, size, data=None):
+        self.path = path
+        self.raw = raw
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.data = loads(raw) if data is None else data
+        self._index = None
+        self._lock = threading.Lock()
+
+    def find(self, item_type, item_id):
+        """Item of the given type and id, None if the file has no such item"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = _build_index(self.data)
+        return self._index.get(normalize_item_type(item_type), {}).get(str(item_id))
+
+
+class CourseFileCache:
+    """LRU cache of CourseSnapshots validated by mtime and size, bounded by total file size"""
+
+    def __init__(self, max_bytes=COURSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._snapshots = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _store(self, snapshot):
+        with self._lock:
+            previous = self._snapshots.pop(snapshot.path, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if snapshot.size > self.max_bytes:
+                return
+            self._snapshots[snapshot.path] = snapshot
+            self._bytes += snapshot.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._snapshots.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def read(self, path):
+        """Snapshot of the file at path, raises FileNotFoundError when it does not exist"""
+        stat = os.stat(path)
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+            if snapshot is not None and snapshot.mtime_ns == stat.st_mtime_ns and snapshot.size == stat.st_size:
+                self._snapshots.move_to_end(path)
+                return snapshot
+        with open(path, "rb") as f:
+            raw = f.read()
+        snapshot = CourseSnapshot(path, raw, stat.st_mtime_ns, len(raw))
+        self._store(snapshot)
+        return snapshot
+
+    def write(self, path, data):
+        """Write data to path as JSON and cache it, returns the snapshot"""
+        raw = dumps(data)
+        # Replaced atomically, concurrent readers see either the old or the new file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(raw)
+        os.replace(temp_path, path)
+        stat = os.stat(path)
+        snapshot = CourseSnapshot(path, raw, stat.st_mtime_ns, len(raw), data=data)
+        self._store(snapshot)
+        return snapshot
@@ -0,0 +1,208 @@
+"""
+Course-scoped ingestion of Canvas items into the knowledge base.
+
+upload_selected_to_rag used to send every student's selection to the ingestor on its own,
+so a syllabus selected by a whole class was extracted, captioned and embedded once per
+student. Course content is now ingested once per collection, keyed by course, item and the
+item's version (Canvas `updated_at`), and only sent again when the item changed. What each
+user selected is recorded separately: the RAG server restricts retrieval to a user's
+documents when /v1/generate or /v1/search is called with their `document_names`, which
+/rag_access returns. The index is persisted next to the course data.
+"""
+import json
+import os
+import threading
+import time
+
+from prometheus_client import Counter
+
+from course_logging import get_logger
+
+logger = get_logger("course_ingestion")
+
+COURSE_DATA_DIR = "course_data"
+# Ingested course items and the selections of every user
+COURSE_INGESTION_INDEX_PATH = os.getenv("COURSE_INGESTION_INDEX_PATH", os.path.join(COURSE_DATA_DIR, ".ingestion_index.json"))
+# Collection course items are ingested into, {course_id} is replaced by the course id, e.g. course_{course_id}
+COURSE_COLLECTION = os.getenv("COURSE_COLLECTION", "default")
+
+COURSE_INGESTIONS = Counter(
+    "course_data_manager_course_ingestions_total",
+    "Selected course items by result: ingested, reingested after a change or reused",
+    ["result"]
+)
+
+# Item types whose content is the same for every user of a course and the Canvas API path
+# returning their metadata. Quizzes are exported with the user's own submissions and stay
+# per user, like module items without a version.
+SHARED_ITEM_TYPES = {
+    "file": "files",
+    "page": "pages",
+    "wiki_page": "pages",
+    "assignment": "assignments",
+}
+
+
+def course_collection(course_id):
+    """Collection the items of a course are ingested into"""
+    return COURSE_COLLECTION.replace("{course_id}", str(course_id))
+
+
+def item_key(item_type, item_id):
+    """Key of a Canvas item within its course"""
+    item_type = str(item_type).lower()
+    if item_type == "wiki_page":
+        item_type = "page"
+    return f"{item_type}:{item_id}"
+
+
+def item_version(metadata):
+    """Version of a Canvas item from its metadata, None when Canvas doesn't report one"""
+    return metadata.get("updated_at") or None
+
+
+class CourseIngestionIndex:
+    """
+    Ingested documents by collection, course and item, and the items each user selected.
+
+    Document names are unique within a collection, the ingestor refuses a second document of
+    the same name. Items keep their own name unless another item already uses or reserved it,
+    then the name is prefixed with the course and item.
+    """
+
+    def __init__(self, path=COURSE_INGESTION_INDEX_PATH):
+        self.path = path
+        self._documents = {}
+        self._selections = {}
+        self._names = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _document_key(collection_name, course_id, key):
+        return f"{collection_name}|{course_id}|{key}"
+
+    @staticmethod
+    def _user_key(user_id, course_id):
+        return f"{user_id}|{course_id}"
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._documents = data["documents"]
+            self._selections = data["selections"]
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable ingestion index %s: %s", self.path, e)
+            return
+        self._names = {
+            (entry["collection_name"], entry["document_name"]): document_key
+            for document_key, entry in self._documents.items()
+        }
+
+    def _save(self):
+        # Written to a temporary file first so a crash never leaves a truncated index
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"documents": self._documents, "selections": self._selections}, f)
+        os.replace(temp_path, self.path)
+
+    def lookup(self, collection_name, course_id, key):
+        """Entry of an ingested item, with its version and document name, None when not ingested"""
+        with self._lock:
+            entry = self._documents.get(self._document_key(collection_name, course_id, key))
+            return dict(entry) if entry else None
+
+    def reserve_name(self, collection_name, course_id, key, file_name):
+        """
+        Name to ingest an item under, file_name unless another item of the collection uses or
+        reserved it. The name is reserved for the item right away, so that two items with the
+        same file name ingested at the same time don't replace each other's document; record()
+        keeps the reservation and release_name() gives it up when the upload failed.
+        """
+        document_key = self._document_key(collection_name, course_id, key)
+        with self._lock:
+            owner = self._names.get((collection_name, file_name))
+            if owner is not None and owner != document_key:
+                file_name = f"{course_id}_{key.replace(':', '_')}_{file_name}"
+            self._names[(collection_name, file_name)] = document_key
+        return file_name
+
+    def release_name(self, collection_name, course_id, key, document_name):
+        """Give up a name reserved by reserve_name unless the item was recorded under it"""
+        document_key = self._document_key(collection_name, course_id, key)
+        with self._lock:
+            entry = self._documents.get(document_key)
+            if entry is not None and entry["document_name"] == document_name:
+                return
+            if self._names.get((collection_name, document_name)) == document_key:
+                del self._names[(collection_name, document_name)]
+
+    def record(self, collection_name, course_id, key, version, document_name):
+        """Remember that an item version was ingested, returns the replaced entry or None"""
+        document_key = self._document_key(collection_name, course_id, key)
+        with self._lock:
+            previous = self._documents.get(document_key)
+            if previous is not None and self._names.get((collection_name, previous["document_name"])) == document_key:
+                del self._names[(collection_name, previous["document_name"])]
+            self._documents[document_key] = {
+                "collection_name": collection_name,
+                "document_name": document_name,
+                "version": version,
+                "ingested_at": time.time(),
+            }
+            self._names[(collection_name, document_name)] = document_key
+            self._save()
+        COURSE_INGESTIONS.labels(result="ingested" if previous is None else "reingested").inc()
+        return previous
+
+    def reused(self):
+        COURSE_INGESTIONS.labels(result="reused").inc()
+
+    def select(self, user_id, course_id, collection_name, key):
+        """Add an ingested item to the documents a user may retrieve"""
+        document_key = self._document_key(collection_name, course_id, key)
+        with self._lock:
+            selected = self._selections.setdefault(self._user_key(user_id, course_id), [])
+            if document_key not in selected:
+                selected.append(document_key)
+                self._save()
+
+    def selected_documents(self, user_id, course_id=None):
+        """
+        Documents a user selected, by collection.
+
+        Arguments:
+            user_id: Canvas user id
+            course_id: Only documents of this course, all courses when None
+
+        Returns:
+            dict of collection name to the sorted document names
+        """
+        prefix = self._user_key(user_id, "" if course_id is None else course_id)
+        documents = {}
+        with self._lock:
+            for user_key, selected in self._selections.items():
+                if not (user_key == prefix or (course_id is None and user_key.startswith(prefix))):
+                    continue
+                for document_key in selected:
+                    entry = self._documents.get(document_key)
+                    if entry is not None:
+                        documents.setdefault(entry["collection_name"], set()).add(entry["document_name"])
+        return {collection_name: sorted(names) for collection_name, names in documents.items()}
+
+    def managed_names(self, collection_name):
+        """Names of the course item documents of a collection, the other documents were uploaded directly"""
+        with self._lock:
+            return {document_name for (collection, document_name) in self._names if collection == collection_name}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "selections": sum(len(selected) for selected in self._selections.values()),
+                "users": len({user_key.split("|", 1)[0] for user_key in self._selections}),
+            }
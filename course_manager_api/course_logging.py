@@ -0,0 +1,190 @@
+"""
+Structured, leveled and rate-limited logging for the course manager.
+
+Call sites pass a constant message template with %-style arguments and optional keyword
+fields. Nothing is formatted for records below the configured level. Records that pass are
+handed to a queue, and a background thread renders, redacts and writes them, so request
+handlers never block on stdout. Each message template is rate limited separately. When
+records are dropped, the next record that gets through reports how many were suppressed.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+# Minimum level of emitted records: DEBUG, INFO, WARNING, ERROR
+COURSE_LOG_LEVEL = os.getenv("COURSE_LOG_LEVEL", "INFO").upper()
+# json for one JSON object per line, text for human readable lines
+COURSE_LOG_FORMAT = os.getenv("COURSE_LOG_FORMAT", "json").lower()
+# Records per message template and interval, 0 disables rate limiting
+COURSE_LOG_RATE_LIMIT = int(os.getenv("COURSE_LOG_RATE_LIMIT", 50))
+COURSE_LOG_RATE_INTERVAL = float(os.getenv("COURSE_LOG_RATE_INTERVAL", 10))
+
+_ROOT_LOGGER_NAME = "course_manager"
+
+# Credentials that may appear in messages, e.g. dumped request headers or URLs
+_REDACTIONS = [
+    (re.compile(r"(Bearer\s+)[^\s'\",}]+", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"((?:access_)?token=)[^&\s'\"]+", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"((?:verifier|api_key)=)[^&\s'\"]+", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"(['\"](?:Authorization|Cookie|Set-Cookie)['\"]\s*:\s*['\"])[^'\"]*", re.IGNORECASE), r"\1[REDACTED]"),
+    # Canvas access tokens look like 1234~abcdef...
+    (re.compile(r"\b\d+~[A-Za-z0-9]{20,}\b"), "[REDACTED]"),
+]
+
+
+def redact(text):
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class RateLimitFilter(logging.Filter):
+    """Passes at most `limit` records per message template and interval"""
+
+    def __init__(self, limit=COURSE_LOG_RATE_LIMIT, interval=COURSE_LOG_RATE_INTERVAL):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Arguments are resolved now, while they still hold the values of the call site;
+        # rendering and redaction are left to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """Renders records as JSON lines or text, with credentials redacted"""
+
+    def __init__(self, output_format=COURSE_LOG_FORMAT):
+        super().__init__()
+        self.output_format = output_format
+
+    def format(self, record):
+        fields = dict(getattr(record, "fields", None) or {})
+        if getattr(record, "suppressed", 0):
+            fields["suppressed"] = record.suppressed
+        message = record.getMessage()
+        if self.output_format == "json":
+            entry = {
+                "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": message,
+                **fields,
+            }
+            if record.exc_text:
+                entry["exception"] = record.exc_text
+            return redact(json.dumps(entry, default=str))
+        text = f"{self.formatTime(record, '%Y-%m-%d %H:%M:%S')} {record.levelname} [{record.name}] {message}"
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            text += "\n" + record.exc_text
+        return redact(text)
+
+
+class StructuredLogger:
+    """
+    Thin wrapper over a stdlib logger taking keyword fields, e.g.
+    log.info("Downloaded %s", name, size=size, course_id=course_id)
+    """
+
+    def __init__(self, logger):
+        self._logger = logger
+
+    def is_enabled(self, level):
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level, msg, args, fields, exc_info=False):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, *args, exc_info=exc_info, extra={"fields": fields}, stacklevel=3)
+
+    def debug(self, msg, *args, **fields):
+        self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg, *args, **fields):
+        self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg, *args, exc_info=False, **fields):
+        self._log(logging.WARNING, msg, args, fields, exc_info)
+
+    def error(self, msg, *args, exc_info=False, **fields):
+        self._log(logging.ERROR, msg, args, fields, exc_info)
+
+    def exception(self, msg, *args, **fields):
+        self._log(logging.ERROR, msg, args, fields, True)
+
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+def configure_logging(level=COURSE_LOG_LEVEL, output_format=COURSE_LOG_FORMAT, stream=None):
+    """Route course manager logs through the rate limiter and a background writer, idempotent"""
+    global _listener
+    with _configure_lock:
+        root = logging.getLogger(_ROOT_LOGGER_NAME)
+        if _listener is not None:
+            _listener.stop()
+        root.handlers.clear()
+        root.setLevel(level)
+        root.propagate = False
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(StructuredFormatter(output_format))
+        records = queue.SimpleQueue()
+        handler = _QueueHandler(records)
+        handler.addFilter(RateLimitFilter())
+        root.addHandler(handler)
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+
+
+def flush_logging():
+    """Write out all queued records, e.g. before the process exits"""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+def get_logger(name):
+    if _listener is None:
+        configure_logging()
+    return StructuredLogger(logging.getLogger(f"{_ROOT_LOGGER_NAME}.{name}"))
+
+
+atexit.register(lambda: _listener is not None and _listener.stop())
@@ -0,0 +1,122 @@
+"""
+Aggregate statistics over the downloaded course data.
+
+/metrics/stats used to walk every course_data/{user}/{course} directory and parse each
+file_list.json on every scrape. Instead, the writers of those files report them here, and
+per-course counts plus running totals are kept in memory and in a small index file next to
+the course data, so stats are served without touching the disk.
+"""
+import glob
+import json
+import os
+import threading
+
+from course_logging import get_logger
+
+logger = get_logger("course_stats")
+
+COURSE_DATA_DIR = "course_data"
+# Index of per-course file counts and sizes, rebuilt from the course data when missing
+COURSE_STATS_INDEX_PATH = os.getenv("COURSE_STATS_INDEX_PATH", os.path.join(COURSE_DATA_DIR, ".stats_index.json"))
+
+
+def _file_list_totals(file_list):
+    """Number of files and their total size in bytes of a file_list.json payload"""
+    total_size = 0
+    for file_info in file_list:
+        if isinstance(file_info, dict):
+            try:
+                total_size += int(file_info.get("size", 0) or 0)
+            except (TypeError, ValueError):
+                pass
+    return len(file_list), total_size
+
+
+class CourseStatsIndex:
+    """Per-course file counts and sizes with running totals, persisted to a JSON index"""
+
+    def __init__(self, index_path=COURSE_STATS_INDEX_PATH, data_dir=COURSE_DATA_DIR):
+        self.index_path = index_path
+        self.data_dir = data_dir
+        self._courses = {}
+        self._total_files = 0
+        self._total_size = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(user_id, course_id):
+        return f"{user_id}/{course_id}"
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                self._courses = json.load(f)["courses"]
+        except FileNotFoundError:
+            self.rebuild()
+            return
+        except (ValueError, KeyError) as e:
+            logger.debug("Index %s is unreadable, rebuilding it: %s", self.index_path, e)
+            self.rebuild()
+            return
+        self._total_files = sum(entry["files"] for entry in self._courses.values())
+        self._total_size = sum(entry["size"] for entry in self._courses.values())
+
+    def _save(self):
+        # Written to a temporary file first so a crash never leaves a truncated index
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"courses": self._courses}, f)
+        os.replace(temp_path, self.index_path)
+
+    def rebuild(self):
+        """Recompute the index from the course directories, a full scan of the course data"""
+        courses = {}
+        for course_dir in glob.glob(os.path.join(self.data_dir, "*", "*")):
+            if not os.path.isdir(course_dir):
+                continue
+            user_id, course_id = course_dir.split(os.sep)[-2:]
+            files, size = 0, 0
+            try:
+                with open(os.path.join(course_dir, "file_list.json")) as f:
+                    files, size = _file_list_totals(json.load(f))
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                logger.warning("Skipping unreadable file list in %s: %s", course_dir, e)
+            courses[self._key(user_id, course_id)] = {"files": files, "size": size}
+        with self._lock:
+            self._courses = courses
+            self._total_files = sum(entry["files"] for entry in courses.values())
+            self._total_size = sum(entry["size"] for entry in courses.values())
+            self._save()
+        logger.info("Rebuilt index with %s courses", len(courses))
+
+    def record_course(self, user_id, course_id):
+        """Count a course directory that may not have a file list yet"""
+        key = self._key(user_id, course_id)
+        with self._lock:
+            if key in self._courses:
+                return
+            self._courses[key] = {"files": 0, "size": 0}
+            self._save()
+
+    def record_file_list(self, user_id, course_id, file_list):
+        """Replace the counts of a course after its file_list.json was written"""
+        files, size = _file_list_totals(file_list)
+        key = self._key(user_id, course_id)
+        with self._lock:
+            previous = self._courses.get(key, {"files": 0, "size": 0})
+            self._total_files += files - previous["files"]
+            self._total_size += size - previous["size"]
+            self._courses[key] = {"files": files, "size": size}
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "total_courses": len(self._courses),
+                "total_files": self._total_files,
+                "total_file_size_bytes": self._total_size,
+            }
@@ -0,0 +1,147 @@
+"""
+Learned order of the Canvas file download methods.
+
+download_file_content knows several ways to fetch a file body, and which of them works
+depends on the course's file settings, the file type and the host serving the file. Tried
+one after another, every failing method costs a round trip. Outcomes are recorded per
+course, file type and host, and the method that last succeeded for a combination is tried
+first, followed by the methods with the best success rate overall. The learned winners are
+persisted next to the course data so they survive restarts.
+"""
+import json
+import os
+import threading
+from urllib.parse import urlparse
+
+from prometheus_client import Counter, Histogram
+
+from course_logging import get_logger
+
+logger = get_logger("download_strategy")
+
+COURSE_DATA_DIR = "course_data"
+# Winning download method per course, file type and host
+DOWNLOAD_STRATEGY_PATH = os.getenv("DOWNLOAD_STRATEGY_PATH", os.path.join(COURSE_DATA_DIR, ".download_strategies.json"))
+# Race the two most promising methods, the second starts when the first hasn't finished after DOWNLOAD_HEDGE_DELAY seconds
+DOWNLOAD_HEDGE = os.getenv("DOWNLOAD_HEDGE", "False").lower() in ("true", "1", "yes")
+DOWNLOAD_HEDGE_DELAY = float(os.getenv("DOWNLOAD_HEDGE_DELAY", 2.0))
+
+DOWNLOAD_METHOD_ATTEMPTS = Counter(
+    "course_data_manager_download_method_attempts_total",
+    "Canvas file download attempts by method and outcome",
+    ["method", "outcome"]
+)
+
+DOWNLOAD_METHOD_LATENCY = Histogram(
+    "course_data_manager_download_method_seconds",
+    "Duration of Canvas file download attempts by method and outcome",
+    ["method", "outcome"],
+    buckets=[0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+)
+
+
+def strategy_key(course_id, file_info):
+    """Cache key of a file: its course, file type and the host serving it"""
+    name = file_info.get("display_name") or file_info.get("filename") or ""
+    file_type = os.path.splitext(name)[1].lower().lstrip(".") or file_info.get("content-type") or "unknown"
+    host = urlparse(file_info.get("url") or "").netloc or "canvas"
+    return f"{course_id}|{file_type}|{host}"
+
+
+class DownloadStrategyCache:
+    """Last winning method per strategy key plus success and latency totals per method"""
+
+    def __init__(self, path=DOWNLOAD_STRATEGY_PATH):
+        self.path = path
+        self._winners = {}
+        self._methods = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self._winners = json.load(f)["winners"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable strategy cache %s: %s", self.path, e)
+
+    def _save(self):
+        # Written to a temporary file first so a crash never leaves a truncated cache
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"winners": self._winners}, f)
+        os.replace(temp_path, self.path)
+
+    def _success_rate(self, method):
+        totals = self._methods.get(method)
+        if not totals or not totals["attempts"]:
+            # Untried methods rank between reliable and failing ones
+            return 0.5
+        return totals["successes"] / totals["attempts"]
+
+    def order(self, key, methods):
+        """
+        Order in which to try the given methods for a file.
+
+        Arguments:
+            key: strategy_key of the file
+            methods: method names in their default order
+
+        Returns:
+            The methods with the last winner for the key first, then by success rate
+        """
+        with self._lock:
+            winner = self._winners.get(key)
+            ranked = sorted(methods, key=lambda method: -self._success_rate(method))
+        if winner in ranked:
+            ranked.remove(winner)
+            ranked.insert(0, winner)
+        return ranked
+
+    def record(self, key, method, outcome, seconds):
+        """
+        Record a download attempt.
+
+        Arguments:
+            key: strategy_key of the file
+            method: method name
+            outcome: "success", "failure" or "cancelled" for hedged attempts that lost the race
+            seconds: duration of the attempt
+        """
+        DOWNLOAD_METHOD_ATTEMPTS.labels(method=method, outcome=outcome).inc()
+        DOWNLOAD_METHOD_LATENCY.labels(method=method, outcome=outcome).observe(seconds)
+        if outcome == "cancelled":
+            return
+        with self._lock:
+            totals = self._methods.setdefault(method, {"attempts": 0, "successes": 0, "success_seconds": 0.0})
+            totals["attempts"] += 1
+            if outcome == "success":
+                totals["successes"] += 1
+                totals["success_seconds"] += seconds
+                if self._winners.get(key) == method:
+                    return
+                self._winners[key] = method
+            elif self._winners.get(key) == method:
+                # The winner stopped working, e.g. the course changed its file settings
+                del self._winners[key]
+            else:
+                return
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("Failed to save strategy cache %s: %s", self.path, e)
+
+    def stats(self):
+        """Success rate and mean latency of successful attempts per method"""
+        with self._lock:
+            return {
+                method: {
+                    "attempts": totals["attempts"],
+                    "success_rate": round(totals["successes"] / totals["attempts"], 3),
+                    "mean_success_seconds": round(totals["success_seconds"] / totals["successes"], 3) if totals["successes"] else None,
+                }
+                for method, totals in self._methods.items()
+            }
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, StreamingResponse
+from fastapi.responses import Response, StreamingResponse, FileResponse
 from pydantic import BaseModel, Field
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Counter, Gauge, Histogram, Summary
@@ -16,7 +16,21 @@ import certifi
 import asyncio
 import io
 import mimetypes
+import hashlib
+import time
 import datetime
+from contextlib import asynccontextmanager
+
+from course_logging import get_logger
+
+logger = get_logger("main")
+image_captioning_logger = get_logger("image_captioning")
+canvas_client_logger = get_logger("canvas_client")
+clean_filename_logger = get_logger("clean_filename")
+upload_to_rag_logger = get_logger("upload_to_rag")
+ensure_collection_logger = get_logger("ensure_collection")
+download_course_logger = get_logger("download_course")
+upload_selected_to_rag_logger = get_logger("upload_selected_to_rag")
 
 # Set environment variables for image captioning
 os.environ["APP_NVINGEST_EXTRACTIMAGES"] = "True"
@@ -25,9 +39,9 @@ os.environ["VLM_CAPTION_MODEL_NAME"] = "meta/llama-3.2-11b-vision-instruct"
 os.environ["VLM_USE_LOCAL_SERVICE"] = "False"  # Ensure we're not trying to use a local service
 
 # Log the image captioning configuration
-print(f"[IMAGE_CAPTIONING] Enabled with endpoint: {os.environ.get('VLM_CAPTION_ENDPOINT')}")
-print(f"[IMAGE_CAPTIONING] Model: {os.environ.get('VLM_CAPTION_MODEL_NAME')}")
-print(f"[IMAGE_CAPTIONING] Using local service: {os.environ.get('VLM_USE_LOCAL_SERVICE')}")
+image_captioning_logger.info("Enabled with endpoint: %s", os.environ.get('VLM_CAPTION_ENDPOINT'))
+image_captioning_logger.info("Model: %s", os.environ.get('VLM_CAPTION_MODEL_NAME'))
+image_captioning_logger.info("Using local service: %s", os.environ.get('VLM_USE_LOCAL_SERVICE'))
 
 # Import the module downloader functionality
 from canvas_downloader import (
@@ -35,7 +49,23 @@ from canvas_downloader import (
     download_page_async, 
     download_assignment_async, 
     download_module_item_async,
-    get_course_item_content
+    get_course_item_content,
+    open_file_stream,
+    FileStreamUnavailable,
+    fetch_item_metadata,
+    DOWNLOAD_STRATEGIES,
+    BLOB_STORE,
+    CANVAS_STREAM_CHUNK_BYTES
+)
+from course_stats import CourseStatsIndex
+from course_cache import CourseFileCache
+from course_ingestion import (
+    CourseIngestionIndex,
+    SHARED_ITEM_TYPES,
+    COURSE_COLLECTION,
+    course_collection,
+    item_key,
+    item_version,
 )
 
 # Define Prometheus metrics
@@ -85,6 +115,23 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Running totals behind /metrics/stats, updated whenever a course_info.json or file_list.json is written
+COURSE_STATS = CourseStatsIndex()
+# Parsed course_info.json and file_list.json snapshots, revalidated against the files' mtime
+COURSE_FILES = CourseFileCache()
+# Course items ingested into the knowledge base and the items each user selected
+COURSE_INGESTION = CourseIngestionIndex()
+# Ingestion of an item in progress, by collection, course and item: [lock, holders and waiters]
+_INGESTION_LOCKS = {}
+# Seconds the Canvas user of a token is remembered by /rag_access
+RAG_ACCESS_USER_TTL = float(os.getenv("RAG_ACCESS_USER_TTL", 300))
+# Canvas user id and expiry time by token hash
+_TOKEN_USERS = {}
+# Seconds the document names of a collection listed by the ingestor are reused by /rag_access
+RAG_ACCESS_DOCUMENTS_TTL = float(os.getenv("RAG_ACCESS_DOCUMENTS_TTL", 60))
+# Document names and expiry time by collection, dropped when this service changes the collection
+_COLLECTION_DOCUMENTS = {}
+
 # Define server URLs for RAG and ingestion services
 RAG_SERVER_URL = "http://host.docker.internal:8081"  # For retrieval operations
 INGESTION_SERVER_URL = "http://host.docker.internal:8082"  # For ingestion operations
@@ -108,6 +155,9 @@ class GetCourseContentRequest(BaseModel):
     token: str
     content_type: str  # "course_info" or "file_list" or any other JSON file stored
     user_id: Optional[str] = None
+    # Return only this item of the content, e.g. item_type="quiz" and the quiz id
+    item_id: Optional[str] = None
+    item_type: Optional[str] = None
 
 class DownloadAndUploadRequest(BaseModel):
     url: str
@@ -132,49 +182,53 @@ class UploadSelectedToRAGRequest(BaseModel):
     user_id: str
     selected_items: List[SelectedItem]
 
+class RAGAccessRequest(BaseModel):
+    """Model for the rag_access endpoint request"""
+    token: str
+    user_id: Optional[str] = None
+    course_id: Optional[str] = None  # All courses of the user when missing
+
 class CanvasClient:
     def __init__(self, token):
-        print("[CANVAS_CLIENT] Initializing CanvasClient")
+        canvas_client_logger.debug("Initializing CanvasClient")
         self.token = token
         self.base_url = "https://clemson.instructure.com/api/v1"
         self.headers = {
             "Authorization": f"Bearer {token}"
         }
-        print(f"[CANVAS_CLIENT] Base URL: {self.base_url}")
-        print(f"[CANVAS_CLIENT] Token length: {len(token)}")
-        print(f"[CANVAS_CLIENT] Headers: {self.headers}")
+        canvas_client_logger.debug("Base URL: %s", self.base_url)
+        canvas_client_logger.debug("Token length: %s", len(token))
+        canvas_client_logger.debug("Headers: %s", self.headers)
         
         # Get and cache user ID
-        print("[CANVAS_CLIENT] Getting user ID")
+        canvas_client_logger.debug("Getting user ID")
         self.user_id = self._get_user_id()
-        print(f"[CANVAS_CLIENT] User ID obtained: {self.user_id}")
+        canvas_client_logger.debug("User ID obtained: %s", self.user_id)
     
     def _get_user_id(self):
         """Get the user ID for the current user"""
         url = f"{self.base_url}/users/self"
-        print(f"[CANVAS_CLIENT] Fetching user info from: {url}")
+        canvas_client_logger.debug("Fetching user info from: %s", url)
         
         try:
             response = requests.get(url, headers=self.headers)
-            print(f"[CANVAS_CLIENT] User info response status: {response.status_code}")
+            canvas_client_logger.debug("User info response status: %s", response.status_code)
             
             if response.status_code != 200:
                 error_text = response.text
-                print(f"[CANVAS_CLIENT] Failed to get user info: {error_text}")
+                canvas_client_logger.warning("Failed to get user info: %s", error_text)
                 raise Exception(f"Failed to get user info: {error_text}")
             
             user_data = response.json()
-            print(f"[CANVAS_CLIENT] User data keys: {list(user_data.keys())}")
+            canvas_client_logger.debug("User data keys: %s", list(user_data.keys()))
             user_id = user_data.get("id")
             
             if not user_id:
-                print(f"[CANVAS_CLIENT] WARNING: No user ID found in response: {user_data}")
+                canvas_client_logger.warning("No user ID found in response: %s", user_data)
             
             return user_id
         except Exception as e:
-            print(f"[CANVAS_CLIENT] EXCEPTION in _get_user_id: {str(e)}")
-            import traceback
-            print(f"[CANVAS_CLIENT] Traceback: {traceback.format_exc()}")
+            canvas_client_logger.error("Exception in _get_user_id: %s", e, exc_info=True)
             raise
     
     def get_courses(self):
@@ -184,29 +238,27 @@ class CanvasClient:
             "enrollment_state": "active",
             "per_page": 100
         }
-        print(f"[CANVAS_CLIENT] Fetching courses from: {url} with params: {params}")
+        canvas_client_logger.debug("Fetching courses from: %s with params: %s", url, params)
         
         try:
             response = requests.get(url, headers=self.headers, params=params)
-            print(f"[CANVAS_CLIENT] Courses response status: {response.status_code}")
+            canvas_client_logger.debug("Courses response status: %s", response.status_code)
             
             if response.status_code != 200:
                 error_text = response.text
-                print(f"[CANVAS_CLIENT] Failed to get courses: {error_text}")
+                canvas_client_logger.warning("Failed to get courses: %s", error_text)
                 raise Exception(f"Failed to get courses: {error_text}")
             
             courses = response.json()
-            print(f"[CANVAS_CLIENT] Retrieved {len(courses)} courses")
+            canvas_client_logger.info("Retrieved %s courses", len(courses))
             return courses
         except Exception as e:
-            print(f"[CANVAS_CLIENT] EXCEPTION in get_courses: {str(e)}")
-            import traceback
-            print(f"[CANVAS_CLIENT] Traceback: {traceback.format_exc()}")
+            canvas_client_logger.error("Exception in get_courses: %s", e, exc_info=True)
             raise
     
     def get_course_materials(self, course_id):
         """Get materials for a specific course"""
-        print(f"[CANVAS_CLIENT] Starting get_course_materials for course_id={course_id}")
+        canvas_client_logger.info("Starting get_course_materials for course_id=%s", course_id)
         result = {}
         
         try:
@@ -216,39 +268,37 @@ class CanvasClient:
                 "include": ["items"],
                 "per_page": 100
             }
-            print(f"[CANVAS_CLIENT] Fetching modules from: {modules_url} with params: {params}")
+            canvas_client_logger.debug("Fetching modules from: %s with params: %s", modules_url, params)
             
             try:
                 modules_response = requests.get(modules_url, headers=self.headers, params=params)
-                print(f"[CANVAS_CLIENT] Modules response status: {modules_response.status_code}")
+                canvas_client_logger.debug("Modules response status: %s", modules_response.status_code)
                 
                 if modules_response.status_code == 200:
                     modules_data = modules_response.json()
-                    print(f"[CANVAS_CLIENT] Retrieved {len(modules_data)} modules")
+                    canvas_client_logger.info("Retrieved %s modules", len(modules_data))
                     
                     # Log module structure to understand what we're getting
                     if len(modules_data) > 0:
                         sample_module = modules_data[0]
-                        print(f"[CANVAS_CLIENT] Sample module keys: {list(sample_module.keys())}")
+                        canvas_client_logger.debug("Sample module keys: %s", list(sample_module.keys()))
                         
                         # Log items in the first module for debugging
                         if 'items' in sample_module and len(sample_module['items']) > 0:
-                            print(f"[CANVAS_CLIENT] Module contains {len(sample_module['items'])} items")
+                            canvas_client_logger.debug("Module contains %s items", len(sample_module['items']))
                             sample_item = sample_module['items'][0]
-                            print(f"[CANVAS_CLIENT] Sample module item keys: {list(sample_item.keys())}")
-                            print(f"[CANVAS_CLIENT] Sample module item: {sample_item}")
+                            canvas_client_logger.debug("Sample module item keys: %s", list(sample_item.keys()))
+                            canvas_client_logger.debug("Sample module item: %s", sample_item)
                     
                     result["modules"] = modules_data
                 else:
                     error_text = modules_response.text
-                    print(f"[CANVAS_CLIENT] Failed to get modules: {error_text}")
+                    canvas_client_logger.warning("Failed to get modules: %s", error_text)
                     # Continue with other API calls but record the error
                     result["modules"] = []
                     result["modules_error"] = f"Status code: {modules_response.status_code}, Error: {error_text}"
             except Exception as modules_error:
-                print(f"[CANVAS_CLIENT] ERROR fetching modules: {str(modules_error)}")
-                import traceback
-                print(f"[CANVAS_CLIENT] Modules traceback: {traceback.format_exc()}")
+                canvas_client_logger.error("Error fetching modules: %s", modules_error, exc_info=True)
                 # Continue with other API calls but record the error
                 result["modules"] = []
                 result["modules_error"] = str(modules_error)
@@ -258,34 +308,32 @@ class CanvasClient:
             files_params = {
                 "per_page": 100
             }
-            print(f"[CANVAS_CLIENT] Fetching files from: {files_url} with params: {files_params}")
+            canvas_client_logger.debug("Fetching files from: %s with params: %s", files_url, files_params)
             
             try:
                 files_response = requests.get(files_url, headers=self.headers, params=files_params)
-                print(f"[CANVAS_CLIENT] Files response status: {files_response.status_code}")
+                canvas_client_logger.debug("Files response status: %s", files_response.status_code)
                 
                 if files_response.status_code == 200:
                     files_data = files_response.json()
-                    print(f"[CANVAS_CLIENT] Retrieved {len(files_data)} files")
+                    canvas_client_logger.info("Retrieved %s files", len(files_data))
                     
                     # Log file structure
                     if len(files_data) > 0:
                         sample_file = files_data[0]
-                        print(f"[CANVAS_CLIENT] Sample file keys: {list(sample_file.keys())}")
-                        print(f"[CANVAS_CLIENT] Sample file: id={sample_file.get('id')}, name={sample_file.get('display_name')}, type={sample_file.get('content-type')}")
-                        print(f"[CANVAS_CLIENT] Sample file has URL: {'url' in sample_file}")
+                        canvas_client_logger.debug("Sample file keys: %s", list(sample_file.keys()))
+                        canvas_client_logger.debug("Sample file: id=%s, name=%s, type=%s", sample_file.get('id'), sample_file.get('display_name'), sample_file.get('content-type'))
+                        canvas_client_logger.debug("Sample file has URL: %s", 'url' in sample_file)
                     
                     result["files"] = files_data
                 else:
                     error_text = files_response.text
-                    print(f"[CANVAS_CLIENT] Failed to get files: {error_text}")
+                    canvas_client_logger.warning("Failed to get files: %s", error_text)
                     # Continue with other API calls but record the error
                     result["files"] = []
                     result["files_error"] = f"Status code: {files_response.status_code}, Error: {error_text}"
             except Exception as files_error:
-                print(f"[CANVAS_CLIENT] ERROR fetching files: {str(files_error)}")
-                import traceback
-                print(f"[CANVAS_CLIENT] Files traceback: {traceback.format_exc()}")
+                canvas_client_logger.error("Error fetching files: %s", files_error, exc_info=True)
                 # Continue with other API calls but record the error
                 result["files"] = []
                 result["files_error"] = str(files_error)
@@ -295,39 +343,37 @@ class CanvasClient:
             pages_params = {
                 "per_page": 100
             }
-            print(f"[CANVAS_CLIENT] Fetching pages from: {pages_url} with params: {pages_params}")
+            canvas_client_logger.debug("Fetching pages from: %s with params: %s", pages_url, pages_params)
             
             try:
                 pages_response = requests.get(pages_url, headers=self.headers, params=pages_params)
                 pages_status = pages_response.status_code
-                print(f"[CANVAS_CLIENT] Pages response status: {pages_status}")
+                canvas_client_logger.debug("Pages response status: %s", pages_status)
                 
                 # Check specifically for no pages, which might return 404 or empty list
                 if pages_status == 200:
                     pages_data = pages_response.json()
-                    print(f"[CANVAS_CLIENT] Retrieved {len(pages_data)} pages")
+                    canvas_client_logger.info("Retrieved %s pages", len(pages_data))
                     
                     # Log page structure
                     if len(pages_data) > 0:
                         sample_page = pages_data[0]
-                        print(f"[CANVAS_CLIENT] Sample page keys: {list(sample_page.keys())}")
+                        canvas_client_logger.debug("Sample page keys: %s", list(sample_page.keys()))
                     
                     result["pages"] = pages_data
                 elif pages_status == 404:
                     # This course doesn't have pages feature enabled
-                    print(f"[CANVAS_CLIENT] Pages feature not enabled for this course (404)")
+                    canvas_client_logger.debug("Pages feature not enabled for this course (404)")
                     result["pages"] = []
                     result["pages_error"] = "Pages feature not enabled for this course"
                 else:
                     error_text = pages_response.text
-                    print(f"[CANVAS_CLIENT] Failed to get pages: {error_text}")
+                    canvas_client_logger.warning("Failed to get pages: %s", error_text)
                     # Continue with other API calls but record the error
                     result["pages"] = []
                     result["pages_error"] = f"Status code: {pages_status}, Error: {error_text}"
             except Exception as pages_error:
-                print(f"[CANVAS_CLIENT] ERROR fetching pages: {str(pages_error)}")
-                import traceback
-                print(f"[CANVAS_CLIENT] Pages traceback: {traceback.format_exc()}")
+                canvas_client_logger.error("Error fetching pages: %s", pages_error, exc_info=True)
                 # Continue with other API calls but record the error
                 result["pages"] = []
                 result["pages_error"] = str(pages_error)
@@ -337,37 +383,35 @@ class CanvasClient:
             assignments_params = {
                 "per_page": 100
             }
-            print(f"[CANVAS_CLIENT] Fetching assignments from: {assignments_url} with params: {assignments_params}")
+            canvas_client_logger.debug("Fetching assignments from: %s with params: %s", assignments_url, assignments_params)
             
             try:
                 assignments_response = requests.get(assignments_url, headers=self.headers, params=assignments_params)
                 assignments_status = assignments_response.status_code
-                print(f"[CANVAS_CLIENT] Assignments response status: {assignments_status}")
+                canvas_client_logger.debug("Assignments response status: %s", assignments_status)
                 
                 if assignments_status == 200:
                     assignments_data = assignments_response.json()
-                    print(f"[CANVAS_CLIENT] Retrieved {len(assignments_data)} assignments")
+                    canvas_client_logger.info("Retrieved %s assignments", len(assignments_data))
                     result["assignments"] = assignments_data
                 elif assignments_status == 401:
                     # Unauthorized - maybe the course is inactive or user doesn't have access
-                    print(f"[CANVAS_CLIENT] Unauthorized access to assignments (401)")
+                    canvas_client_logger.warning("Unauthorized access to assignments (401)")
                     result["assignments"] = []
                     result["assignments_error"] = "Unauthorized access to assignments"
                 elif assignments_status == 404:
                     # This course doesn't have assignments feature enabled
-                    print(f"[CANVAS_CLIENT] Assignments feature not enabled for this course (404)")
+                    canvas_client_logger.debug("Assignments feature not enabled for this course (404)")
                     result["assignments"] = []
                     result["assignments_error"] = "Assignments feature not enabled for this course"
                 else:
                     error_text = assignments_response.text
-                    print(f"[CANVAS_CLIENT] Failed to get assignments: {error_text}")
+                    canvas_client_logger.warning("Failed to get assignments: %s", error_text)
                     # Continue with other API calls but record the error
                     result["assignments"] = []
                     result["assignments_error"] = f"Status code: {assignments_status}, Error: {error_text}"
             except Exception as assignments_error:
-                print(f"[CANVAS_CLIENT] ERROR fetching assignments: {str(assignments_error)}")
-                import traceback
-                print(f"[CANVAS_CLIENT] Assignments traceback: {traceback.format_exc()}")
+                canvas_client_logger.error("Error fetching assignments: %s", assignments_error, exc_info=True)
                 result["assignments"] = []
                 result["assignments_error"] = str(assignments_error)
             
@@ -376,37 +420,35 @@ class CanvasClient:
             quizzes_params = {
                 "per_page": 100
             }
-            print(f"[CANVAS_CLIENT] Fetching quizzes from: {quizzes_url} with params: {quizzes_params}")
+            canvas_client_logger.debug("Fetching quizzes from: %s with params: %s", quizzes_url, quizzes_params)
             
             try:
                 quizzes_response = requests.get(quizzes_url, headers=self.headers, params=quizzes_params)
                 quizzes_status = quizzes_response.status_code
-                print(f"[CANVAS_CLIENT] Quizzes response status: {quizzes_status}")
+                canvas_client_logger.debug("Quizzes response status: %s", quizzes_status)
                 
                 if quizzes_status == 200:
                     quizzes_data = quizzes_response.json()
-                    print(f"[CANVAS_CLIENT] Retrieved {len(quizzes_data)} quizzes")
+                    canvas_client_logger.info("Retrieved %s quizzes", len(quizzes_data))
                     result["quizzes"] = quizzes_data
                 elif quizzes_status == 401:
                     # Unauthorized - maybe the course is inactive or user doesn't have access
-                    print(f"[CANVAS_CLIENT] Unauthorized access to quizzes (401)")
+                    canvas_client_logger.warning("Unauthorized access to quizzes (401)")
                     result["quizzes"] = []
                     result["quizzes_error"] = "Unauthorized access to quizzes"
                 elif quizzes_status == 404:
                     # This course doesn't have quizzes feature enabled
-                    print(f"[CANVAS_CLIENT] Quizzes feature not enabled for this course (404)")
+                    canvas_client_logger.debug("Quizzes feature not enabled for this course (404)")
                     result["quizzes"] = []
                     result["quizzes_error"] = "Quizzes feature not enabled for this course"
                 else:
                     error_text = quizzes_response.text
-                    print(f"[CANVAS_CLIENT] Failed to get quizzes: {error_text}")
+                    canvas_client_logger.warning("Failed to get quizzes: %s", error_text)
                     # Continue with other API calls but record the error
                     result["quizzes"] = []
                     result["quizzes_error"] = f"Status code: {quizzes_status}, Error: {error_text}"
             except Exception as quizzes_error:
-                print(f"[CANVAS_CLIENT] ERROR fetching quizzes: {str(quizzes_error)}")
-                import traceback
-                print(f"[CANVAS_CLIENT] Quizzes traceback: {traceback.format_exc()}")
+                canvas_client_logger.error("Error fetching quizzes: %s", quizzes_error, exc_info=True)
                 result["quizzes"] = []
                 result["quizzes_error"] = str(quizzes_error)
             
@@ -415,40 +457,38 @@ class CanvasClient:
             discussions_params = {
                 "per_page": 100
             }
-            print(f"[CANVAS_CLIENT] Fetching discussion topics from: {discussions_url} with params: {discussions_params}")
+            canvas_client_logger.debug("Fetching discussion topics from: %s with params: %s", discussions_url, discussions_params)
             
             try:
                 discussions_response = requests.get(discussions_url, headers=self.headers, params=discussions_params)
                 discussions_status = discussions_response.status_code
-                print(f"[CANVAS_CLIENT] Discussions response status: {discussions_status}")
+                canvas_client_logger.debug("Discussions response status: %s", discussions_status)
                 
                 if discussions_status == 200:
                     discussions_data = discussions_response.json()
-                    print(f"[CANVAS_CLIENT] Retrieved {len(discussions_data)} discussion topics")
+                    canvas_client_logger.info("Retrieved %s discussion topics", len(discussions_data))
                     result["discussions"] = discussions_data
                 elif discussions_status in [401, 403, 404]:
                     # This course might not have discussions enabled or accessible
-                    print(f"[CANVAS_CLIENT] Discussions feature not available: {discussions_status}")
+                    canvas_client_logger.debug("Discussions feature not available: %s", discussions_status)
                     result["discussions"] = []
                     result["discussions_error"] = f"Discussions feature not available: {discussions_status}"
                 else:
                     error_text = discussions_response.text
-                    print(f"[CANVAS_CLIENT] Failed to get discussions: {error_text}")
+                    canvas_client_logger.warning("Failed to get discussions: %s", error_text)
                     result["discussions"] = []
                     result["discussions_error"] = f"Status code: {discussions_status}, Error: {error_text}"
             except Exception as discussions_error:
-                print(f"[CANVAS_CLIENT] ERROR fetching discussions: {str(discussions_error)}")
+                canvas_client_logger.error("Error fetching discussions: %s", discussions_error)
                 result["discussions"] = []
                 result["discussions_error"] = str(discussions_error)
             
-            print(f"[CANVAS_CLIENT] Completed get_course_materials for course_id={course_id}")
+            canvas_client_logger.info("Completed get_course_materials for course_id=%s", course_id)
             # Return the result even if some components failed
             return result
             
         except Exception as e:
-            print(f"[CANVAS_CLIENT] FATAL ERROR in get_course_materials: {str(e)}")
-            import traceback
-            print(f"[CANVAS_CLIENT] Traceback: {traceback.format_exc()}")
+            canvas_client_logger.error("Fatal error in get_course_materials: %s", e, exc_info=True)
             # Create minimal valid result rather than failing completely
             return {
                 "modules": [],
@@ -491,7 +531,7 @@ def clean_filename(filename):
             if ext + '.html' in lower_name:
                 # Replace just the .html at the end of the extension
                 cleaned_name = filename.replace(ext + '.html', ext)
-                print(f"[CLEAN_FILENAME] Cleaned double extension: {filename} -> {cleaned_name}")
+                clean_filename_logger.debug("Cleaned double extension: %s -> %s", filename, cleaned_name)
                 return cleaned_name
     
     # Also handle the case where brackets or special characters got into filenames
@@ -505,174 +545,406 @@ def clean_filename(filename):
             from urllib.parse import unquote
             decoded = unquote(cleaned)
             if decoded != cleaned:
-                print(f"[CLEAN_FILENAME] URL decoded: {cleaned} -> {decoded}")
+                clean_filename_logger.debug("URL decoded: %s -> %s", cleaned, decoded)
                 cleaned = decoded
         except:
             pass
             
     return cleaned
             
+# Number of leading bytes inspected to identify the content of an upload
+SNIFF_BYTES = 64
+
+def sniff_content_type(first_bytes):
+    """Content type identified by the magic bytes at the start of a document, None when unknown"""
+    # Check for PDF
+    if first_bytes.startswith(b'%PDF-'):
+        return 'application/pdf'
+    # Check for HTML
+    if first_bytes.startswith(b'<!DOCTYPE') or b'<html' in first_bytes:
+        return 'text/html'
+    # Check for XML
+    if first_bytes.startswith(b'<?xml'):
+        return 'application/xml'
+    # Check for JPEG
+    if first_bytes.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    # Check for PNG
+    if first_bytes.startswith(b'\x89PNG'):
+        return 'image/png'
+    # Check for GIF
+    if first_bytes.startswith(b'GIF87a') or first_bytes.startswith(b'GIF89a'):
+        return 'image/gif'
+    return None
+
+def document_filename(item_name, content_type):
+    """Name of a Canvas item in the knowledge base, with the extension matching its content"""
+    item_name = clean_filename(item_name)
+    base_name, name_ext = os.path.splitext(item_name)
+    name_ext = name_ext.lower()
+    if content_type == 'application/pdf':
+        # If it's actually a PDF, always use .pdf extension
+        return item_name if name_ext == '.pdf' else f"{base_name}.pdf"
+    if content_type and content_type.startswith('image/'):
+        # For image files, ensure they have the right extension
+        correct_ext = '.' + content_type.split('/', 1)[1]
+        return item_name if name_ext == correct_ext else f"{base_name}{correct_ext}"
+    if content_type == 'text/html':
+        # If content is HTML, use .html extension, but avoid double extensions
+        if name_ext == '.html':
+            return item_name
+        if name_ext and '.html' in name_ext:
+            # Has something like .pdf.html - remove the .html part
+            return item_name.lower().replace('.html', '')
+        return f"{item_name}.html"
+    # Not HTML content, use original name with extension
+    return item_name
+
+def ingestor_mime_type(file_name, content_type=None):
+    """Mime type sent to the ingestor, the detected content type takes precedence over the file name"""
+    if content_type:
+        return content_type
+    mime_type, _ = mimetypes.guess_type(file_name)
+    if mime_type:
+        return mime_type
+    # Otherwise fallback to extension-based detection
+    if file_name.endswith('.html'):
+        return 'text/html'
+    if file_name.endswith('.pdf'):
+        return 'application/pdf'
+    if file_name.endswith('.jpeg') or file_name.endswith('.jpg'):
+        return 'image/jpeg'
+    if file_name.endswith('.png'):
+        return 'image/png'
+    if file_name.endswith('.gif'):
+        return 'image/gif'
+    return 'application/octet-stream'
+
+async def post_document_to_rag(document, file_name, mime_type, collection_name="default", replace=False):
+    """
+    Send one document to the ingestor's /v1/documents endpoint.
+
+    Arguments:
+        document: bytes, an open binary file or an async iterator of byte chunks; iterators are
+            sent with chunked transfer encoding as they are consumed
+        file_name: Name of the document in the collection
+        mime_type: Content type of the document part
+        collection_name: Collection to ingest into, created when missing
+        replace: Replace a document of the same name (PATCH) instead of failing
+
+    Returns:
+        dict with the status and collection name
+    """
+    if mime_type.startswith('image/'):
+        # Images are passed to the ingestor with image captioning enabled, the VLM model
+        # extracts meaningful content from them
+        upload_to_rag_logger.debug("Detected image file, enabling image captioning")
+    upload_to_rag_logger.debug("Using mime type: %s", mime_type)
+
+    # Check if collection exists, if not create it
+    await ensure_collection_exists(collection_name)
+
+    # Create form data for request, including extraction and split options
+    form_data = aiohttp.FormData()
+    form_data.add_field("documents", document, filename=file_name, content_type=mime_type)
+
+    # Standard extraction options with image captioning enabled
+    data = {
+        "collection_name": collection_name,
+        "extraction_options": {
+            "extract_text": True,
+            "extract_tables": True,
+            "extract_charts": True,
+            "extract_images": True,  # Enable image extraction
+            "caption_images": True,  # Enable image captioning for embedded images
+            "extract_method": "pdfium",
+            "text_depth": "page",
+            "skip_image_extraction": False  # Don't skip image extraction
+        },
+        "split_options": {
+            "chunk_size": 1024,
+            "chunk_overlap": 150
+        }
+    }
+    form_data.add_field("data", json.dumps(data), content_type="application/json")
+
+    # Use the INGESTION API endpoint for document upload
+    url = f"{INGESTION_SERVER_URL}/v1/documents"
+    upload_to_rag_logger.debug("Sending request to: %s", url)
+
+    # Set a longer timeout for larger files
+    async with aiohttp.ClientSession() as session:
+        async with session.request("PATCH" if replace else "POST", url, data=form_data, timeout=600) as response:
+            upload_to_rag_logger.debug("Response status: %s", response.status)
+            response_text = await response.text()
+            if response.status != 200:
+                upload_to_rag_logger.warning("Upload failed: %s", response_text)
+                UPLOADS_TO_RAG.labels(status="error_rag_server").inc()
+                raise Exception(f"Failed to upload to RAG: {response_text}")
+            _COLLECTION_DOCUMENTS.pop(collection_name, None)
+            upload_to_rag_logger.info("Upload successful", file_name=file_name, collection=collection_name)
+            upload_to_rag_logger.debug("Ingestor response: %s", response_text)
+            UPLOADS_TO_RAG.labels(status="success").inc()
+            return {"status": "success", "collection_name": collection_name}
+
 async def upload_to_rag(file_path, file_name, collection_name="default"):
     """Upload a file to the RAG server using NVIDIA's new approach for knowledge base management"""
     # Clean the filename first
     file_name = clean_filename(file_name)
-    print(f"[UPLOAD_TO_RAG] Starting upload for {file_name} from {file_path} to collection: {collection_name}")
+    upload_to_rag_logger.info("Starting upload for %s from %s to collection: %s", file_name, file_path, collection_name)
     
     try:
         # Check if file exists and has content
         if not os.path.exists(file_path):
-            print(f"[UPLOAD_TO_RAG] ERROR: File {file_path} does not exist!")
+            upload_to_rag_logger.error("File %s does not exist!", file_path)
             UPLOADS_TO_RAG.labels(status="error_file_not_found").inc()
             raise FileNotFoundError(f"File {file_path} does not exist")
             
         file_size = os.path.getsize(file_path)
-        print(f"[UPLOAD_TO_RAG] File size: {file_size} bytes")
+        upload_to_rag_logger.debug("File size: %s bytes", file_size)
         
         # Record file size metrics
         if file_size > 0:
             FILE_SIZES.observe(file_size)
         
         if file_size == 0:
-            print(f"[UPLOAD_TO_RAG] ERROR: File is empty (0 bytes)")
+            upload_to_rag_logger.error("File is empty (0 bytes)")
             UPLOADS_TO_RAG.labels(status="error_empty_file").inc()
             raise ValueError("File is empty")
             
-        # We already cleaned the filename at the function start, but let's also check content
         # Try to determine the content type from file data (magic bytes)
         content_type_from_bytes = None
         try:
             with open(file_path, 'rb') as f:
-                first_bytes = f.read(8)  # Read first few bytes
-                
-                # Check for PDF
-                if first_bytes.startswith(b'%PDF-'):
-                    content_type_from_bytes = 'application/pdf'
-                    print(f"[UPLOAD_TO_RAG] Content identified as PDF based on magic bytes")
-                # Check for HTML
-                elif first_bytes.startswith(b'<!DOCTYPE') or b'<html' in first_bytes:
-                    content_type_from_bytes = 'text/html'
-                    print(f"[UPLOAD_TO_RAG] Content identified as HTML based on content")
-                # Check for XML
-                elif first_bytes.startswith(b'<?xml'):
-                    content_type_from_bytes = 'application/xml'
-                    print(f"[UPLOAD_TO_RAG] Content identified as XML based on content")
-                # Check for JPEG
-                elif first_bytes.startswith(b'\xff\xd8\xff'):
-                    content_type_from_bytes = 'image/jpeg'
-                    print(f"[UPLOAD_TO_RAG] Content identified as JPEG image based on magic bytes")
-                # Check for PNG
-                elif first_bytes.startswith(b'\x89PNG'):
-                    content_type_from_bytes = 'image/png'
-                    print(f"[UPLOAD_TO_RAG] Content identified as PNG image based on magic bytes")
-                # Check for GIF
-                elif first_bytes.startswith(b'GIF87a') or first_bytes.startswith(b'GIF89a'):
-                    content_type_from_bytes = 'image/gif'
-                    print(f"[UPLOAD_TO_RAG] Content identified as GIF image based on magic bytes")
-                    
-                # Reset file position
-                f.seek(0)
+                content_type_from_bytes = sniff_content_type(f.read(SNIFF_BYTES))
+            upload_to_rag_logger.debug("Content type from magic bytes: %s", content_type_from_bytes)
         except Exception as e:
-            print(f"[UPLOAD_TO_RAG] Warning: Failed to detect content type from bytes: {str(e)}")
-            
-        # Determine mime type based on the cleaned file name
-        mime_type, _ = mimetypes.guess_type(file_name)
-        
-        # If we detected a content type from bytes, it takes precedence
-        if content_type_from_bytes:
-            mime_type = content_type_from_bytes
-        # Otherwise fallback to extension-based detection
-        elif not mime_type:
-            if file_name.endswith('.html'):
-                mime_type = 'text/html'
-            elif file_name.endswith('.pdf'):
-                mime_type = 'application/pdf'
-            elif file_name.endswith('.jpeg') or file_name.endswith('.jpg'):
-                mime_type = 'image/jpeg'
-            elif file_name.endswith('.png'):
-                mime_type = 'image/png'
-            elif file_name.endswith('.gif'):
-                mime_type = 'image/gif'
-            else:
-                mime_type = 'application/octet-stream'
-        
-        # Determine if this is an image file
-        is_image = mime_type and mime_type.startswith('image/')
-        
-        print(f"[UPLOAD_TO_RAG] Using mime type: {mime_type}")
-        
-        # Check if collection exists, if not create it
-        await ensure_collection_exists(collection_name)
-        
-        # Create form data for request, including extraction and split options
-        form_data = aiohttp.FormData()
-        form_data.add_field("documents", open(file_path, 'rb'), filename=file_name, content_type=mime_type)
-        
-        # Add options as JSON data
-        if is_image:
-            # Special handling for image files with image captioning enabled
-            print(f"[UPLOAD_TO_RAG] Detected image file, enabling image captioning")
+            upload_to_rag_logger.warning("Failed to detect content type from bytes: %s", e)
             
-            # We will now pass the image directly to the RAG server with image captioning enabled
-            # This enables the VLM model to extract meaningful content from the images
-            # No need to create a text description file as the image captioning service will handle it
-        
-        # Standard extraction options with image captioning enabled
-        data = {
-            "collection_name": collection_name,
-            "extraction_options": {
-                "extract_text": True,
-                "extract_tables": True,
-                "extract_charts": True,
-                "extract_images": True,  # Enable image extraction
-                "caption_images": True,  # Enable image captioning for embedded images
-                "extract_method": "pdfium",
-                "text_depth": "page",
-                "skip_image_extraction": False  # Don't skip image extraction
-            },
-            "split_options": {
-                "chunk_size": 1024,
-                "chunk_overlap": 150
-            }
-        }
-        form_data.add_field("data", json.dumps(data), content_type="application/json")
-        
-        # Use the INGESTION API endpoint for document upload
-        url = f"{INGESTION_SERVER_URL}/v1/documents"
-        print(f"[UPLOAD_TO_RAG] Sending request to: {url}")
-        
-        # Set a longer timeout for larger files
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=form_data, timeout=600) as response:
-                print(f"[UPLOAD_TO_RAG] Response status: {response.status}")
-                if response.status == 200:
-                    response_text = await response.text()
-                    print(f"[UPLOAD_TO_RAG] Upload successful: {response_text}")
-                    UPLOADS_TO_RAG.labels(status="success").inc()
-                    
-                    # Clean up the text description file if it was created for an image
-                    if is_image and file_path.endswith('.txt') and os.path.exists(temp_file_path):
-                        try:
-                            # Clean up both the original image and text description
-                            if os.path.exists(temp_file_path):
-                                print(f"[UPLOAD_TO_RAG] Removing temporary image file: {temp_file_path}")
-                                os.remove(temp_file_path)
-                        except Exception as cleanup_error:
-                            print(f"[UPLOAD_TO_RAG] Warning: Failed to clean up temp files: {str(cleanup_error)}")
-                    
-                    return {"status": "success", "collection_name": collection_name}
-                else:
-                    response_text = await response.text()
-                    print(f"[UPLOAD_TO_RAG] Upload failed: {response_text}")
-                    UPLOADS_TO_RAG.labels(status="error_rag_server").inc()
-                    raise Exception(f"Failed to upload to RAG: {response_text}")
+        mime_type = ingestor_mime_type(file_name, content_type_from_bytes)
+        with open(file_path, 'rb') as document:
+            return await post_document_to_rag(document, file_name, mime_type, collection_name)
                 
     except Exception as e:
-        print(f"[UPLOAD_TO_RAG] EXCEPTION: Error uploading file {file_name} to RAG: {str(e)}")
+        upload_to_rag_logger.error("Error uploading file %s to RAG: %s", file_name, e)
         UPLOADS_TO_RAG.labels(status="error_exception").inc()
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Traceback")
         raise e
 
+async def upload_stream_to_rag(content, item_name, collection_name="default", resolve_name=None, replace=False):
+    """
+    Upload a Canvas item to the RAG server as its content arrives, without a temporary file.
+
+    The first SNIFF_BYTES are buffered to identify the content and pick the file name and mime
+    type of the multipart part, then the chunks are piped into the request body as they are
+    read, so at most one chunk of the item is held in memory.
+
+    Arguments:
+        content: bytes, or an async iterator of byte chunks such as a streamed Canvas download
+        item_name: Name of the item, its extension is corrected to match the content
+        collection_name: Collection to ingest into
+        resolve_name: Optional function from the file name picked for the content to the name
+            of the document in the collection
+        replace: Replace a document of the same name, see post_document_to_rag
+
+    Returns:
+        dict with the status, collection name, final file name and uploaded size in bytes
+    """
+    if isinstance(content, (bytes, bytearray)):
+        chunks = _single_chunk(bytes(content))
+    else:
+        chunks = content.__aiter__()
+
+    # Collect the leading bytes, a stream may deliver them over several chunks
+    head = b""
+    try:
+        while len(head) < SNIFF_BYTES:
+            head += await chunks.__anext__()
+    except StopAsyncIteration:
+        pass
+    if not head:
+        UPLOADS_TO_RAG.labels(status="error_empty_file").inc()
+        raise ValueError("Downloaded content is empty")
+
+    content_type = sniff_content_type(head)
+    file_name = document_filename(item_name, content_type)
+    mime_type = ingestor_mime_type(file_name, content_type)
+    if resolve_name is not None:
+        file_name = resolve_name(file_name)
+    upload_to_rag_logger.info("Starting streamed upload for %s to collection: %s", file_name, collection_name)
+
+    uploaded = 0
+
+    async def body():
+        nonlocal uploaded
+        uploaded += len(head)
+        yield head
+        async for chunk in chunks:
+            uploaded += len(chunk)
+            yield chunk
+
+    try:
+        result = await post_document_to_rag(body(), file_name, mime_type, collection_name, replace)
+    except Exception as e:
+        upload_to_rag_logger.error("Error uploading %s to RAG after %s bytes: %s", file_name, uploaded, e)
+        UPLOADS_TO_RAG.labels(status="error_exception").inc()
+        raise
+    FILE_SIZES.observe(uploaded)
+    return {**result, "file_name": file_name, "size": uploaded}
+
+async def _single_chunk(content):
+    yield content
+
+async def _file_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CANVAS_STREAM_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+async def upload_item_to_rag(course_id, item_id, item_type, item_name, token, collection_name="default", **upload_options):
+    """
+    Fetch a Canvas item and upload it to the RAG server.
+
+    Files are streamed from Canvas into the ingestor request. When Canvas doesn't serve a
+    file directly, and for the other item types that are rendered to HTML, the content is
+    fetched with get_course_item_content and uploaded from memory. upload_options are
+    passed on to upload_stream_to_rag.
+
+    Returns:
+        The result of upload_stream_to_rag
+    """
+    if item_type.lower() == 'file':
+        try:
+            async with open_file_stream(course_id, item_id, token) as (file_info, chunks):
+                upload_selected_to_rag_logger.debug("Streaming %s (%s bytes) from Canvas", item_name, file_info.get("size"))
+                return await upload_stream_to_rag(chunks, item_name, collection_name, **upload_options)
+        except FileStreamUnavailable as e:
+            upload_selected_to_rag_logger.warning("Streaming unavailable for file %s, downloading it first: %s", item_id, e)
+
+    upload_selected_to_rag_logger.debug("Fetching content from Canvas for item: %s (type: %s, id: %s)", item_name, item_type, item_id)
+    response = await get_course_item_content(
+        course_id=course_id,
+        item_id=item_id,
+        item_type=item_type,
+        token=token
+    )
+    if isinstance(response, FileResponse):
+        # Files from the shared store and large downloads are on disk, upload them from there
+        try:
+            return await upload_stream_to_rag(_file_chunks(response.path), item_name, collection_name, **upload_options)
+        finally:
+            # Run the clean up that would follow sending the response
+            if response.background is not None:
+                await response.background()
+    if isinstance(response, str):
+        content = response.encode('utf-8')
+    elif isinstance(response, bytes):
+        content = response
+    elif hasattr(response, 'body'):
+        content = response.body
+    elif hasattr(response, 'content'):
+        content = response.content
+    else:
+        upload_selected_to_rag_logger.debug("Unexpected response type: %s", type(response))
+        content = b""
+    return await upload_stream_to_rag(content, item_name, collection_name, **upload_options)
+
+async def delete_documents_from_rag(document_names, collection_name):
+    """Remove documents from a collection through the ingestor's DELETE /v1/documents"""
+    url = f"{INGESTION_SERVER_URL}/v1/documents"
+    async with aiohttp.ClientSession() as session:
+        async with session.delete(url, params={"collection_name": collection_name}, json=document_names) as response:
+            _COLLECTION_DOCUMENTS.pop(collection_name, None)
+            if response.status != 200:
+                response_text = await response.text()
+                raise Exception(f"Failed to delete {document_names} from {collection_name}: {response_text}")
+
+@asynccontextmanager
+async def _ingestion_lock(lock_key):
+    """Hold the ingestion lock of an item, the entry is dropped once nobody holds or waits for it"""
+    entry = _INGESTION_LOCKS.setdefault(lock_key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _INGESTION_LOCKS[lock_key]
+
+async def ingest_course_item(course_id, user_id, item_id, item_type, item_name, token, content=None):
+    """
+    Ingest a selected Canvas item into its course collection and add it to the user's documents.
+
+    Items with the same content for the whole course (SHARED_ITEM_TYPES) are ingested once per
+    version: Canvas is asked for the item's metadata with the user's token, which checks the
+    user's access and returns its `updated_at`, and an item whose version is already in the
+    collection is only added to the user's selection. Other items are ingested for each user.
+
+    Arguments:
+        content: Content to ingest instead of fetching the item from Canvas, e.g. a placeholder page
+
+    Returns:
+        dict with the status ("ingested" or "reused"), collection name and document name
+    """
+    collection_name = course_collection(course_id)
+    api_path = SHARED_ITEM_TYPES.get(item_type.lower())
+    version = None
+    if api_path and content is None:
+        key = item_key(item_type, item_id)
+        metadata = await fetch_item_metadata(course_id, api_path, item_id, token)
+        if metadata is None:
+            raise HTTPException(status_code=403, detail=f"Canvas denied access to {item_type} {item_id}")
+        version = item_version(metadata)
+    else:
+        key = f"{item_key(item_type, item_id)}:{user_id}"
+
+    # Students selecting the same item at the same time wait for one ingestion
+    async with _ingestion_lock((collection_name, course_id, key)):
+        entry = COURSE_INGESTION.lookup(collection_name, course_id, key)
+        if entry is not None and version is not None and entry["version"] == version:
+            COURSE_INGESTION.reused()
+            status = "reused"
+            document_name = entry["document_name"]
+        else:
+            reserved = []
+
+            def resolve_name(file_name):
+                # Reserved before the upload, another item of the same name picks a different one
+                reserved.append(COURSE_INGESTION.reserve_name(collection_name, course_id, key, file_name))
+                return reserved[-1]
+
+            upload_options = {
+                "resolve_name": resolve_name,
+                # An older version, or a copy uploaded before the index existed, is replaced
+                "replace": True,
+            }
+            try:
+                if content is None:
+                    result = await upload_item_to_rag(course_id, item_id, item_type, item_name, token, collection_name, **upload_options)
+                else:
+                    result = await upload_stream_to_rag(content, item_name, collection_name, **upload_options)
+            except BaseException:
+                for name in reserved:
+                    COURSE_INGESTION.release_name(collection_name, course_id, key, name)
+                raise
+            status = "ingested"
+            document_name = result["file_name"]
+            previous = COURSE_INGESTION.record(collection_name, course_id, key, version, document_name)
+            if previous is not None and previous["document_name"] != document_name:
+                # The item was renamed, its old document would otherwise stay searchable
+                try:
+                    await delete_documents_from_rag([previous["document_name"]], collection_name)
+                except Exception as e:
+                    upload_selected_to_rag_logger.warning("Failed to remove the previous version of %s: %s", key, e)
+
+    COURSE_INGESTION.select(user_id, course_id, collection_name, key)
+    upload_selected_to_rag_logger.info("Course item %s", status, course_id=course_id, item=key,
+                                       version=version, document_name=document_name, collection=collection_name)
+    return {"status": status, "collection_name": collection_name, "document_name": document_name}
+
 async def ensure_collection_exists(collection_name):
     """Make sure a collection exists, create it if it doesn't"""
     try:
@@ -687,7 +959,7 @@ async def ensure_collection_exists(collection_name):
             async with session.get(url) as response:
                 if response.status != 200:
                     response_text = await response.text()
-                    print(f"[ENSURE_COLLECTION] Failed to get collections: {response_text}")
+                    ensure_collection_logger.warning("Failed to get collections: %s", response_text)
                     raise Exception(f"Failed to get collections: {response_text}")
                 
                 collections_data = await response.json()
@@ -703,7 +975,7 @@ async def ensure_collection_exists(collection_name):
         
         # If collection doesn't exist, create it
         if collection_name not in collection_names:
-            print(f"[ENSURE_COLLECTION] Creating collection: {collection_name}")
+            ensure_collection_logger.info("Creating collection: %s", collection_name)
             create_url = f"{INGESTION_SERVER_URL}/v1/collections"
             
             # Create collection with appropriate parameters
@@ -722,19 +994,17 @@ async def ensure_collection_exists(collection_name):
                     
                     if create_response.status != 200:
                         response_text = await create_response.text()
-                        print(f"[ENSURE_COLLECTION] Failed to create collection: {response_text}")
+                        ensure_collection_logger.warning("Failed to create collection: %s", response_text)
                         raise Exception(f"Failed to create collection: {response_text}")
                     
-                    print(f"[ENSURE_COLLECTION] Collection {collection_name} created successfully")
+                    ensure_collection_logger.info("Collection %s created successfully", collection_name)
         else:
-            print(f"[ENSURE_COLLECTION] Collection {collection_name} already exists")
+            ensure_collection_logger.debug("Collection %s already exists", collection_name)
         
         return True
     
     except Exception as e:
-        print(f"[ENSURE_COLLECTION] Error ensuring collection exists: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        ensure_collection_logger.warning("Error ensuring collection exists: %s", e, exc_info=True)
         raise e
 
 
@@ -783,35 +1053,35 @@ async def download_course(request: DownloadCourseRequest):
     ACTIVE_REQUESTS.inc()
     
     # Start logging information
-    print(f"[DOWNLOAD_COURSE] Starting download for course_id={course_id}")
+    download_course_logger.info("Starting download for course_id=%s", course_id)
     
     try:
-        print(f"[DOWNLOAD_COURSE] Creating CanvasClient with token length: {len(token)}")
+        download_course_logger.debug("Creating CanvasClient with token length: %s", len(token))
         client = CanvasClient(token)
         
         # Use the user_id from request if provided, otherwise use the one from the Canvas client
         user_id = request.user_id or str(client.user_id)
-        print(f"[DOWNLOAD_COURSE] Using user_id: {user_id}")
+        download_course_logger.debug("Using user_id: %s", user_id)
         
         # Create directory structure
         course_dir = f"course_data/{user_id}/{course_id}"
-        print(f"[DOWNLOAD_COURSE] Creating directory: {course_dir}")
+        download_course_logger.debug("Creating directory: %s", course_dir)
         os.makedirs(course_dir, exist_ok=True)
         
         # Ensure the default collection exists
-        print(f"[DOWNLOAD_COURSE] Ensuring default collection exists")
+        download_course_logger.debug("Ensuring default collection exists")
         await ensure_collection_exists("default")
         
         # Get course info
-        print(f"[DOWNLOAD_COURSE] Fetching course materials for course_id={course_id}")
+        download_course_logger.debug("Fetching course materials for course_id=%s", course_id)
         try:
             course_materials = client.get_course_materials(course_id)
             if course_materials is None:
                 # Handle unexpected failure
-                print(f"[DOWNLOAD_COURSE] ERROR: get_course_materials returned None")
+                download_course_logger.error("Get_course_materials returned None")
                 raise HTTPException(status_code=500, detail="Failed to retrieve course materials")
                 
-            print(f"[DOWNLOAD_COURSE] Successfully retrieved course materials")
+            download_course_logger.info("Successfully retrieved course materials")
             
             # Check for component errors
             components_with_errors = []
@@ -825,13 +1095,13 @@ async def download_course(request: DownloadCourseRequest):
                     components_with_errors.append(f"pages ({course_materials.get('pages_error')})")
             
             if components_with_errors:
-                print(f"[DOWNLOAD_COURSE] WARNING: Some components had errors: {', '.join(components_with_errors)}")
+                download_course_logger.warning("Some components had errors: %s", ', '.join(components_with_errors))
             
             # Log some basic stats about what we received
             modules_count = len(course_materials.get("modules", []))
             files_count = len(course_materials.get("files", []))
             pages_count = len(course_materials.get("pages", []))
-            print(f"[DOWNLOAD_COURSE] Course contains: {modules_count} modules, {files_count} files, {pages_count} pages")
+            download_course_logger.debug("Course contains: %s modules, %s files, %s pages", modules_count, files_count, pages_count)
             
             # Initialize missing components to empty lists to avoid KeyError later
             if "modules" not in course_materials:
@@ -842,26 +1112,22 @@ async def download_course(request: DownloadCourseRequest):
                 course_materials["pages"] = []
             
         except Exception as cm_error:
-            print(f"[DOWNLOAD_COURSE] ERROR fetching course materials: {str(cm_error)}")
-            import traceback
-            print(f"[DOWNLOAD_COURSE] Traceback: {traceback.format_exc()}")
+            download_course_logger.error("Error fetching course materials: %s", cm_error, exc_info=True)
             raise
         
         # Save course info
-        print(f"[DOWNLOAD_COURSE] Saving course_info.json")
+        download_course_logger.debug("Saving course_info.json")
         try:
             course_info_path = f"{course_dir}/course_info.json"
-            with open(course_info_path, "w") as f:
-                json.dump(course_materials, f, indent=4)
-            print(f"[DOWNLOAD_COURSE] Successfully saved course_info.json, size: {os.path.getsize(course_info_path)} bytes")
+            COURSE_FILES.write(course_info_path, course_materials)
+            download_course_logger.info("Successfully saved course_info.json, size: %s bytes", os.path.getsize(course_info_path))
+            COURSE_STATS.record_course(user_id, course_id)
         except Exception as save_error:
-            print(f"[DOWNLOAD_COURSE] ERROR saving course_info.json: {str(save_error)}")
-            import traceback
-            print(f"[DOWNLOAD_COURSE] Traceback: {traceback.format_exc()}")
+            download_course_logger.error("Error saving course_info.json: %s", save_error, exc_info=True)
             raise
         
         # Create file list
-        print(f"[DOWNLOAD_COURSE] Creating file list")
+        download_course_logger.debug("Creating file list")
         file_list = []
         total_size = 0
         files_with_url = 0
@@ -869,19 +1135,19 @@ async def download_course(request: DownloadCourseRequest):
         
         # Make sure files exist in course_materials
         if "files" not in course_materials or course_materials["files"] is None:
-            print(f"[DOWNLOAD_COURSE] No files found in course materials, initializing empty file list")
+            download_course_logger.debug("No files found in course materials, initializing empty file list")
             course_materials["files"] = []
         
         # Debug output for files
         for i, file_info in enumerate(course_materials.get("files", [])):
             # Skip None or invalid entries
             if file_info is None:
-                print(f"[DOWNLOAD_COURSE] WARNING: File {i} is None, skipping")
+                download_course_logger.warning("File %s is None, skipping", i)
                 continue
                 
             # Check if this is a valid file object with needed attributes
             if not isinstance(file_info, dict):
-                print(f"[DOWNLOAD_COURSE] WARNING: File {i} is not a dict: {type(file_info)}, skipping")
+                download_course_logger.warning("File %s is not a dict: %s, skipping", i, type(file_info))
                 continue
             
             has_url = "url" in file_info
@@ -889,13 +1155,11 @@ async def download_course(request: DownloadCourseRequest):
                 files_with_url += 1
             else:
                 files_missing_url += 1
-                print(f"[DOWNLOAD_COURSE] WARNING: File {i} missing URL: {file_info.get('display_name', 'unknown')}")
+                download_course_logger.warning("File %s missing URL: %s", i, file_info.get('display_name', 'unknown'))
                 
             # Log file info for debugging
             if i < 5 or not has_url:  # Log first 5 files and any without URL
-                print(f"[DOWNLOAD_COURSE] File {i}: name='{file_info.get('display_name', 'unknown')}', "
-                     f"has_url={has_url}, size={file_info.get('size', 0)}, "
-                     f"content-type={file_info.get('content-type', 'unknown')}")
+                download_course_logger.debug("File %s: name='%s', has_url=%s, size=%s, content-type=%s", i, file_info.get('display_name', 'unknown'), has_url, file_info.get('size', 0), file_info.get('content-type', 'unknown'))
             
             # Only include files with URLs
             if has_url:
@@ -919,49 +1183,45 @@ async def download_course(request: DownloadCourseRequest):
                         "id": file_info.get("id", "")
                     })
                 except Exception as file_error:
-                    print(f"[DOWNLOAD_COURSE] ERROR processing file {i}: {str(file_error)}")
+                    download_course_logger.error("Error processing file %s: %s", i, file_error)
         
         # Handle empty file list
         if len(file_list) == 0:
-            print(f"[DOWNLOAD_COURSE] WARNING: No valid files found with URLs. Creating empty file_list.json")
+            download_course_logger.warning("No valid files found with URLs. Creating empty file_list.json")
         
-        print(f"[DOWNLOAD_COURSE] File stats: {len(file_list)} total files, {files_with_url} with URL, {files_missing_url} missing URL")
-        print(f"[DOWNLOAD_COURSE] Total file size: {total_size} bytes")
+        download_course_logger.debug("File stats: %s total files, %s with URL, %s missing URL", len(file_list), files_with_url, files_missing_url)
+        download_course_logger.debug("Total file size: %s bytes", total_size)
         
         # Create files directory even if there are no files
         os.makedirs(f"{course_dir}/files", exist_ok=True)
         
         # Save file list
-        print(f"[DOWNLOAD_COURSE] Saving file_list.json")
+        download_course_logger.debug("Saving file_list.json")
         try:
             file_list_path = f"{course_dir}/file_list.json"
-            with open(file_list_path, "w") as f:
-                json.dump(file_list, f, indent=4)
-            print(f"[DOWNLOAD_COURSE] Successfully saved file_list.json, size: {os.path.getsize(file_list_path)} bytes")
+            COURSE_FILES.write(file_list_path, file_list)
+            download_course_logger.info("Successfully saved file_list.json, size: %s bytes", os.path.getsize(file_list_path))
+            COURSE_STATS.record_file_list(user_id, course_id, file_list)
         except Exception as save_error:
-            print(f"[DOWNLOAD_COURSE] ERROR saving file_list.json: {str(save_error)}")
-            import traceback
-            print(f"[DOWNLOAD_COURSE] Traceback: {traceback.format_exc()}")
+            download_course_logger.error("Error saving file_list.json: %s", save_error, exc_info=True)
             raise
         
         # Record metrics
-        print(f"[DOWNLOAD_COURSE] Incrementing download counter for course_id={course_id}")
+        download_course_logger.debug("Incrementing download counter for course_id=%s", course_id)
         COURSE_DOWNLOADS.labels(course_id=str(course_id)).inc()
         
-        print(f"[DOWNLOAD_COURSE] Course {course_id} processed successfully")
+        download_course_logger.info("Course %s processed successfully", course_id)
         return {
             "message": f"Course {course_id} processed successfully",
             "user_id": user_id  # Return the user_id that was used
         }
     except Exception as e:
-        print(f"[DOWNLOAD_COURSE] FATAL ERROR processing course {course_id}: {str(e)}")
-        import traceback
-        print(f"[DOWNLOAD_COURSE] Traceback: {traceback.format_exc()}")
+        download_course_logger.error("Fatal error processing course %s: %s", course_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         # Decrement active requests
         ACTIVE_REQUESTS.dec()
-        print(f"[DOWNLOAD_COURSE] Finished request for course_id={course_id}")
+        download_course_logger.info("Finished request for course_id=%s", course_id)
 
 @app.post("/get_documents")
 async def get_documents(request: GetDocumentsRequest):
@@ -991,23 +1251,21 @@ async def get_documents(request: GetDocumentsRequest):
         
         file_list_path = f"{course_dir}/file_list.json"
         if os.path.exists(file_list_path):
-            with open(file_list_path) as f:
-                file_list = json.load(f)
-            return file_list
+            # The cached file is sent as it is, without parsing and re-encoding it
+            return Response(content=COURSE_FILES.read(file_list_path).raw, media_type="application/json")
         else:
             # If file list doesn't exist yet, try to create it by downloading course info
             course_info_path = f"{course_dir}/course_info.json"
             if os.path.exists(course_info_path):
-                with open(course_info_path) as f:
-                    course_info = json.load(f)
+                course_info = COURSE_FILES.read(course_info_path).data
                 
                 # Extract files from course info
                 files = course_info.get("files", [])
                 file_list = [{"name": file.get("display_name", "")} for file in files]
                 
                 # Save file list
-                with open(file_list_path, "w") as f:
-                    json.dump(file_list, f, indent=4)
+                COURSE_FILES.write(file_list_path, file_list)
+                COURSE_STATS.record_file_list(user_id, course_id_str, file_list)
                 
                 return file_list
             else:
@@ -1018,16 +1276,15 @@ async def get_documents(request: GetDocumentsRequest):
                 os.makedirs(course_dir, exist_ok=True)
                 
                 # Save course info
-                with open(course_info_path, "w") as f:
-                    json.dump(course_materials, f, indent=4)
+                COURSE_FILES.write(course_info_path, course_materials)
                 
                 # Extract files from course info
                 files = course_materials.get("files", [])
                 file_list = [{"name": file.get("display_name", "")} for file in files]
                 
                 # Save file list
-                with open(file_list_path, "w") as f:
-                    json.dump(file_list, f, indent=4)
+                COURSE_FILES.write(file_list_path, file_list)
+                COURSE_STATS.record_file_list(user_id, course_id_str, file_list)
                 
                 return file_list
     except Exception as e:
@@ -1080,11 +1337,18 @@ async def get_course_content(request: GetCourseContentRequest):
         if not os.path.exists(json_path):
             raise HTTPException(status_code=404, detail=f"Content not found: {content_type}")
         
-        # Read and return the JSON content
-        with open(json_path) as f:
-            content = json.load(f)
+        snapshot = COURSE_FILES.read(json_path)
+        if request.item_id is not None:
+            # Single items are looked up in the snapshot's index instead of scanning the content
+            item = snapshot.find(request.item_type or "file", request.item_id)
+            if item is None:
+                raise HTTPException(status_code=404, detail=f"Item not found: {request.item_type} {request.item_id}")
+            return item
         
-        return content
+        # The cached file is sent as it is, without parsing and re-encoding it
+        return Response(content=snapshot.raw, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -1095,8 +1359,8 @@ async def upload_selected_to_rag(request: UploadSelectedToRAGRequest):
     """
     Upload multiple selected Canvas items to the RAG server
     """
-    print(f"[UPLOAD_SELECTED_TO_RAG] Starting request with {len(request.selected_items)} items")
-    print(f"[UPLOAD_SELECTED_TO_RAG] Course ID: {request.course_id}, User ID: {request.user_id}")
+    upload_selected_to_rag_logger.info("Starting request with %s items", len(request.selected_items))
+    upload_selected_to_rag_logger.debug("Course ID: %s, User ID: %s", request.course_id, request.user_id)
     
     ACTIVE_REQUESTS.inc()
     
@@ -1107,26 +1371,20 @@ async def upload_selected_to_rag(request: UploadSelectedToRAGRequest):
         selected_items = request.selected_items
         
         if not course_id or not token or not selected_items:
-            print("[UPLOAD_SELECTED_TO_RAG] ERROR: Missing required parameters")
+            upload_selected_to_rag_logger.error("Missing required parameters")
             return {"status": "error", "message": "Missing required parameters"}
         
         success_count = 0
         failed_count = 0
         failed_items = []
         
-        # Always use the default collection
-        # We don't create separate collections per course to avoid complexity
-        collection_name = "default"
+        # Items are ingested once per course collection (COURSE_COLLECTION, "default" unless configured)
+        collection_name = course_collection(course_id)
         
         # Process each selected item
         for i, item in enumerate(selected_items):
-            print(f"[UPLOAD_SELECTED_TO_RAG] Processing item {i+1}/{len(selected_items)}: {item.name} (type: {item.type}, id: {item.id})")
+            upload_selected_to_rag_logger.info("Processing item %s/%s: %s (type: %s, id: %s)", i+1, len(selected_items), item.name, item.type, item.id)
             try:
-                # Create a temp file for the content
-                temp_file_handle, temp_file_path = tempfile.mkstemp()
-                os.close(temp_file_handle)
-                print(f"[UPLOAD_SELECTED_TO_RAG] Created temporary file: {temp_file_path}")
-                
                 # Extract values
                 item_name = item.name
                 item_type = item.type
@@ -1135,11 +1393,11 @@ async def upload_selected_to_rag(request: UploadSelectedToRAGRequest):
                 # Convert ID to string if not None
                 if item_id is not None:
                     item_id = str(item_id)
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Converted item ID to string: {item_id}")
+                    upload_selected_to_rag_logger.debug("Converted item ID to string: %s", item_id)
 
                 # For items without an ID, like externalurl, we need a special case
                 if item_type.lower() == 'externalurl' and not item_id:
-                    print(f"[UPLOAD_SELECTED_TO_RAG] ExternalURL without ID. Creating HTML placeholder.")
+                    upload_selected_to_rag_logger.debug("ExternalURL without ID. Creating HTML placeholder.")
                     html_content = f"""
                     <html>
                     <head>
@@ -1151,19 +1409,15 @@ async def upload_selected_to_rag(request: UploadSelectedToRAGRequest):
                     </body>
                     </html>
                     """
-                    temp_file_path += ".html"
-                    with open(temp_file_path, "w") as f:
-                        f.write(html_content)
-                    
                     # Upload the placeholder to the collection
-                    filename = f"{item_name}.html"
-                    await upload_to_rag(temp_file_path, filename, collection_name)
+                    await ingest_course_item(course_id, user_id, clean_filename(item_name), item_type, f"{item_name}.html",
+                                             token, content=html_content.encode('utf-8'))
                     success_count += 1
                     continue
                 
                 # Skip items with no ID
                 if not item_id:
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Skipping item with no ID: {item_name}")
+                    upload_selected_to_rag_logger.warning("Skipping item with no ID: %s", item_name)
                     failed_items.append({
                         "name": item_name,
                         "error": "No content ID available"
@@ -1171,205 +1425,19 @@ async def upload_selected_to_rag(request: UploadSelectedToRAGRequest):
                     failed_count += 1
                     continue
                 
-                # Determine the appropriate extension based on content type
-                # For now, don't set a default extension - we'll determine it after looking at the content
-                file_extension = ""  # Default to HTML
-                
-                # Rename temp file with appropriate extension
-                new_temp_file_path = temp_file_path + file_extension
-                os.rename(temp_file_path, new_temp_file_path)
-                temp_file_path = new_temp_file_path
-                print(f"[UPLOAD_SELECTED_TO_RAG] Renamed temporary file with extension: {temp_file_path}")
-                
-                # Get the content based on the item type
-                print(f"[UPLOAD_SELECTED_TO_RAG] Fetching content from Canvas for item: {item_name} (type: {item_type}, id: {item_id})")
-                try:
-                    response = await get_course_item_content(
-                        course_id=course_id, 
-                        item_id=item_id,
-                        item_type=item_type, 
-                        token=token
-                    )
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Got response from get_course_item_content, type: {type(response)}")
-                except Exception as content_error:
-                    print(f"[UPLOAD_SELECTED_TO_RAG] ERROR fetching content: {str(content_error)}")
-                    import traceback
-                    print(traceback.format_exc())
-                    raise
-                
-                # Handle different response types
-                if isinstance(response, (str, bytes)):
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Response is a string or bytes, length: {len(response)}")
-                    with open(temp_file_path, "wb") as f:
-                        f.write(response if isinstance(response, bytes) else response.encode('utf-8'))
-                elif isinstance(response, Response):
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Response is a FastAPI Response")
-                    with open(temp_file_path, "wb") as f:
-                        f.write(response.body)
-                else:
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Unexpected response type: {type(response)}")
-                    with open(temp_file_path, "wb") as f:
-                        if hasattr(response, 'body'):
-                            f.write(response.body)
-                        elif hasattr(response, 'content'):
-                            f.write(response.content)
-                        else:
-                            # Last resort, convert to string
-                            f.write(str(response).encode('utf-8'))
-                
-                # Check if the file has content
-                file_size = os.path.getsize(temp_file_path)
-                print(f"[UPLOAD_SELECTED_TO_RAG] Temporary file size: {file_size} bytes")
-                
-                if file_size == 0:
-                    print(f"[UPLOAD_SELECTED_TO_RAG] WARNING: Temporary file is empty")
-                    raise Exception("Downloaded content is empty")
-                
-                # Check the content to see if it's a HTML fallback or actual file content
-                with open(temp_file_path, 'rb') as f:
-                    first_bytes = f.read(50)  # Read first 50 bytes to check file type
-                    is_html = b'<html' in first_bytes or b'<!DOCTYPE html' in first_bytes
-                
-                # Upload the file to the RAG server with the collection name and appropriate extension
-                
-                # Clean the item name first
-                item_name = clean_filename(item_name)
-                
-                # Check if the name already has a file extension
-                name_parts = os.path.splitext(item_name)
-                base_name = name_parts[0]
-                name_ext = name_parts[1].lower()
-                
-                # Try to detect content type from file data (magic bytes)
-                content_type = None
-                is_pdf = False
-                is_html = False
-                is_image = False
-                image_type = None
-                
+                upload_selected_to_rag_logger.info("Uploading to RAG collection '%s': %s", collection_name, item_name)
                 try:
-                    with open(temp_file_path, 'rb') as f:
-                        first_bytes = f.read(50)  # Read more bytes to be sure
-                        f.seek(0)  # Reset position
-                        
-                        # Check for PDF
-                        if first_bytes.startswith(b'%PDF-'):
-                            content_type = 'application/pdf'
-                            is_pdf = True
-                            print(f"[UPLOAD_SELECTED_TO_RAG] Content identified as PDF based on magic bytes")
-                        # Check for HTML
-                        elif first_bytes.startswith(b'<!DOCTYPE') or b'<html' in first_bytes:
-                            content_type = 'text/html'
-                            is_html = True
-                            print(f"[UPLOAD_SELECTED_TO_RAG] Content identified as HTML based on content")
-                        # Check for JPEG
-                        elif first_bytes.startswith(b'\xff\xd8\xff'):
-                            content_type = 'image/jpeg'
-                            is_image = True
-                            image_type = 'jpeg'
-                            print(f"[UPLOAD_SELECTED_TO_RAG] Content identified as JPEG image based on magic bytes")
-                        # Check for PNG
-                        elif first_bytes.startswith(b'\x89PNG'):
-                            content_type = 'image/png'
-                            is_image = True
-                            image_type = 'png'
-                            print(f"[UPLOAD_SELECTED_TO_RAG] Content identified as PNG image based on magic bytes")
-                        # Check for GIF
-                        elif first_bytes.startswith(b'GIF87a') or first_bytes.startswith(b'GIF89a'):
-                            content_type = 'image/gif'
-                            is_image = True
-                            image_type = 'gif'
-                            print(f"[UPLOAD_SELECTED_TO_RAG] Content identified as GIF image based on magic bytes")
-                except Exception as e:
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Warning: Failed to detect content type from bytes: {str(e)}")
-                    # Fallback to checking first bytes for HTML tags
-                    with open(temp_file_path, 'rb') as f:
-                        first_bytes = f.read(50)
-                        is_html = b'<html' in first_bytes or b'<!DOCTYPE html' in first_bytes
-                
-                # Determine the correct extension based on content and original name
-                if is_pdf:
-                    # If it's actually a PDF, always use .pdf extension
-                    if name_ext == '.pdf':
-                        # Already has correct extension
-                        filename = item_name
-                    else:
-                        # Add PDF extension
-                        filename = f"{base_name}.pdf"
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Content identified as PDF, using filename: {filename}")
-                elif is_image:
-                    # For image files, ensure they have the right extension
-                    correct_ext = f".{image_type}"
-                    
-                    if name_ext.lower() == correct_ext:
-                        # Already has the correct extension
-                        filename = item_name
-                    else:
-                        # Add correct image extension
-                        filename = f"{base_name}{correct_ext}"
-                    
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Content identified as {image_type.upper()} image, using filename: {filename}")
-                    
-                    # For image files, use the image captioning capabilities
-                    # No need for text descriptor files as the VLM model will generate captions
-                    try:
-                        # Upload image with image captioning enabled
-                        print(f"[UPLOAD_SELECTED_TO_RAG] Uploading image with captioning enabled: {filename}")
-                        await upload_to_rag(temp_file_path, filename, collection_name)
-                        
-                        # Skip the regular upload below since we handled it specially
-                        success_count += 1
-                        print(f"[UPLOAD_SELECTED_TO_RAG] Successfully processed image file {i+1}")
-                        
-                        # Clean up temp file
-                        if os.path.exists(temp_file_path):
-                            os.remove(temp_file_path)
-                        
-                        # Continue to next file, skipping the regular upload
-                        continue
-                    except Exception as img_error:
-                        print(f"[UPLOAD_SELECTED_TO_RAG] ERROR processing image file: {str(img_error)}")
-                        # Continue with regular upload as fallback
-                elif is_html:
-                    # If content is HTML, use .html extension, but avoid double extensions
-                    if name_ext == '.html':
-                        # Already has .html extension
-                        filename = item_name
-                    elif name_ext and '.html' in name_ext:
-                        # Has something like .pdf.html - remove the .html part
-                        clean_name = item_name.lower().replace('.html', '')
-                        filename = f"{clean_name}"
-                    else:
-                        # No html in extension, add .html
-                        filename = f"{item_name}.html"
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Content appears to be HTML, using filename: {filename}")
-                else:
-                    # Not HTML content, use original name with extension
-                    if name_ext:
-                        # Already has an extension
-                        filename = item_name
-                    else:
-                        # No extension, use the one we determined
-                        filename = f"{item_name}{file_extension}"
-                
-                print(f"[UPLOAD_SELECTED_TO_RAG] Uploading to RAG collection '{collection_name}': {filename}")
-                try:
-                    rag_response = await upload_to_rag(temp_file_path, filename, collection_name)
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Upload successful: {rag_response}")
+                    rag_response = await ingest_course_item(course_id, user_id, item_id, item_type, item_name, token)
+                    upload_selected_to_rag_logger.debug("Upload response: %s", rag_response)
                 except Exception as upload_error:
-                    print(f"[UPLOAD_SELECTED_TO_RAG] ERROR during upload: {str(upload_error)}")
+                    upload_selected_to_rag_logger.error("Error during upload: %s", upload_error)
                     raise
                 
                 success_count += 1
-                print(f"[UPLOAD_SELECTED_TO_RAG] Successfully processed item {i+1}")
-                
-                # Clean up temp file
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                    print(f"[UPLOAD_SELECTED_TO_RAG] Cleaned up temporary file")
+                upload_selected_to_rag_logger.info("Successfully processed item %s", i+1)
                     
             except Exception as e:
-                print(f"[UPLOAD_SELECTED_TO_RAG] ERROR processing item {i+1}: {str(e)}")
+                upload_selected_to_rag_logger.error("Error processing item %s: %s", i+1, e)
                 failed_items.append({
                     "name": item.name,
                     "error": str(e)
@@ -1387,17 +1455,91 @@ async def upload_selected_to_rag(request: UploadSelectedToRAGRequest):
             "success_count": success_count,
             "failed_items": failed_items
         }
-        print(f"[UPLOAD_SELECTED_TO_RAG] Completed request: {final_result}")
+        upload_selected_to_rag_logger.info("Completed request: %s", final_result)
         return final_result
             
     except Exception as e:
-        print(f"[UPLOAD_SELECTED_TO_RAG] FATAL ERROR: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        upload_selected_to_rag_logger.error("FATAL ERROR: %s", e, exc_info=True)
         return {"status": "error", "message": str(e)}
     finally:
         ACTIVE_REQUESTS.dec()
 
+@app.post("/rag_access")
+async def rag_access(request: RAGAccessRequest):
+    """
+    Return the documents a user may retrieve, by collection.
+
+    Course items are ingested once for all users of a course; passing a collection's list as
+    `document_names` to the RAG server's /v1/generate or /v1/search restricts retrieval to them.
+    The lists hold the items the user selected and the documents uploaded directly to the
+    collection, which are not course items. The user is the owner of the token.
+
+    The course collection is always listed, also without selections: it holds other users'
+    quiz submissions, so a missing list must never mean searching all of it. When the ingestor
+    can't list the direct uploads, only the selected items are returned.
+    """
+    if not request.token:
+        raise HTTPException(status_code=400, detail="Missing token")
+    user_id = await token_user_id(request.token)
+    if request.user_id and request.user_id != user_id:
+        raise HTTPException(status_code=403, detail="user_id does not belong to the token")
+    selected = COURSE_INGESTION.selected_documents(user_id, request.course_id)
+    if request.course_id is not None or "{course_id}" not in COURSE_COLLECTION:
+        selected.setdefault(course_collection(request.course_id), [])
+    collections = {}
+    for collection_name, document_names in selected.items():
+        uploaded = await uploaded_documents(collection_name)
+        collections[collection_name] = sorted(set(document_names) | (uploaded or set()))
+    return {"user_id": user_id, "collections": collections}
+
+async def token_user_id(token):
+    """Canvas user id of a token, cached for RAG_ACCESS_USER_TTL seconds"""
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _TOKEN_USERS.get(cache_key)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    try:
+        user_id = await asyncio.to_thread(lambda: CanvasClient(token).user_id)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Canvas did not accept the token")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Canvas did not return a user for the token")
+    for expired in [key for key, (_, expires) in _TOKEN_USERS.items() if expires <= time.monotonic()]:
+        del _TOKEN_USERS[expired]
+    _TOKEN_USERS[cache_key] = (str(user_id), time.monotonic() + RAG_ACCESS_USER_TTL)
+    return str(user_id)
+
+async def collection_documents(collection_name):
+    """
+    Names of the documents of a collection, listed by the ingestor at most every
+    RAG_ACCESS_DOCUMENTS_TTL seconds, None when the ingestor can't list them
+    """
+    cached = _COLLECTION_DOCUMENTS.get(collection_name)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    url = f"{INGESTION_SERVER_URL}/v1/documents"
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params={"collection_name": collection_name}) as response:
+                if response.status != 200:
+                    raise Exception(f"{response.status}: {await response.text()}")
+                documents = (await response.json()).get("documents", [])
+    except Exception as e:
+        logger.warning("Failed to list the documents of %s, only selected items are retrievable: %s", collection_name, e)
+        return None
+    names = frozenset(document.get("document_name") for document in documents if document.get("document_name"))
+    _COLLECTION_DOCUMENTS[collection_name] = (names, time.monotonic() + RAG_ACCESS_DOCUMENTS_TTL)
+    return names
+
+async def uploaded_documents(collection_name):
+    """Documents of a collection that are not course items, None when the ingestor can't list them"""
+    names = await collection_documents(collection_name)
+    if names is None:
+        return None
+    # Course items are told apart at every call, an item ingested since the listing stays private
+    managed = COURSE_INGESTION.managed_names(collection_name)
+    return {name for name in names if name not in managed}
+
 @app.post("/download_and_upload_to_rag")
 async def download_and_upload_to_rag(request: DownloadAndUploadRequest):
     """
@@ -1487,7 +1629,7 @@ async def get_course_item(course_id: str, content_id: str, item_type: str, token
     """
     ACTIVE_REQUESTS.inc()
     try:
-        print(f"get_course_item called with: course_id={course_id}, content_id={content_id}, item_type={item_type}")
+        logger.debug("Get_course_item called with: course_id=%s, content_id=%s, item_type=%s", course_id, content_id, item_type)
         return await get_course_item_content(course_id, content_id, item_type, token, filename)
     finally:
         ACTIVE_REQUESTS.dec()
@@ -1508,12 +1650,12 @@ async def download_module_item(course_id: str, module_id: str, item_id: str, tok
             async with session.get(api_url, headers=headers) as response:
                 if response.status != 200:
                     response_text = await response.text()
-                    print(f"Failed to get module item: {response_text}")
+                    logger.warning("Failed to get module item: %s", response_text)
                     raise HTTPException(status_code=response.status, 
                                       detail=f"Failed to get module item: {response_text}")
                 
                 item_data = await response.json()
-                print(f"Module item data: {json.dumps(item_data, indent=2)}")
+                logger.debug("Module item data: %s", json.dumps(item_data, indent=2))
                 
                 # Special handling for ExternalURL items
                 if item_data.get('type') == 'ExternalUrl' or item_data.get('type') == 'ExternalURL':
@@ -1570,8 +1712,7 @@ async def download_module_item(course_id: str, module_id: str, item_id: str, tok
                 
     except Exception as e:
         # Log any exceptions for debugging
-        import traceback
-        traceback.print_exc()
+        logger.error("Error downloading module item %s: %s", item_id, e, exc_info=True)
         
         # Return a user-friendly error
         if isinstance(e, HTTPException):
@@ -1617,32 +1758,13 @@ async def metrics_stats():
     """
     Return basic statistics about the service
     """
-    import glob
-    
-    # Count total courses downloaded
-    course_dirs = glob.glob("course_data/*/*")
-    total_courses = len(course_dirs)
-    
-    # Count total files processed
-    file_count = 0
-    total_file_size = 0
-    for course_dir in course_dirs:
-        file_list_path = f"{course_dir}/file_list.json"
-        if os.path.exists(file_list_path):
-            try:
-                with open(file_list_path) as f:
-                    file_list = json.load(f)
-                    file_count += len(file_list)
-                    for file_info in file_list:
-                        total_file_size += file_info.get("size", 0)
-            except:
-                pass
-    
+    # Served from the maintained index, course files are never scanned here
     return {
-        "total_courses": total_courses,
-        "total_files": file_count,
-        "total_file_size_bytes": total_file_size,
+        **COURSE_STATS.stats(),
         "active_requests": ACTIVE_REQUESTS._value.get(),
+        "download_methods": DOWNLOAD_STRATEGIES.stats(),
+        "blob_store": BLOB_STORE.stats(),
+        "course_ingestion": COURSE_INGESTION.stats(),
     }
 
 @app.get("/")
@@ -1650,14 +1772,10 @@ async def index():
     return {"message": "Course Data Manager API is running"}
 
 if __name__ == "__main__":
-    # Print configuration information
-    print("=" * 80)
-    print("Course Manager API - Starting Server")
-    print(f"- RAG Server URL: {RAG_SERVER_URL}")
-    print(f"- Ingestion Server URL: {INGESTION_SERVER_URL}")
-    print(f"- Image Captioning: Enabled")
-    print(f"- VLM Caption Endpoint: {os.environ.get('VLM_CAPTION_ENDPOINT')}")
-    print("=" * 80)
+    # Log configuration information
+    logger.info("Course Manager API - Starting Server", rag_server_url=RAG_SERVER_URL,
+                ingestion_server_url=INGESTION_SERVER_URL, image_captioning=True,
+                vlm_caption_endpoint=os.environ.get('VLM_CAPTION_ENDPOINT'))
     
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8012, reload=True)
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+Resumable, parallel HTTP range downloads for large Canvas files.
+
+Lecture videos and slide decks of hundreds of megabytes used to be fetched with one GET,
+and a dropped connection meant starting over. Files of at least CANVAS_LARGE_FILE_BYTES are
+split into parts of CANVAS_PART_BYTES, which are fetched with Range requests,
+CANVAS_PART_CONCURRENCY at a time, and written in place into a `.part` file. Finished parts
+are listed in a `.part.json` sidecar, so a download interrupted by a failure or a restart
+continues with the missing parts. Every part response must report the size Canvas reports
+as the total of its Content-Range, and a single-request download must have that size,
+before the result replaces the target file.
+"""
+import asyncio
+import json
+import os
+from urllib.parse import urlparse
+
+import aiohttp
+
+from course_logging import get_logger
+
+logger = get_logger("range_download")
+
+# Files of at least this size in bytes are downloaded in parts
+CANVAS_LARGE_FILE_BYTES = int(os.getenv("CANVAS_LARGE_FILE_BYTES", 64 * 1024 * 1024))
+# Size in bytes of each Range request
+CANVAS_PART_BYTES = int(os.getenv("CANVAS_PART_BYTES", 8 * 1024 * 1024))
+# Number of parts downloaded at the same time
+CANVAS_PART_CONCURRENCY = int(os.getenv("CANVAS_PART_CONCURRENCY", 4))
+# Retries of a failed part, each continuing from the last byte written
+CANVAS_PART_RETRIES = int(os.getenv("CANVAS_PART_RETRIES", 3))
+
+_READ_BYTES = 256 * 1024
+
+
+class RangeDownloadError(Exception):
+    """Raised when a part can't be downloaded or the result doesn't have the expected size"""
+
+
+class RangeSizeMismatch(RangeDownloadError):
+    """Raised when the server reports another file size than expected, retrying won't help"""
+
+
+def is_large_file(size):
+    """Whether a file of the given size, as reported by Canvas or Content-Length, is downloaded in parts"""
+    try:
+        return int(size or 0) >= CANVAS_LARGE_FILE_BYTES
+    except (TypeError, ValueError):
+        return False
+
+
+class _Source:
+    """URL the parts are requested from, re-resolved when a pre-signed redirect target expires"""
+
+    def __init__(self, session, url, headers, ssl_context, size):
+        self.session = session
+        self.size = size
+        self.origin_url = url
+        self.origin_headers = headers
+        self.ssl_context = ssl_context
+        self.url = url
+        self.headers = headers
+        self.ranges = False
+        self._lock = asyncio.Lock()
+
+    async def resolve(self):
+        # A one byte request follows the redirects and tells whether the server serves ranges
+        async with self._lock:
+            headers = {**self.origin_headers, "Range": "bytes=0-0"}
+            async with self.session.get(self.origin_url, headers=headers, ssl=self.ssl_context, allow_redirects=True) as response:
+                if response.status not in (200, 206):
+                    raise RangeDownloadError(f"Failed to resolve download URL, status {response.status}")
+                self.ranges = response.status == 206
+                if self.ranges:
+                    _check_content_range(response, self.size, start=0)
+                self.url = str(response.url)
+            # Credentials are only sent to the host they were meant for, redirect targets are pre-signed
+            same_host = urlparse(self.url).netloc == urlparse(self.origin_url).netloc
+            self.headers = self.origin_headers if same_host else {}
+
+
+def _check_content_range(response, size, start=None):
+    """Raise RangeSizeMismatch unless the Content-Range of a 206 response is for a file of size bytes"""
+    content_range = response.headers.get("Content-Range", "")
+    # bytes <first>-<last>/<total>, the total may be * when unknown
+    try:
+        unit, _, rest = content_range.partition(" ")
+        span, _, total = rest.partition("/")
+        first = int(span.split("-", 1)[0])
+    except ValueError:
+        raise RangeDownloadError(f"Unexpected Content-Range {content_range!r}") from None
+    if unit != "bytes" or (start is not None and first != start):
+        raise RangeDownloadError(f"Unexpected Content-Range {content_range!r}")
+    if total != "*" and int(total) != size:
+        raise RangeSizeMismatch(f"Server reports {total} bytes, Canvas reports {size}")
+
+
+def _load_state(state_path, size, version):
+    """Indices of the finished parts of an earlier attempt at the same file version"""
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+        if state["size"] == size and state.get("version") == version and state["part_bytes"] == CANVAS_PART_BYTES:
+            return set(state["parts"])
+    except FileNotFoundError:
+        pass
+    except (ValueError, KeyError) as e:
+        logger.warning("Ignoring unreadable download state %s: %s", state_path, e)
+    return set()
+
+
+def _save_state(state_path, size, version, parts):
+    # Written to a temporary file first so a crash never leaves a truncated state
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"size": size, "version": version, "part_bytes": CANVAS_PART_BYTES, "parts": sorted(parts)}, f)
+    os.replace(temp_path, state_path)
+
+
+async def _fetch_part(source, fd, index, start, end):
+    offset = start
+    for attempt in range(CANVAS_PART_RETRIES + 1):
+        try:
+            headers = {**source.headers, "Range": f"bytes={offset}-{end}"}
+            async with source.session.get(source.url, headers=headers, ssl=source.ssl_context) as response:
+                if response.status in (401, 403, 410):
+                    # Pre-signed URLs expire, resolve a fresh one for the retry
+                    await source.resolve()
+                    raise RangeDownloadError(f"Part {index} failed with status {response.status}")
+                if response.status != 206:
+                    raise RangeDownloadError(f"Part {index} failed with status {response.status}")
+                _check_content_range(response, source.size, start=offset)
+                async for chunk in response.content.iter_chunked(_READ_BYTES):
+                    if offset + len(chunk) > end + 1:
+                        raise RangeDownloadError(f"Part {index} received more bytes than requested")
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+            if offset != end + 1:
+                raise RangeDownloadError(f"Part {index} ended after {offset - start} of {end + 1 - start} bytes")
+            return
+        except RangeSizeMismatch:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, RangeDownloadError) as e:
+            if attempt == CANVAS_PART_RETRIES:
+                raise RangeDownloadError(f"Part {index} failed after {attempt + 1} attempts: {e}") from e
+            logger.warning("Retrying part %s from byte %s: %s", index, offset, e)
+            await asyncio.sleep(min(2 ** attempt, 10))
+
+
+async def _fetch_whole(source, part_path):
+    # The server ignores ranges, fall back to a single streamed GET
+    async with source.session.get(source.url, headers=source.headers, ssl=source.ssl_context) as response:
+        if response.status != 200:
+            raise RangeDownloadError(f"Download failed with status {response.status}")
+        with open(part_path, "wb") as f:
+            async for chunk in response.content.iter_chunked(_READ_BYTES):
+                f.write(chunk)
+
+
+def _discard(part_path, state_path):
+    for path in (part_path, state_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def download_ranges(session, url, headers, target_path, size, version=None, ssl_context=None, part_path=None):
+    """
+    Download a file with parallel Range requests, resuming an earlier attempt.
+
+    Arguments:
+        session: aiohttp session the requests are made with
+        url: Download URL, redirects to pre-signed storage URLs are followed
+        headers: Request headers, e.g. the Canvas Authorization header
+        target_path: Path the finished file is moved to
+        size: Size of the file in bytes as reported by Canvas
+        version: Version of the file, e.g. its updated_at, parts of other versions are discarded
+        ssl_context: SSL context of the requests
+        part_path: Path of the partial download, defaults to target_path + ".part"; a stable
+            path lets later calls resume
+
+    Returns:
+        target_path
+
+    Raises:
+        RangeDownloadError: when a part fails after its retries or the result has the wrong size;
+            RangeSizeMismatch when the server reports another size than Canvas, the partial download is discarded
+    """
+    size = int(size)
+    part_path = part_path or f"{target_path}.part"
+    state_path = f"{part_path}.json"
+    os.makedirs(os.path.dirname(part_path) or ".", exist_ok=True)
+
+    source = _Source(session, url, headers, ssl_context, size)
+    try:
+        await source.resolve()
+    except RangeSizeMismatch:
+        _discard(part_path, state_path)
+        raise
+
+    if not source.ranges:
+        logger.info("Server doesn't serve ranges, downloading %s bytes in one request", size)
+        await _fetch_whole(source, part_path)
+    else:
+        parts = [(index, start, min(start + CANVAS_PART_BYTES, size) - 1) for index, start in enumerate(range(0, size, CANVAS_PART_BYTES))]
+        finished = _load_state(state_path, size, version) if os.path.exists(part_path) else set()
+        missing = [part for part in parts if part[0] not in finished]
+        logger.info("Downloading %s of %s parts", len(missing), len(parts), bytes=size, resumed=len(finished))
+
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        semaphore = asyncio.Semaphore(CANVAS_PART_CONCURRENCY)
+
+        async def fetch(index, start, end):
+            async with semaphore:
+                await _fetch_part(source, fd, index, start, end)
+            finished.add(index)
+            _save_state(state_path, size, version, finished)
+
+        tasks = []
+        try:
+            # Sized up front for the in-place writes, every part's Content-Range total is checked instead
+            os.ftruncate(fd, size)
+            tasks = [asyncio.ensure_future(fetch(*part)) for part in missing]
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            # Finished parts stay recorded for the next attempt, unless the file changed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if isinstance(e, RangeSizeMismatch):
+                os.close(fd)
+                fd = None
+                _discard(part_path, state_path)
+            raise
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    actual_size = os.path.getsize(part_path)
+    if actual_size != size:
+        # Start over next time, the file changed or the server sent something else
+        _discard(part_path, state_path)
+        raise RangeDownloadError(f"Downloaded {actual_size} bytes, Canvas reports {size}")
+    os.replace(part_path, target_path)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return target_path
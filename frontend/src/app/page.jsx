@@ -879,6 +879,40 @@ export default function ChatPage() {
       // Always use the default collection regardless of selected course
       let collectionName = "default";
 
+      // Course items are ingested once for all students, retrieval is restricted to the
+      // items this user selected and the documents uploaded directly to the knowledge base.
+      // The collection also holds other students' quiz submissions, so without the user's
+      // list the knowledge base is not searched at all.
+      let documentNames;
+      if (useKnowledgeBase) {
+        let access = null;
+        if (canvasToken) {
+          try {
+            const accessResponse = await fetch('http://localhost:8012/rag_access', {
+              method: 'POST',
+              headers: {
+                'Content-Type': 'application/json',
+              },
+              body: JSON.stringify({
+                token: canvasToken,
+                user_id: String(userId),
+              }),
+            });
+            if (accessResponse.ok) {
+              access = await accessResponse.json();
+            } else {
+              console.warn('Failed to load the selected documents, status:', accessResponse.status);
+            }
+          } catch (accessError) {
+            console.warn('Failed to load the selected documents:', accessError);
+          }
+        }
+        if (!access) {
+          throw new Error('Your documents could not be loaded, so the knowledge base was not searched. Check your Canvas token and try again.');
+        }
+        documentNames = access.collections?.[collectionName] ?? [];
+      }
+
       // Format the messages to match exactly what the RAG server expects
       const messagesFormatted = [...messages, newMessage].map(msg => ({
         role: msg.role,
@@ -900,6 +934,7 @@ export default function ChatPage() {
         vdb_top_k: vdbTopK,
         vdb_endpoint: "http://milvus:19530",
         collection_name: collectionName,
+        ...(useKnowledgeBase ? { document_names: documentNames } : {}),
         enable_query_rewriting: false, // Always disable query rewriting to prevent CPU inference issues
         enable_reranker: true,
         enable_citations: true,
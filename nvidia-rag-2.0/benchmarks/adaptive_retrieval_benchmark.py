@@ -0,0 +1,160 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare adaptive retrieval against fixed vdb_top_k retrieval with reranking on labelled queries.
+
+The query set is a JSON lines file, one query per line with the names of the documents
+that answer it:
+
+    {"query": "When is the midterm?", "relevant_documents": ["Syllabus.pdf"]}
+
+Both modes retrieve from the same collection with the configured embedding and reranker
+models. Reported per mode: recall@reranker_top_k (share of relevant documents among the
+returned chunks' documents), hit rate, retrieval plus reranking latency and the candidates
+sent to the reranker; for adaptive retrieval also the modes chosen and the latency saved.
+Run from the nvidia-rag-2.0 directory with the same environment as the server:
+
+    python benchmarks/adaptive_retrieval_benchmark.py --collection default --queries queries.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from src.adaptive_retrieval import AdaptiveRetrieval
+from src.utils import get_config, get_embedding_model, get_ranking_model, get_vectorstore
+
+
+def _load_queries(path: str) -> list:
+    with open(path) as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    for query in queries:
+        query["relevant_documents"] = {os.path.basename(name) for name in query["relevant_documents"]}
+    return queries
+
+
+def _document_name(document) -> str:
+    source = document.metadata.get("source", "")
+    source = source.get("source_name", "") if isinstance(source, dict) else source
+    return os.path.basename(source)
+
+
+def _recall(documents: list, relevant: set) -> float:
+    retrieved = {_document_name(document) for document in documents}
+    return len(retrieved & relevant) / len(relevant) if relevant else 0.0
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(int(len(ordered) * fraction + 0.5) - 1, 0)]
+
+
+def _run_fixed(vectorstore, ranker, query: str, args) -> dict:
+    start_time = time.perf_counter()
+    candidates = vectorstore.similarity_search(query, k=args.vdb_top_k)
+    documents = list(ranker.compress_documents(query=query, documents=candidates))
+    return {"documents": documents, "seconds": time.perf_counter() - start_time,
+            "reranked": len(candidates), "mode": "fixed"}
+
+
+def _run_adaptive(vectorstore, ranker, adaptive: AdaptiveRetrieval, query: str, args) -> dict:
+    reranked = []
+
+    def rerank(candidates):
+        reranked.append(len(candidates))
+        return list(ranker.compress_documents(query=query, documents=candidates))
+
+    start_time = time.perf_counter()
+    result = adaptive.retrieve(
+        lambda k: vectorstore.similarity_search_with_relevance_scores(query, k=k),
+        rerank,
+        vdb_top_k=args.vdb_top_k,
+        reranker_top_k=args.reranker_top_k,
+    )
+    return {"documents": result.documents, "seconds": time.perf_counter() - start_time,
+            "reranked": sum(reranked), "mode": result.plan.mode}
+
+
+def _summary(name: str, runs: list, queries: list) -> dict:
+    recalls = [_recall(run["documents"], query["relevant_documents"]) for run, query in zip(runs, queries)]
+    latencies = [run["seconds"] for run in runs]
+    summary = {
+        "mode": name,
+        "queries": len(runs),
+        "recall": round(statistics.mean(recalls), 4),
+        "hit_rate": round(sum(recall > 0 for recall in recalls) / len(recalls), 4),
+        "latency_mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "latency_p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+        "latency_p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "reranked_candidates_mean": round(statistics.mean(run["reranked"] for run in runs), 1),
+    }
+    if name == "adaptive":
+        summary["plans"] = {mode: sum(run["mode"] == mode for run in runs)
+                            for mode in sorted({run["mode"] for run in runs})}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--queries", required=True, help="JSON lines file of labelled queries")
+    parser.add_argument("--vdb-endpoint", default="", help="Milvus url, the configured one when empty")
+    parser.add_argument("--vdb-top-k", type=int, default=int(os.getenv("VECTOR_DB_TOPK", 40)))
+    parser.add_argument("--reranker-top-k", type=int, default=int(os.getenv("APP_RETRIEVER_TOPK", 4)))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per query and mode, latencies are averaged")
+    # Thresholds default to the ADAPTIVE_* environment, override them to tune
+    defaults = AdaptiveRetrieval()
+    parser.add_argument("--probe-k", type=int, default=defaults.probe_k)
+    parser.add_argument("--gap-threshold", type=float, default=defaults.gap_threshold)
+    parser.add_argument("--confident-entropy", type=float, default=defaults.confident_entropy)
+    parser.add_argument("--ambiguous-entropy", type=float, default=defaults.ambiguous_entropy)
+    parser.add_argument("--widen-factor", type=float, default=defaults.widen_factor)
+    args = parser.parse_args()
+
+    settings = get_config()
+    embedder = get_embedding_model(model=settings.embeddings.model_name, url=settings.embeddings.server_url)
+    vectorstore = get_vectorstore(embedder, args.collection, args.vdb_endpoint)
+    if vectorstore is None:
+        raise SystemExit(f"Collection {args.collection} is not available")
+    ranker = get_ranking_model(model=settings.ranking.model_name, url=settings.ranking.server_url,
+                               top_n=args.reranker_top_k)
+    adaptive = AdaptiveRetrieval(probe_k=args.probe_k, gap_threshold=args.gap_threshold,
+                                 confident_entropy=args.confident_entropy, ambiguous_entropy=args.ambiguous_entropy,
+                                 widen_factor=args.widen_factor)
+    queries = _load_queries(args.queries)
+
+    # Warm up the connections and model endpoints outside of the measurements
+    _run_fixed(vectorstore, ranker, queries[0]["query"], args)
+
+    results = {"fixed": [], "adaptive": []}
+    for query in queries:
+        for mode, results_of_mode in results.items():
+            runs = [
+                _run_fixed(vectorstore, ranker, query["query"], args) if mode == "fixed"
+                else _run_adaptive(vectorstore, ranker, adaptive, query["query"], args)
+                for _ in range(args.repeat)
+            ]
+            results_of_mode.append({**runs[-1], "seconds": statistics.mean(run["seconds"] for run in runs)})
+
+    fixed, adaptive_summary = _summary("fixed", results["fixed"], queries), _summary("adaptive", results["adaptive"], queries)
+    adaptive_summary["recall_delta"] = round(adaptive_summary["recall"] - fixed["recall"], 4)
+    adaptive_summary["latency_saved_pct"] = round(
+        100 * (1 - adaptive_summary["latency_mean_ms"] / fixed["latency_mean_ms"]), 1) if fixed["latency_mean_ms"] else 0.0
+    print(json.dumps([fixed, adaptive_summary], indent=2))
+
+
+if __name__ == "__main__":
+    main()
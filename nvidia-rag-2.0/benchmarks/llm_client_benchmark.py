@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare pooled LLM clients against one client per distinct sampling configuration.
+
+Sends --requests short prompts with randomized temperature/top_p/max_tokens, as the
+frontend sliders do, and counts the TCP connections opened by the HTTP clients.
+Run from the nvidia-rag-2.0 directory with the same environment as the server:
+
+    python benchmarks/llm_client_benchmark.py --llm-endpoint nim-llm:8000 --model meta/llama-3.1-8b-instruct
+"""
+import argparse
+import json
+import logging
+import random
+import time
+
+from src.utils import LLM_SAMPLING_PARAMS, get_llm, get_llm_client
+
+
+class _ConnectionCounter(logging.Handler):
+    """Counts new connections logged by urllib3 (ChatNVIDIA) and httpcore (ChatOpenAI)"""
+
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.connections = 0
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Starting new HTTP") or message.startswith("connect_tcp.complete"):
+            self.connections += 1
+
+
+def _sampling_params(rng: random.Random) -> dict:
+    return {
+        "temperature": round(rng.uniform(0.0, 1.0), 1),
+        "top_p": round(rng.uniform(0.1, 1.0), 1),
+        "max_tokens": rng.choice([32, 64, 128]),
+    }
+
+
+def _run(mode: str, args, counter: _ConnectionCounter) -> dict:
+    rng = random.Random(args.seed)
+    counter.connections = 0
+    get_llm_client.cache_clear()
+    clients = set()
+    per_params_clients = {}
+    latencies = []
+    for _ in range(args.requests):
+        params = _sampling_params(rng)
+        if mode == "pooled":
+            llm = get_llm(model=args.model, llm_endpoint=args.llm_endpoint, **params)
+        else:
+            # Previous behaviour: one cached client per distinct sampling configuration
+            key = tuple(sorted(params.items()))
+            if key not in per_params_clients:
+                per_params_clients[key] = get_llm_client.__wrapped__(model=args.model, llm_endpoint=args.llm_endpoint)
+            llm = per_params_clients[key].bind(**{name: params[name] for name in LLM_SAMPLING_PARAMS if name in params})
+        clients.add(id(getattr(llm, "bound", llm)))
+        start_time = time.perf_counter()
+        llm.invoke(args.prompt)
+        latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "clients": len(clients),
+        "connections_opened": counter.connections,
+        "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "latency_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-endpoint", default="", help="host:port of the LLM NIM, empty for the API catalog")
+    parser.add_argument("--model", required=True, help="LLM model name")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--prompt", default="Reply with the single word: ok")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counter = _ConnectionCounter()
+    for name in ("urllib3.connectionpool", "httpcore.connection"):
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(counter)
+
+    results = [_run("per_params", args, counter), _run("pooled", args, counter)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Sweep Milvus index and search parameters and recommend a vector_store configuration.
+
+The corpus is copied from an existing collection (--collection) or generated (--synthetic N
+clustered vectors with the configured embedding dimension) into a scratch collection, the
+source collection is never modified. Queries are embedded from a JSON lines file of
+{"query": "..."} objects with the configured embedding model (--queries), or are perturbed
+corpus vectors. Every index type, nlist and nprobe combination that VectorStoreConfig can
+express is built and searched; reported are recall@k against an exact (FLAT) search, p50/p99
+search latency, index build time and the memory of the loaded segments. The fastest setting
+reaching --target-recall is written as a config file section with its environment variables.
+Run from the nvidia-rag-2.0 directory with the same environment as the server:
+
+    python benchmarks/milvus_index_benchmark.py --synthetic 100000 --output index_recommendation.yaml
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import yaml
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections, utility
+
+from src.utils import get_config, get_embedding_model
+
+_ALIAS = "index_benchmark"
+_INSERT_BATCH = 2000
+
+# Index types configurable through VectorStoreConfig: index_type with nlist and nprobe
+CPU_INDEX_TYPES = ["FLAT", "IVF_FLAT", "IVF_SQ8"]
+GPU_INDEX_TYPES = ["GPU_IVF_FLAT"]
+
+
+def _synthetic_corpus(size: int, dimension: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors around random centers, closer to embeddings than uniform noise"""
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size)] + 0.35 * rng.standard_normal((size, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _collection_corpus(name: str, vector_field: str, limit: int) -> np.ndarray:
+    source = Collection(name, using=_ALIAS)
+    source.load()
+    iterator = source.query_iterator(batch_size=1000, output_fields=[vector_field], limit=limit or -1)
+    vectors = []
+    while True:
+        batch = iterator.next()
+        if not batch:
+            iterator.close()
+            break
+        vectors.extend(row[vector_field] for row in batch)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def _queries(args, corpus: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    if args.queries:
+        settings = get_config()
+        embedder = get_embedding_model(model=settings.embeddings.model_name, url=settings.embeddings.server_url)
+        with open(args.queries) as f:
+            texts = [json.loads(line)["query"] for line in f if line.strip()]
+        return np.asarray([embedder.embed_query(text) for text in texts], dtype=np.float32)
+    # Perturbed corpus vectors, so that every query has close but not identical neighbours
+    picked = corpus[rng.choice(len(corpus), size=min(args.num_queries, len(corpus)), replace=False)]
+    noisy = picked + 0.1 * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(corpus.shape[1])
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def _create_scratch_collection(name: str, corpus: np.ndarray) -> Collection:
+    if utility.has_collection(name, using=_ALIAS):
+        utility.drop_collection(name, using=_ALIAS)
+    schema = CollectionSchema([
+        FieldSchema("pk", DataType.INT64, is_primary=True, auto_id=True),
+        FieldSchema("vector", DataType.FLOAT_VECTOR, dim=corpus.shape[1]),
+    ])
+    collection = Collection(name, schema, using=_ALIAS)
+    for start in range(0, len(corpus), _INSERT_BATCH):
+        collection.insert([corpus[start:start + _INSERT_BATCH].tolist()])
+    collection.flush()
+    return collection
+
+
+def _build(collection: Collection, index_type: str, metric: str, nlist: int) -> dict:
+    """Replace the index of the collection and load it, returns build time and memory"""
+    collection.release()
+    if collection.has_index():
+        collection.drop_index()
+    params = {} if index_type == "FLAT" else {"nlist": nlist}
+    start_time = time.perf_counter()
+    collection.create_index("vector", {"index_type": index_type, "metric_type": metric, "params": params})
+    utility.wait_for_index_building_complete(collection.name, using=_ALIAS)
+    collection.load()
+    build_seconds = time.perf_counter() - start_time
+    segments = utility.get_query_segment_info(collection.name, using=_ALIAS)
+    return {"build_seconds": build_seconds, "memory_mb": sum(segment.mem_size for segment in segments) / 2 ** 20}
+
+
+def _search(collection: Collection, queries: np.ndarray, metric: str, k: int, nprobe: int) -> tuple:
+    """Searches one query at a time, returns the hit ids per query and the latencies"""
+    params = {"metric_type": metric, "params": {"nprobe": nprobe}}
+    hits, latencies = [], []
+    for query in queries:
+        start_time = time.perf_counter()
+        result = collection.search([query.tolist()], "vector", params, limit=k)
+        latencies.append(time.perf_counter() - start_time)
+        hits.append({hit.id for hit in result[0]})
+    return hits, latencies
+
+
+def _percentile(values: list, fraction: float) -> float:
+    return float(np.percentile(values, fraction * 100))
+
+
+def _recommend(results: list, target_recall: float) -> dict:
+    """Lowest p99 latency among the settings reaching the target recall, else the best recall"""
+    reaching = [result for result in results if result["recall"] >= target_recall]
+    if reaching:
+        return min(reaching, key=lambda result: (result["latency_p99_ms"], result["memory_mb"]))
+    return max(results, key=lambda result: (result["recall"], -result["latency_p99_ms"]))
+
+
+def _write_recommendation(path: str, best: dict, args, source: str) -> None:
+    gpu = best["index_type"].startswith("GPU_")
+    section = {"vector_store": {
+        "index_type": best["index_type"],
+        "nlist": best["nlist"],
+        "nprobe": best["nprobe"],
+        "enable_gpu_index": gpu,
+        "enable_gpu_search": gpu,
+    }}
+    environment = {
+        "APP_VECTORSTORE_INDEXTYPE": best["index_type"],
+        "APP_VECTORSTORE_NLIST": best["nlist"],
+        "APP_VECTORSTORE_NPROBE": best["nprobe"],
+        "APP_VECTORSTORE_ENABLEGPUINDEX": gpu,
+        "APP_VECTORSTORE_ENABLEGPUSEARCH": gpu,
+    }
+    header = [
+        f"Recommended by benchmarks/milvus_index_benchmark.py for {source}, k={args.k}, target recall {args.target_recall}",
+        f"recall@{args.k} {best['recall']}, p50 {best['latency_p50_ms']} ms, p99 {best['latency_p99_ms']} ms, "
+        f"build {best['build_seconds']} s, memory {best['memory_mb']} MB",
+        "As environment variables:",
+        *(f"  {name}={value}" for name, value in environment.items()),
+    ]
+    with open(path, "w") as f:
+        f.write("".join(f"# {line}\n" for line in header))
+        yaml.safe_dump(section, f, sort_keys=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--collection", help="Copy the vectors of this collection")
+    source.add_argument("--synthetic", type=int, help="Generate this many vectors")
+    parser.add_argument("--vdb-endpoint", default="", help="Milvus url, the configured one when empty")
+    parser.add_argument("--vector-field", default="vector", help="Dense vector field of --collection")
+    parser.add_argument("--max-vectors", type=int, default=0, help="Copy at most this many vectors, 0 for all")
+    parser.add_argument("--dimension", type=int, default=0, help="Synthetic dimension, the configured embedding dimension when 0")
+    parser.add_argument("--clusters", type=int, default=256, help="Clusters of the synthetic corpus")
+    parser.add_argument("--queries", help="JSON lines file of {\"query\": ...}, perturbed corpus vectors when missing")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", default="L2", choices=["L2", "IP", "COSINE"])
+    parser.add_argument("--index-types", nargs="*", default=CPU_INDEX_TYPES)
+    parser.add_argument("--gpu", action="store_true", help="Also sweep the GPU index types")
+    parser.add_argument("--nlist", type=int, nargs="*", default=[64, 128, 256, 1024])
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[8, 16, 32, 64])
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--output", default="index_recommendation.yaml")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = get_config()
+    endpoint = args.vdb_endpoint or settings.vector_store.url
+    connections.connect(_ALIAS, uri=endpoint)
+    rng = np.random.default_rng(args.seed)
+
+    if args.collection:
+        corpus = _collection_corpus(args.collection, args.vector_field, args.max_vectors)
+        source_name = f"collection {args.collection} ({len(corpus)} vectors)"
+    else:
+        dimension = args.dimension or settings.embeddings.dimensions
+        corpus = _synthetic_corpus(args.synthetic, dimension, args.clusters, rng)
+        source_name = f"synthetic corpus ({len(corpus)} x {dimension})"
+    queries = _queries(args, corpus, rng)
+
+    scratch = _create_scratch_collection(f"index_benchmark_{os.getpid()}", corpus)
+    index_types = [index_type for index_type in args.index_types if index_type != "FLAT"]
+    index_types += GPU_INDEX_TYPES if args.gpu else []
+    results = []
+    try:
+        # Exact search is the reference for recall
+        exact = _build(scratch, "FLAT", args.metric, 0)
+        truth, latencies = _search(scratch, queries, args.metric, args.k, 1)
+        results.append({"index_type": "FLAT", "nlist": 0, "nprobe": 0, "recall": 1.0, **exact,
+                        "latency_p50_ms": _percentile(latencies, 0.5) * 1000,
+                        "latency_p99_ms": _percentile(latencies, 0.99) * 1000})
+        for index_type in index_types:
+            for nlist in args.nlist:
+                build = _build(scratch, index_type, args.metric, nlist)
+                for nprobe in (nprobe for nprobe in args.nprobe if nprobe <= nlist):
+                    hits, latencies = _search(scratch, queries, args.metric, args.k, nprobe)
+                    recall = np.mean([len(found & expected) / max(len(expected), 1) for found, expected in zip(hits, truth)])
+                    results.append({"index_type": index_type, "nlist": nlist, "nprobe": nprobe, "recall": float(recall),
+                                    **build, "latency_p50_ms": _percentile(latencies, 0.5) * 1000,
+                                    "latency_p99_ms": _percentile(latencies, 0.99) * 1000})
+    finally:
+        utility.drop_collection(scratch.name, using=_ALIAS)
+        connections.disconnect(_ALIAS)
+
+    for result in results:
+        for key in ("recall", "build_seconds", "memory_mb", "latency_p50_ms", "latency_p99_ms"):
+            result[key] = round(result[key], 4 if key == "recall" else 2)
+    best = _recommend(results, args.target_recall)
+    _write_recommendation(args.output, best, args, source_name)
+    print(json.dumps({"source": source_name, "queries": len(queries), "k": args.k, "results": results,
+                      "recommendation": best, "written_to": args.output}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
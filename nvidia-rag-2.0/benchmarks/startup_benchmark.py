@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure cold import time and memory of the RAG server modules, and optionally the warm-up.
+
+Each run imports the module in a fresh interpreter so nothing is cached between runs.
+Run from the nvidia-rag-2.0 directory with the same environment as the server:
+
+    python benchmarks/startup_benchmark.py --module src.server --runs 5 --warm-up
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import json, resource, time
+start_time = time.perf_counter()
+import {module}
+import_seconds = time.perf_counter() - start_time
+result = {{"import_seconds": import_seconds}}
+if {warm_up}:
+    from src.chains import warm_up
+    start_time = time.perf_counter()
+    result["warm_up"] = warm_up()
+    result["warm_up_seconds"] = time.perf_counter() - start_time
+result["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print("STARTUP_BENCHMARK " + json.dumps(result))
+"""
+
+
+def _run_once(module: str, warm_up: bool) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, warm_up=warm_up)],
+        capture_output=True, text=True, check=True, cwd=os.getcwd(),
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith("STARTUP_BENCHMARK "):
+            return json.loads(line[len("STARTUP_BENCHMARK "):])
+    raise RuntimeError(f"Benchmark probe produced no result:\n{completed.stderr}")
+
+
+def _slowest_imports(module: str, top: int) -> list:
+    """Cumulative import time per module as reported by -X importtime"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, cwd=os.getcwd(),
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.server", help="Module to import, e.g. src.chains or src.server")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold imports to measure")
+    parser.add_argument("--warm-up", action="store_true", help="Also time src.chains.warm_up() after the import")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list, 0 to skip")
+    args = parser.parse_args()
+
+    results = [_run_once(args.module, args.warm_up) for _ in range(args.runs)]
+    import_seconds = [result["import_seconds"] for result in results]
+    summary = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_seconds_median": round(statistics.median(import_seconds), 3),
+        "import_seconds_min": round(min(import_seconds), 3),
+        "import_seconds_max": round(max(import_seconds), 3),
+        "max_rss_mb": round(max(result["max_rss_mb"] for result in results), 1),
+    }
+    if args.warm_up:
+        summary["warm_up_seconds_median"] = round(statistics.median(r["warm_up_seconds"] for r in results), 3)
+        summary["warm_up_last"] = results[-1]["warm_up"]
+    print(json.dumps(summary, indent=2))
+
+    if args.top:
+        print(f"\nSlowest imports of {args.module} (cumulative):")
+        for microseconds, name in _slowest_imports(args.module, args.top):
+            print(f"{microseconds / 1e6:8.3f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the per-request overhead of LangChain tracing at different sampling and content settings.
+
+Every setting runs in a fresh interpreter with its TRACING_* environment. A request is a
+retriever step, a reranker step and a streamed answer from a fake chat model over a long
+context, so only the instrumentation cost is measured. Spans go to an in-memory exporter.
+Run from the nvidia-rag-2.0 directory with the same environment as the server:
+
+    python benchmarks/tracing_overhead_benchmark.py --requests 200 --context-chars 40000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SETTINGS = {
+    "off": None,
+    "full": {},
+    "truncated_4k": {"TRACING_MAX_ATTRIBUTE_LENGTH": "4096"},
+    "hash": {"TRACING_CONTENT_MODE": "hash"},
+    "hash_no_token_events": {"TRACING_CONTENT_MODE": "hash", "TRACING_TOKEN_EVENTS": "False"},
+    "head_10pct": {"TRACING_SAMPLE_RATIO": "0.1"},
+    "tail_10pct_1s": {"TRACING_SAMPLE_RATIO": "0.1", "TRACING_TAIL_LATENCY_THRESHOLD": "1"},
+}
+
+_PROBE = """
+import json, statistics, time
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers.string import StrOutputParser
+from langchain_core.prompts.chat import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+args = json.loads({args!r})
+provider = exporter = None
+if args["tracing"]:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from src.observability.langchain_instrumentor import LangchainInstrumentor
+    from src.observability.otel_metrics import OtelMetrics
+    from src.observability.sampling import create_tracer_provider
+    exporter = InMemorySpanExporter()
+    provider = create_tracer_provider(Resource(attributes={{"service.name": "rag"}}), exporter)
+    trace.set_tracer_provider(provider)
+    LangchainInstrumentor().instrument(tracer_provider=provider, metrics=OtelMetrics())
+
+chunk = ("lorem ipsum dolor sit amet " * 200)[:2000]
+documents = [Document(page_content=chunk) for _ in range(max(1, args["context_chars"] // 2000))]
+answer = " ".join(["token"] * args["answer_tokens"])
+retriever = RunnableLambda(lambda query: documents)
+reranker = RunnableLambda(lambda docs: docs[:len(docs) // 2 or 1])
+prompt = ChatPromptTemplate.from_messages([("system", "Answer from the context: {{context}}"), ("user", "{{question}}")])
+
+def request():
+    docs = reranker.invoke(retriever.invoke("question", config={{"run_name": "retriever"}}),
+                           config={{"run_name": "context_reranker"}})
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content=answer)]))
+    chain = prompt | llm | StrOutputParser()
+    context = "\\n".join(doc.page_content for doc in docs)
+    for _ in chain.stream({{"question": "question", "context": context}}, config={{"run_name": "llm-stream"}}):
+        pass
+
+for _ in range(args["warmup"]):
+    request()
+latencies = []
+for _ in range(args["requests"]):
+    start_time = time.perf_counter()
+    request()
+    latencies.append(time.perf_counter() - start_time)
+spans = 0
+if provider:
+    provider.force_flush()
+    spans = len(exporter.get_finished_spans())
+latencies.sort()
+print("TRACING_BENCHMARK " + json.dumps({{
+    "mean_ms": statistics.mean(latencies) * 1000,
+    "p50_ms": latencies[len(latencies) // 2] * 1000,
+    "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    "exported_spans": spans,
+}}))
+"""
+
+
+def _run(name: str, env_overrides, args) -> dict:
+    env = {key: value for key, value in os.environ.items() if not key.startswith("TRACING_")}
+    env.update(env_overrides or {})
+    probe_args = {
+        "tracing": env_overrides is not None,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "context_chars": args.context_chars,
+        "answer_tokens": args.answer_tokens,
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(args=json.dumps(probe_args))],
+        capture_output=True, text=True, check=True, cwd=os.getcwd(), env=env,
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith("TRACING_BENCHMARK "):
+            return {"setting": name, **json.loads(line[len("TRACING_BENCHMARK "):])}
+    raise RuntimeError(f"Benchmark probe produced no result:\n{completed.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--context-chars", type=int, default=40000, help="Size of the retrieved context per request")
+    parser.add_argument("--answer-tokens", type=int, default=300, help="Streamed tokens per answer")
+    parser.add_argument("--settings", nargs="*", default=list(SETTINGS), choices=list(SETTINGS))
+    args = parser.parse_args()
+
+    results = [_run(name, SETTINGS[name], args) for name in args.settings]
+    baseline = next((result["mean_ms"] for result in results if result["setting"] == "off"), None)
+    for result in results:
+        if baseline is not None:
+            result["overhead_ms"] = result["mean_ms"] - baseline
+        for key, value in result.items():
+            if isinstance(value, float):
+                result[key] = round(value, 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Adaptive retrieval depth and conditional reranking.
+
+With the reranker enabled every query pulls vdb_top_k candidates and reranks all of them,
+even when the first vector hits clearly dominate. A small probe search is made first and
+the distribution of its relevance scores decides the rest:
+
+- confident: the top hit leads the runner-up by at least ADAPTIVE_GAP_THRESHOLD, or the
+  softmax entropy of the scores is low; the probe's best reranker_top_k hits are used as
+  they are, without a second search and without the reranker
+- ambiguous: the scores are nearly flat, vdb_top_k * ADAPTIVE_WIDEN_FACTOR candidates are
+  retrieved and reranked
+- otherwise vdb_top_k candidates are retrieved and reranked as before
+"""
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .observability.otel_metrics import OtelMetrics
+
+logger = logging.getLogger(__name__)
+
+# Candidates fetched by the probe search whose scores are inspected
+ADAPTIVE_PROBE_K = int(os.getenv("ADAPTIVE_PROBE_K", 10))
+# Relevance lead of the top hit over the second one above which a query counts as confident
+ADAPTIVE_GAP_THRESHOLD = float(os.getenv("ADAPTIVE_GAP_THRESHOLD", 0.08))
+# Normalized score entropy below which a query counts as confident and above which as ambiguous
+ADAPTIVE_CONFIDENT_ENTROPY = float(os.getenv("ADAPTIVE_CONFIDENT_ENTROPY", 0.6))
+ADAPTIVE_AMBIGUOUS_ENTROPY = float(os.getenv("ADAPTIVE_AMBIGUOUS_ENTROPY", 0.97))
+# Softmax temperature applied to the relevance scores (0 to 1) before computing their entropy
+ADAPTIVE_SCORE_TEMPERATURE = float(os.getenv("ADAPTIVE_SCORE_TEMPERATURE", 0.05))
+# Ambiguous queries retrieve vdb_top_k * ADAPTIVE_WIDEN_FACTOR candidates, at most ADAPTIVE_MAX_K
+ADAPTIVE_WIDEN_FACTOR = float(os.getenv("ADAPTIVE_WIDEN_FACTOR", 2.0))
+ADAPTIVE_MAX_K = int(os.getenv("ADAPTIVE_MAX_K", 200))
+
+CONFIDENT = "confident"
+DEFAULT = "default"
+AMBIGUOUS = "ambiguous"
+
+
+@dataclass
+class ScoreProfile:
+    """Shape of the relevance scores of a probe search"""
+    top_score: float = 0.0
+    gap: float = 0.0
+    entropy: float = 1.0
+
+
+def score_profile(scores: Sequence[float], temperature: float = ADAPTIVE_SCORE_TEMPERATURE) -> ScoreProfile:
+    """
+    Arguments:
+        - scores: Sequence[float] - Relevance scores, higher is better
+        - temperature: float - Softmax temperature, smaller values make score differences count more
+
+    Returns:
+        - ScoreProfile - Top score, its lead over the second score and the softmax entropy of the
+          scores normalized to 0 (one hit takes all) to 1 (all hits are equal)
+    """
+    ranked = sorted(scores, reverse=True)
+    if not ranked:
+        return ScoreProfile()
+    if len(ranked) == 1:
+        return ScoreProfile(top_score=ranked[0], gap=ranked[0], entropy=0.0)
+    weights = [math.exp((score - ranked[0]) / max(temperature, 1e-6)) for score in ranked]
+    total = sum(weights)
+    entropy = -sum(weight / total * math.log(weight / total) for weight in weights if weight > 0)
+    return ScoreProfile(top_score=ranked[0], gap=ranked[0] - ranked[1], entropy=entropy / math.log(len(ranked)))
+
+
+@dataclass
+class RetrievalPlan:
+    """Retrieval depth and reranking chosen for a query"""
+    mode: str
+    k: int
+    rerank: bool
+    profile: ScoreProfile = field(default_factory=ScoreProfile)
+
+
+@dataclass
+class AdaptiveResult:
+    """Result of AdaptiveRetrieval.retrieve"""
+    documents: List[Any]
+    plan: RetrievalPlan
+    searches: int = 1
+
+
+class AdaptiveRetrieval:
+    """Plans the retrieval depth and reranking of a query from the scores of a probe search"""
+
+    def __init__(
+            self,
+            probe_k: int = ADAPTIVE_PROBE_K,
+            gap_threshold: float = ADAPTIVE_GAP_THRESHOLD,
+            confident_entropy: float = ADAPTIVE_CONFIDENT_ENTROPY,
+            ambiguous_entropy: float = ADAPTIVE_AMBIGUOUS_ENTROPY,
+            temperature: float = ADAPTIVE_SCORE_TEMPERATURE,
+            widen_factor: float = ADAPTIVE_WIDEN_FACTOR,
+            max_k: int = ADAPTIVE_MAX_K,
+            metrics: Optional["OtelMetrics"] = None
+        ):
+        self.probe_k = probe_k
+        self.gap_threshold = gap_threshold
+        self.confident_entropy = confident_entropy
+        self.ambiguous_entropy = ambiguous_entropy
+        self.temperature = temperature
+        self.widen_factor = widen_factor
+        self.max_k = max_k
+        # Set by the server once tracing is instrumented
+        self.metrics = metrics
+
+    def plan(self, scores: Sequence[float], vdb_top_k: int, reranker_top_k: int) -> RetrievalPlan:
+        """
+        Arguments:
+            - scores: Sequence[float] - Relevance scores of the probe search
+            - vdb_top_k: int - Candidates retrieved for reranking by default
+            - reranker_top_k: int - Documents kept after reranking
+
+        Returns:
+            - RetrievalPlan - Number of candidates to retrieve and whether to rerank them
+        """
+        profile = score_profile(scores, self.temperature)
+        if len(scores) >= 2 and (profile.gap >= self.gap_threshold or profile.entropy <= self.confident_entropy):
+            return RetrievalPlan(CONFIDENT, reranker_top_k, False, profile)
+        if len(scores) >= 2 and profile.entropy >= self.ambiguous_entropy:
+            widened = max(vdb_top_k, min(int(math.ceil(vdb_top_k * self.widen_factor)), self.max_k))
+            return RetrievalPlan(AMBIGUOUS, widened, True, profile)
+        return RetrievalPlan(DEFAULT, vdb_top_k, True, profile)
+
+    def retrieve(
+            self,
+            search: Callable[[int], List[Tuple[Any, float]]],
+            rerank: Callable[[List[Any]], List[Any]],
+            vdb_top_k: int,
+            reranker_top_k: int,
+            collection_name: str = ""
+        ) -> AdaptiveResult:
+        """
+        Arguments:
+            - search: Callable[[int], List[Tuple[Any, float]]] - Vector search for k documents
+              returning (document, relevance score) pairs ordered by relevance
+            - rerank: Callable[[List[Any]], List[Any]] - Reranks candidates, keeping reranker_top_k
+            - vdb_top_k: int - Candidates retrieved for reranking by default
+            - reranker_top_k: int - Documents returned
+
+        Returns:
+            - AdaptiveResult - Documents for the context and the plan that produced them
+        """
+        probe_k = max(self.probe_k, reranker_top_k)
+        probe = search(probe_k)
+        plan = self.plan([score for _, score in probe], vdb_top_k, reranker_top_k)
+        searches = 1
+        # A probe returning fewer hits than requested already holds the whole (filtered) collection
+        if plan.k <= len(probe) or len(probe) < probe_k:
+            candidates = [document for document, _ in probe[:plan.k]]
+        else:
+            candidates = [document for document, _ in search(plan.k)]
+            searches += 1
+        if plan.rerank:
+            documents = rerank(candidates)
+        else:
+            documents = candidates[:reranker_top_k]
+            # Citations and the context order read the score the reranker would have set
+            for document, score in probe[:reranker_top_k]:
+                document.metadata["relevance_score"] = score
+        logger.info("Adaptive retrieval planned %s: %s candidates, reranked: %s, gap %.3f, entropy %.3f",
+                    plan.mode, len(candidates), plan.rerank, plan.profile.gap, plan.profile.entropy)
+        if self.metrics:
+            self.metrics.record_adaptive_retrieval(plan.mode, len(candidates), plan.rerank, collection=collection_name)
+        return AdaptiveResult(documents, plan, searches)
@@ -0,0 +1,198 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Admission control for the RAG server.
+
+Each pipeline stage (retrieval, LLM streaming) has a concurrency limit and a bounded
+priority queue in front of it. Requests which cannot be served within the queue-time
+SLO are rejected immediately with a Retry-After hint instead of slowing down everyone.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .observability.otel_metrics import OtelMetrics
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests per stage, 0 disables admission control for that stage
+ADMISSION_RETRIEVAL_CONCURRENCY = int(os.getenv("ADMISSION_RETRIEVAL_CONCURRENCY", 16))
+ADMISSION_LLM_CONCURRENCY = int(os.getenv("ADMISSION_LLM_CONCURRENCY", 64))
+# Maximum number of requests waiting per stage, further requests are rejected with 429
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 128))
+# Queue-time SLO in seconds, requests expected to or actually waiting longer are rejected with 503
+ADMISSION_MAX_QUEUE_WAIT = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT", 10))
+
+# Priorities of the X-Request-Priority header, lower is served first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = "normal"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted, carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, stage: str, status_code: int, retry_after: int, reason: str):
+        self.stage = stage
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f"{stage} stage is overloaded ({reason}), retry after {retry_after}s")
+
+
+def parse_priority(value: Optional[str]) -> int:
+    """Map an X-Request-Priority header value to a queue priority"""
+    return PRIORITIES.get((value or DEFAULT_PRIORITY).strip().lower(), PRIORITIES[DEFAULT_PRIORITY])
+
+
+class AdmissionSlot:
+    """A granted slot of a stage. release() is idempotent and may be called from any thread."""
+
+    def __init__(self, controller: "AdmissionController", loop: asyncio.AbstractEventLoop):
+        self._controller = controller
+        self._loop = loop
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        # Slots are released from the event loop and from producer threads, only the first call counts
+        with self._controller._release_lock:  # pylint: disable=protected-access
+            if self._released:
+                return
+            self._released = True
+        held = time.monotonic() - self._acquired_at
+        self._loop.call_soon_threadsafe(self._controller._release, held)  # pylint: disable=protected-access
+
+    async def __aenter__(self) -> "AdmissionSlot":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded priority wait queue for one pipeline stage"""
+
+    def __init__(
+            self,
+            stage: str,
+            max_concurrency: int,
+            max_queue: int = ADMISSION_MAX_QUEUE,
+            max_queue_wait: float = ADMISSION_MAX_QUEUE_WAIT,
+            metrics: Optional["OtelMetrics"] = None
+        ):
+        self.stage = stage
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.metrics = metrics
+        self.active = 0
+        # (priority, sequence, future) so that equal priorities are served first come first served
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        # Smoothed time a slot is held, used to predict queue time and Retry-After
+        self._avg_hold_seconds = 1.0
+        # Makes AdmissionSlot.release check-and-set atomic across threads
+        self._release_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def _expected_wait(self, position: int) -> float:
+        return (position + 1) / self.max_concurrency * self._avg_hold_seconds
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._expected_wait(len(self._waiters))))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        if self.metrics:
+            self.metrics.update_admission_rejections(self.stage, reason)
+        logger.warning("Admission control rejected a %s request: %s (active %d, queued %d)",
+                       self.stage, reason, self.active, len(self._waiters))
+        return AdmissionRejected(self.stage, status_code, self._retry_after(), reason)
+
+    def _report(self, waited: Optional[float] = None) -> None:
+        if self.metrics:
+            self.metrics.update_admission_queue(self.stage, len(self._waiters), self.active)
+            if waited is not None:
+                self.metrics.record_admission_wait(self.stage, waited)
+
+    async def acquire(self, priority: int = PRIORITIES[DEFAULT_PRIORITY]) -> AdmissionSlot:
+        """
+        Wait for a slot of this stage.
+
+        Arguments:
+            - priority: int - Queue priority, lower values are admitted first
+
+        Returns:
+            - AdmissionSlot - Slot to release once the stage is done
+
+        Raises:
+            - AdmissionRejected - 429 when the queue is full, 503 when the queue-time SLO can't be met
+        """
+        loop = asyncio.get_running_loop()
+        if not self.enabled or (self.active < self.max_concurrency and not self._waiters):
+            self.active += 1
+            self._report(waited=0.0)
+            return AdmissionSlot(self, loop)
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(429, "queue_full")
+        ahead = sum(1 for waiter_priority, _, _ in self._waiters if waiter_priority <= priority)
+        if self._expected_wait(ahead) > self.max_queue_wait:
+            raise self._reject(503, "queue_time_slo")
+
+        start_time = time.monotonic()
+        future = loop.create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        self._report()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_queue_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up, pass it on
+                self._release(None)
+            else:
+                future.cancel()
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._report()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(503, "queue_timeout") from e
+
+        self._report(waited=time.monotonic() - start_time)
+        return AdmissionSlot(self, loop)
+
+    def _release(self, held_seconds: Optional[float]) -> None:
+        if held_seconds is not None:
+            self._avg_hold_seconds = 0.8 * self._avg_hold_seconds + 0.2 * held_seconds
+        # Hand the slot directly to the next waiter so newcomers can't overtake the queue
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                self._report()
+                return
+        self.active -= 1
+        self._report()
@@ -15,53 +15,167 @@
 
 import logging
 import os
+import time
 import requests
 from traceback import print_exc
-from typing import Any, Iterable
+from typing import TYPE_CHECKING, Any, Iterable
 from typing import Dict
 from typing import Generator
 from typing import List
+from typing import Optional
 
 from langchain_nvidia_ai_endpoints.callbacks import get_usage_callback
-from langchain_community.document_loaders import UnstructuredFileLoader
 from langchain_core.output_parsers.string import StrOutputParser
 from langchain_core.prompts import MessagesPlaceholder
 from langchain_core.prompts.chat import ChatPromptTemplate
 from langchain_core.runnables import RunnableAssign
+from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables import RunnablePassthrough
 from requests import ConnectTimeout
 
+from .adaptive_retrieval import AdaptiveRetrieval
 from .base import BaseExample
+from .context_builder import ContextBuilder, get_token_counter
+from .conversation_summary import ConversationSummarizer
+from .document_parser import DocumentParserPool
+from .observability.timed_embeddings import TimedEmbeddings
 from .utils import create_vectorstore_langchain
+from .utils import document_filter_expr
 from .utils import get_config
 from .utils import get_embedding_model
 from .utils import get_llm
 from .utils import get_prompts
 from .utils import get_ranking_model
-from .utils import get_text_splitter
 from .utils import get_vectorstore
-from .utils import format_document_with_source
 from .utils import streaming_filter_think, get_streaming_filter_think_parser
 from .reflection import ReflectionCounter, check_context_relevance, check_response_groundedness
 from .utils import normalize_relevance_scores
+from .utils import run_config
+
+if TYPE_CHECKING:
+    from .observability.otel_metrics import OtelMetrics
 
 logger = logging.getLogger(__name__)
 VECTOR_STORE_PATH = "vectorstore.pkl"
-TEXT_SPLITTER = None
-settings = get_config()
-document_embedder = get_embedding_model(model=settings.embeddings.model_name, url=settings.embeddings.server_url)
-ranker = get_ranking_model(model=settings.ranking.model_name, url=settings.ranking.server_url, top_n=settings.retriever.top_k)
-query_rewriter_llm_config = {"temperature": 0.7, "top_p": 0.2, "max_tokens": 1024}
-logger.info("Query rewriter llm config: model name %s, url %s, config %s", settings.query_rewriter.model_name, settings.query_rewriter.server_url, query_rewriter_llm_config)
-query_rewriter_llm = get_llm(model=settings.query_rewriter.model_name, url=settings.query_rewriter.server_url, **query_rewriter_llm_config)
+DOCUMENT_PARSER_POOL = DocumentParserPool()
+CONTEXT_BUILDER = ContextBuilder()
+CONVERSATION_SUMMARIZER = ConversationSummarizer()
+ADAPTIVE_RETRIEVAL = AdaptiveRetrieval()
+QUERY_REWRITER_LLM_CONFIG = {"temperature": 0.7, "top_p": 0.2, "max_tokens": 1024}
 prompts = get_prompts()
 vdb_top_k = int(os.environ.get("VECTOR_DB_TOPK", 40))
+# Set by the server once tracing is instrumented, see set_metrics
+METRICS: Optional["OtelMetrics"] = None
+
+
+def set_metrics(metrics: Optional["OtelMetrics"]) -> None:
+    """Report context, conversation summary and embedding metrics to metrics"""
+    global METRICS  # pylint: disable=global-statement
+    METRICS = metrics
+    CONTEXT_BUILDER.metrics = metrics
+    CONVERSATION_SUMMARIZER.metrics = metrics
+    ADAPTIVE_RETRIEVAL.metrics = metrics
+
+
+def get_request_embedder(collection_name: str, **kwargs):
+    """Embedding client of a request, timed when metrics are enabled."""
+    document_embedder = get_embedding_model(model=kwargs.get("embedding_model"), url=kwargs.get("embedding_endpoint"))
+    if METRICS:
+        return TimedEmbeddings(document_embedder, METRICS, collection=collection_name)
+    return document_embedder
+
+
+def retriever_search_kwargs(top_k: int, **kwargs) -> Dict[str, Any]:
+    """Search arguments of a request's retriever, restricted to its document_names if given."""
+    search_kwargs = {"k": top_k}
+    expr = document_filter_expr(kwargs.get("document_names"))
+    if expr:
+        search_kwargs["expr"] = expr
+    return search_kwargs
+
 
-try:
-    VECTOR_STORE = create_vectorstore_langchain(document_embedder=document_embedder)
-except Exception as ex:
-    VECTOR_STORE = None
-    logger.info("Unable to connect to vector store during initialization: %s", ex)
+class NoRelevanceScores(Exception):
+    """The vector store can't score the hits of a search, adaptive retrieval doesn't apply"""
+
+
+def adaptive_retrieve(vs, ranker, query: str, vdb_top_k: int, reranker_top_k: int, collection_name: str, **kwargs) -> Optional[List[Any]]:
+    """
+    Retrieve and rerank with ADAPTIVE_RETRIEVAL when the request enables it.
+
+    Returns:
+        Documents for the context, None when adaptive retrieval is disabled or the vector store
+        reports no relevance scores, then the fixed retrieval and reranking is used
+    """
+    if not kwargs.get("enable_adaptive_retrieval"):
+        return None
+    search_kwargs = retriever_search_kwargs(vdb_top_k, **kwargs)
+    search_kwargs.pop("k")
+
+    def scored_search(k):
+        try:
+            return vs.similarity_search_with_relevance_scores(query, k=k, **search_kwargs)
+        except (NotImplementedError, ValueError) as e:
+            # Hybrid search has no relevance score function in langchain
+            raise NoRelevanceScores(str(e)) from e
+
+    # Not a retriever, its run name maps to the retrieval stage for the latency metrics
+    search = RunnableLambda(scored_search)
+    reranker = RunnableLambda(lambda documents: ranker.compress_documents(query=query, documents=documents))
+    try:
+        result = ADAPTIVE_RETRIEVAL.retrieve(
+            lambda k: search.invoke(k, config=run_config('adaptive-retriever', collection_name, **kwargs)),
+            lambda documents: normalize_relevance_scores(
+                list(reranker.invoke(documents, config=run_config('context_reranker', collection_name, **kwargs)))),
+            vdb_top_k=vdb_top_k,
+            reranker_top_k=reranker_top_k,
+            collection_name=collection_name,
+        )
+    except NoRelevanceScores as e:
+        logger.warning("Vector store reports no relevance scores, using fixed retrieval depth: %s", e)
+        return None
+    return result.documents
+
+
+def get_document_embedder():
+    """Embedding client for the configured default model, created on first use."""
+    settings = get_config()
+    return get_embedding_model(model=settings.embeddings.model_name, url=settings.embeddings.server_url)
+
+
+def get_query_rewriter_llm():
+    """Query rewriter LLM client, created on first use."""
+    settings = get_config()
+    return get_llm(model=settings.query_rewriter.model_name, url=settings.query_rewriter.server_url, **QUERY_REWRITER_LLM_CONFIG)
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Create the model clients and connect to the vector store ahead of the first request.
+    Failures are logged and left for the request path to retry.
+
+    Returns:
+        - Dict[str, float] - Seconds spent per component, absent if the component failed
+    """
+    settings = get_config()
+    timings = {}
+    components = {
+        "embedder": get_document_embedder,
+        "ranker": lambda: get_ranking_model(
+            model=settings.ranking.model_name, url=settings.ranking.server_url, top_n=settings.retriever.top_k
+        ),
+        "query_rewriter_llm": get_query_rewriter_llm,
+        "vector_store": lambda: create_vectorstore_langchain(document_embedder=get_document_embedder()),
+        "context_tokenizer": get_token_counter,
+    }
+    for name, create in components.items():
+        start_time = time.time()
+        try:
+            create()
+            timings[name] = round(time.time() - start_time, 3)
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %s", name, e)
+    logger.info("Warm-up finished: %s", timings)
+    return timings
 
 # Get a StreamingFilterThinkParser based on configuration
 StreamingFilterThinkParser = get_streaming_filter_think_parser()
@@ -99,26 +213,41 @@ class UnstructuredRAG(BaseExample):
         Raises:
             ValueError: If there's an error during document ingestion or the file format is not supported.
         """
+        self.ingest_multiple_docs([data_dir], collection_name, vdb_endpoint)
+
+    def ingest_multiple_docs(self, filepaths: List[str], collection_name: str = "", vdb_endpoint: str = "") -> None:
+        """Parses and splits documents in a process pool and streams each parsed file
+        into embedding and the VectorDB as soon as it is ready.
+
+        Args:
+            filepaths (List[str]): The paths to the document files.
+            collection_name (str): The name of the collection to be created in the vectorstore.
+            vdb_endpoint (str): Vector database endpoint.
+
+        Raises:
+            APIError: If ingestion of any of the documents failed.
+        """
+        failed_files = []
         try:
-            # Load raw documents from the directory
-            _path = data_dir
-            raw_documents = UnstructuredFileLoader(_path).load()
-
-            if raw_documents:
-                global TEXT_SPLITTER  # pylint: disable=W0603
-                # Get text splitter instance, it is selected based on environment variable APP_TEXTSPLITTER_MODELNAME
-                # tokenizer dimension of text splitter should be same as embedding model
-                if not TEXT_SPLITTER:
-                    TEXT_SPLITTER = get_text_splitter()
-
-                # split documents based on configuration provided
-                logger.info(f"Using text splitter instance: {TEXT_SPLITTER}")
-                documents = TEXT_SPLITTER.split_documents(raw_documents)
-                vs = get_vectorstore(document_embedder, collection_name, vdb_endpoint)
+            vs = None
+            text_splitter_config = get_config().text_splitter
+            for filepath, result in DOCUMENT_PARSER_POOL.parse(
+                filepaths,
+                chunk_size=text_splitter_config.chunk_size,
+                chunk_overlap=text_splitter_config.chunk_overlap,
+            ):
+                if isinstance(result, Exception):
+                    failed_files.append(f"{os.path.basename(filepath)} ({result})")
+                    continue
+                if not result:
+                    logger.warning("No documents available to process for %s!", filepath)
+                    continue
+
+                if vs is None:
+                    vs = get_vectorstore(get_document_embedder(), collection_name, vdb_endpoint)
                 # ingest documents into vectorstore
-                vs.add_documents(documents)
-            else:
-                logger.warning("No documents available to process!")
+                vs.add_documents(result)
+                logger.info("Ingested %d chunks from %s", len(result), os.path.basename(filepath))
 
         except ConnectTimeout as e:
             raise APIError(
@@ -138,6 +267,9 @@ class UnstructuredRAG(BaseExample):
                 ) from e
             raise APIError("Failed to upload document. " + str(e), code=500) from e
 
+        if failed_files:
+            raise APIError("Failed to parse documents: " + ", ".join(failed_files), code=500)
+
     def llm_chain(self, query: str, chat_history: List[Dict[str, Any]], **kwargs) -> Generator[str, None, None]:
         """Execute a simple LLM chain using the components defined above.
         It's called when the `/generate` API is invoked with `use_knowledge_base` set to `False`.
@@ -188,7 +320,7 @@ class UnstructuredRAG(BaseExample):
             llm = get_llm(**kwargs)
 
             chain = prompt_template | llm | StreamingFilterThinkParser | StrOutputParser()
-            return chain.stream({"question": query}, config={'run_name':'llm-stream'})
+            return chain.stream({"question": query}, config=run_config('llm-stream', **kwargs))
         except ConnectTimeout as e:
             logger.warning("Connection timed out while making a request to the LLM endpoint: %s", e)
             return iter(["Connection timed out while making a request to the NIM endpoint. Verify if the NIM server is available."])
@@ -230,7 +362,7 @@ class UnstructuredRAG(BaseExample):
         logger.info("Using rag to generate response from document for the query: %s", query)
 
         try:
-            document_embedder = get_embedding_model(model=kwargs.get("embedding_model"), url=kwargs.get("embedding_endpoint"))
+            document_embedder = get_request_embedder(collection_name, **kwargs)
             vs = get_vectorstore(document_embedder, collection_name, kwargs.get("vdb_endpoint"))
             if vs is None:
                 raise APIError("Vector store not initialized properly. Please check if the vector DB is up and running.", 500)
@@ -239,7 +371,7 @@ class UnstructuredRAG(BaseExample):
             ranker = get_ranking_model(model=kwargs.get("reranker_model"), url=kwargs.get("reranker_endpoint"), top_n=reranker_top_k)
             top_k = vdb_top_k if ranker and kwargs.get("enable_reranker") else reranker_top_k
             logger.info("Setting retriever top k as: %s.", top_k)
-            retriever = vs.as_retriever(search_kwargs={"k": top_k})  # milvus does not support similarily threshold
+            retriever = vs.as_retriever(search_kwargs=retriever_search_kwargs(top_k, **kwargs))  # milvus does not support similarily threshold
 
             system_prompt = ""
             conversation_history = []
@@ -275,13 +407,19 @@ class UnstructuredRAG(BaseExample):
                     query, 
                     retriever, 
                     ranker,
-                    reflection_counter
+                    reflection_counter,
+                    collection_name=collection_name
                 )
                 
                 if not is_relevant:
                     logger.warning("Could not find sufficiently relevant context after maximum attempts")
             else:
-                if ranker and kwargs.get("enable_reranker"):
+                # The score distribution of a probe search decides the depth and reranking, if enabled
+                adaptive_documents = adaptive_retrieve(vs, ranker, query, top_k, reranker_top_k, collection_name,
+                                                       **kwargs) if ranker and kwargs.get("enable_reranker") else None
+                if adaptive_documents is not None:
+                    context_to_show = adaptive_documents
+                elif ranker and kwargs.get("enable_reranker"):
                     logger.info(
                         "Narrowing the collection from %s results and further narrowing it to "
                         "%s with the reranker for rag chain.",
@@ -294,32 +432,35 @@ class UnstructuredRAG(BaseExample):
                     })
                     # Create a chain with retriever and reranker
                     retriever = {"context": retriever} | RunnableAssign({"context": lambda input: input["context"]})
-                    docs = retriever.invoke(query, config={'run_name':'retriever'})
-                    docs = context_reranker.invoke({"context": docs.get("context", []), "question": query}, config={'run_name':'context_reranker'})
+                    docs = retriever.invoke(query, config=run_config('retriever', collection_name, **kwargs))
+                    docs = context_reranker.invoke({"context": docs.get("context", []), "question": query}, config=run_config('context_reranker', collection_name, **kwargs))
                     context_to_show = docs.get("context", [])
                     # Normalize scores to 0-1 range
                     context_to_show = normalize_relevance_scores(context_to_show)
                     # Remove metadata from context
                     logger.debug("Document Retrieved: %s", docs)
                 else:
-                    context_to_show = retriever.invoke(query)
-            docs = [format_document_with_source(d) for d in context_to_show]
+                    context_to_show = retriever.invoke(query, config=run_config('retriever', collection_name, **kwargs))
+            # Drop near-duplicate chunks and pack the rest by relevance into the token budget
+            built_context = CONTEXT_BUILDER.build(context_to_show)
+            context_to_show, docs = built_context.documents, built_context.context
             chain = prompt | llm | StreamingFilterThinkParser | StrOutputParser()
                 
             # Check response groundedness if we still have reflection iterations available
             if os.environ.get("ENABLE_REFLECTION", "false").lower() == "true" and reflection_counter.remaining > 0:
-                initial_response = chain.invoke({"question": query, "context": docs})
+                initial_response = chain.invoke({"question": query, "context": docs}, config=run_config('llm-invoke', collection_name, **kwargs))
                 final_response, is_grounded = check_response_groundedness(
                     initial_response, 
                     docs,
-                    reflection_counter
+                    reflection_counter,
+                    collection_name=collection_name
                 )
                 if not is_grounded:
                     logger.warning("Could not generate sufficiently grounded response after %d total reflection attempts",
                                     reflection_counter.current_count)
                 return iter([final_response]), context_to_show
             else:
-                return chain.stream({"question": query, "context": docs}, config={'run_name':'llm-stream'}), context_to_show
+                return chain.stream({"question": query, "context": docs}, config=run_config('llm-stream', collection_name, **kwargs)), context_to_show
         except ConnectTimeout as e:
             logger.warning("Connection timed out while making a request to the LLM endpoint: %s", e)
             return iter(["Connection timed out while making a request to the NIM endpoint. Verify if the NIM server is available."])
@@ -354,7 +495,7 @@ class UnstructuredRAG(BaseExample):
         logger.info("Using multiturn rag to generate response from document for the query: %s", query)
 
         try:
-            document_embedder = get_embedding_model(model=kwargs.get("embedding_model"), url=kwargs.get("embedding_endpoint"))
+            document_embedder = get_request_embedder(collection_name, **kwargs)
             vs = get_vectorstore(document_embedder, collection_name, kwargs.get("vdb_endpoint"))
             if vs is None:
                 raise APIError("Vector store not initialized properly. Please check if the vector DB is up and running.", 500)
@@ -363,12 +504,22 @@ class UnstructuredRAG(BaseExample):
             ranker = get_ranking_model(model=kwargs.get("reranker_model"), url=kwargs.get("reranker_endpoint"), top_n=reranker_top_k)
             top_k = vdb_top_k if ranker and kwargs.get("enable_reranker") else reranker_top_k
             logger.info("Setting retriever top k as: %s.", top_k)
-            retriever = vs.as_retriever(search_kwargs={"k": top_k})  # milvus does not support similarily threshold
+            retriever = vs.as_retriever(search_kwargs=retriever_search_kwargs(top_k, **kwargs))  # milvus does not support similarily threshold
 
             # conversation is tuple so it should be multiple of two
             # -1 is to keep last k conversation
             history_count = int(os.environ.get("CONVERSATION_HISTORY", 15)) * 2 * -1
-            chat_history = chat_history[history_count:]
+            if CONVERSATION_SUMMARIZER.enabled:
+                # Older turns are replaced by a rolling summary, system messages are always kept
+                system_messages = [message for message in chat_history if message.role == "system"]
+                turns = [message for message in chat_history if message.role != "system"]
+                compacted = CONVERSATION_SUMMARIZER.compact(
+                    [(message.role, message.content) for message in turns], max_messages=-history_count
+                )
+                chat_history = system_messages + turns[compacted.start:]
+            else:
+                compacted = None
+                chat_history = chat_history[history_count:]
             system_prompt = ""
             conversation_history = []
             system_prompt += prompts.get("rag_template", "")
@@ -389,6 +540,11 @@ class UnstructuredRAG(BaseExample):
                 else:
                     conversation_history.append((message.role, message.content))
 
+            if compacted and compacted.summary:
+                # Escape braces, the system prompt is a prompt template
+                summary = compacted.summary.replace("{", "{{").replace("}", "}}")
+                system_prompt += f"\n\nSummary of the earlier conversation:\n{summary}"
+
             system_message = [("system", system_prompt)]
             retriever_query = query
             if chat_history:
@@ -405,10 +561,10 @@ class UnstructuredRAG(BaseExample):
                     contextualize_q_prompt = ChatPromptTemplate.from_messages(
                         [("system", query_rewriter_prompt), MessagesPlaceholder("chat_history"), ("human", "{input}"),]
                     )
-                    q_prompt = contextualize_q_prompt | query_rewriter_llm | StreamingFilterThinkParser | StrOutputParser()
+                    q_prompt = contextualize_q_prompt | get_query_rewriter_llm() | StreamingFilterThinkParser | StrOutputParser()
                     # query to be used for document retrieval
                     logger.info("Query rewriter prompt: %s", contextualize_q_prompt)
-                    retriever_query = q_prompt.invoke({"input": query, "chat_history": conversation_history}, config={'run_name':'query-rewriter'})
+                    retriever_query = q_prompt.invoke({"input": query, "chat_history": conversation_history}, config=run_config('query-rewriter', collection_name, **kwargs))
                     logger.info("Rewritten Query: %s %s", retriever_query, len(retriever_query))
                     if retriever_query.replace('"', "'") == "''" or len(retriever_query) == 0:
                         return iter([""])
@@ -433,19 +589,25 @@ class UnstructuredRAG(BaseExample):
                     retriever_query, 
                     retriever, 
                     ranker,
-                    reflection_counter
+                    reflection_counter,
+                    collection_name=collection_name
                 )
                 
                 if not is_relevant:
                     logger.warning("Could not find sufficiently relevant context after %d attempts", 
                                   reflection_counter.current_count)
             else:
-                if ranker and kwargs.get("enable_reranker"):
+                # The score distribution of a probe search decides the depth and reranking, if enabled
+                adaptive_documents = adaptive_retrieve(vs, ranker, retriever_query, top_k, reranker_top_k, collection_name,
+                                                       **kwargs) if ranker and kwargs.get("enable_reranker") else None
+                if adaptive_documents is not None:
+                    context_to_show = adaptive_documents
+                elif ranker and kwargs.get("enable_reranker"):
                     logger.info(
                         "Narrowing the collection from %s results and further narrowing it to "
                         "%s with the reranker for rag chain.",
                         top_k,
-                        settings.retriever.top_k)
+                        get_config().retriever.top_k)
                     logger.info("Setting ranker top n as: %s.", reranker_top_k)
                     context_reranker = RunnableAssign({
                         "context":
@@ -453,36 +615,50 @@ class UnstructuredRAG(BaseExample):
                     })
 
                     retriever = {"context": retriever} | RunnableAssign({"context": lambda input: input["context"]})
-                    docs = retriever.invoke(retriever_query, config={'run_name':'retriever'})
-                    docs = context_reranker.invoke({"context": docs.get("context", []), "question": retriever_query}, config={'run_name':'context_reranker'})
+                    docs = retriever.invoke(retriever_query, config=run_config('retriever', collection_name, **kwargs))
+                    docs = context_reranker.invoke({"context": docs.get("context", []), "question": retriever_query}, config=run_config('context_reranker', collection_name, **kwargs))
                     context_to_show = docs.get("context", [])
                     # Normalize scores to 0-1 range
                     context_to_show = normalize_relevance_scores(context_to_show)
                 else:
-                    docs = retriever.invoke(retriever_query, config={'run_name':'retriever'})
+                    docs = retriever.invoke(retriever_query, config=run_config('retriever', collection_name, **kwargs))
                     context_to_show = docs
                 
-            docs = [format_document_with_source(d) for d in context_to_show]
+            # Drop near-duplicate chunks and pack the rest by relevance into the token budget
+            built_context = CONTEXT_BUILDER.build(context_to_show)
+            context_to_show, docs = built_context.documents, built_context.context
             chain = prompt | llm | StreamingFilterThinkParser | StrOutputParser()
                 
             # Check response groundedness if we still have reflection iterations available
             if os.environ.get("ENABLE_REFLECTION", "false").lower() == "true" and reflection_counter.remaining > 0:
-                initial_response = chain.invoke({"question": query, "context": docs})
+                initial_response = chain.invoke({"question": query, "context": docs}, config=run_config('llm-invoke', collection_name, **kwargs))
                 final_response, is_grounded = check_response_groundedness(
                     initial_response, 
                     docs,
-                    reflection_counter
+                    reflection_counter,
+                    collection_name=collection_name
                 )
                 if not is_grounded:
                     logger.warning("Could not generate sufficiently grounded response after %d total reflection attempts",
                                     reflection_counter.current_count)
-                return iter([final_response]), context_to_show
+                response_stream = iter([final_response])
             else:              
                 relevant_chunks_str = "\n\n".join([doc.page_content for doc in context_to_show])
                 injected_string = f"question: {query}\nrelevant_chunks: {relevant_chunks_str}"
                
                 logger.info(f"INJECTED STRING: {injected_string}")
-                return chain.stream({"question": injected_string , "context": docs}, config={'run_name':'llm-stream'}), context_to_show
+                response_stream = chain.stream({"question": injected_string , "context": docs}, config=run_config('llm-stream', collection_name, **kwargs))
+
+            if compacted is not None:
+                # Fold this turn into the rolling summary once the response has been streamed
+                response_stream = CONVERSATION_SUMMARIZER.track(
+                    response_stream,
+                    [(message.role, message.content) for message in turns],
+                    query,
+                    llm_settings={"model": kwargs.get("model"), "llm_endpoint": kwargs.get("llm_endpoint")},
+                    max_messages=-history_count,
+                )
+            return response_stream, context_to_show
 
         except ConnectTimeout as e:
             logger.warning("Connection timed out while making a request to the LLM endpoint: %s", e)
@@ -520,7 +696,7 @@ class UnstructuredRAG(BaseExample):
         logger.info("Searching relevant document for the query: %s", content)
 
         try:
-            document_embedder = get_embedding_model(model=kwargs.get("embedding_model"), url=kwargs.get("embedding_endpoint"))
+            document_embedder = get_request_embedder(collection_name, **kwargs)
             vs = get_vectorstore(document_embedder, collection_name, kwargs.get("vdb_endpoint"))
             if vs is None:
                 logger.error("Vector store not initialized properly. Please check if the vector db is up and running")
@@ -530,7 +706,7 @@ class UnstructuredRAG(BaseExample):
             local_ranker = get_ranking_model(model=kwargs.get("reranker_model"), url=kwargs.get("reranker_endpoint"), top_n=reranker_top_k)
             top_k = vdb_top_k if local_ranker and kwargs.get("enable_reranker") else reranker_top_k
             logger.info("Setting top k as: %s.", top_k)
-            retriever = vs.as_retriever(search_kwargs={"k": top_k})  # milvus does not support similarily threshold
+            retriever = vs.as_retriever(search_kwargs=retriever_search_kwargs(top_k, **kwargs))  # milvus does not support similarily threshold
 
             retriever_query = content
             if messages:
@@ -557,10 +733,10 @@ class UnstructuredRAG(BaseExample):
                     contextualize_q_prompt = ChatPromptTemplate.from_messages(
                         [("system", query_rewriter_prompt), MessagesPlaceholder("chat_history"), ("human", "{input}"),]
                     )
-                    q_prompt = contextualize_q_prompt | query_rewriter_llm | StreamingFilterThinkParser | StrOutputParser()
+                    q_prompt = contextualize_q_prompt | get_query_rewriter_llm() | StreamingFilterThinkParser | StrOutputParser()
                     # query to be used for document retrieval
                     logger.info("Query rewriter prompt: %s", contextualize_q_prompt)
-                    retriever_query = q_prompt.invoke({"input": content, "chat_history": conversation_history})
+                    retriever_query = q_prompt.invoke({"input": content, "chat_history": conversation_history}, config=run_config('query-rewriter', collection_name, **kwargs))
                     logger.info("Rewritten Query: %s %s", retriever_query, len(retriever_query))
                     if retriever_query.replace('"', "'") == "''" or len(retriever_query) == 0:
                         return []
@@ -573,7 +749,7 @@ class UnstructuredRAG(BaseExample):
             if os.environ.get("ENABLE_REFLECTION", "false").lower() == "true":
                 max_loops = int(os.environ.get("MAX_REFLECTION_LOOP", 3))
                 reflection_counter = ReflectionCounter(max_loops)
-                docs, is_relevant = check_context_relevance(content, retriever, local_ranker, reflection_counter, kwargs.get("enable_reranker"))
+                docs, is_relevant = check_context_relevance(content, retriever, local_ranker, reflection_counter, kwargs.get("enable_reranker"), collection_name=collection_name)
                 if not is_relevant:
                     logger.warning("Could not find sufficiently relevant context after maximum attempts")
                 return docs
@@ -592,14 +768,14 @@ class UnstructuredRAG(BaseExample):
                         "context":
                             lambda input: local_ranker.compress_documents(query=input['question'],
                                                                         documents=input['context'])
-                    })
+                    }).with_config(run_name='context_reranker')
 
                     retriever = {"context": retriever, "question": RunnablePassthrough()} | context_reranker
-                    docs = retriever.invoke(retriever_query, config={'run_name':'retriever'})
+                    docs = retriever.invoke(retriever_query, config=run_config('retriever', collection_name, **kwargs))
                     # Normalize scores to 0-1 range"
                     docs = normalize_relevance_scores(docs.get("context", []))
                     return docs
-            docs = retriever.invoke(retriever_query, config={'run_name':'retriever'})
+            docs = retriever.invoke(retriever_query, config=run_config('retriever', collection_name, **kwargs))
             # TODO: Check how to get the relevance score from milvus
             return docs
 
@@ -0,0 +1,286 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Server-side chat sessions.
+
+A client holding a session id only sends the new message of each turn. The history is
+kept here in the form the chains consume, i.e. already sanitized and with braces escaped,
+so earlier messages are neither transferred nor validated again. Sessions live in an
+in-memory LRU with a TTL, which only works with a single server worker. With a
+SessionBackend configured the backend is the only copy: every lookup reads it and every
+turn is appended in one transaction, so all workers share the sessions.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Seconds after its last turn when a session expires
+CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", 3600))
+# Maximum number of sessions held in memory without a database, least recently used ones are evicted
+CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", 10000))
+# Maximum number of messages kept per session, older turns are dropped
+CHAT_SESSION_MAX_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", 100))
+# Path of a SQLite database shared by all workers, empty keeps sessions in the memory of each worker
+CHAT_SESSION_DB_PATH = os.getenv("CHAT_SESSION_DB_PATH", "").strip('"')
+
+
+@dataclass
+class SessionMessage:
+    """A message as stored in a session, content is sanitized and escaped for prompt templates"""
+    role: str
+    content: str
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    messages: List[SessionMessage] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+
+def _trim(messages: List[SessionMessage], max_messages: int) -> None:
+    """Drop the oldest messages beyond max_messages except a leading system message"""
+    overflow = len(messages) - max_messages
+    if max_messages > 0 and overflow > 0:
+        first = 1 if messages[0].role == "system" else 0
+        del messages[first:first + overflow]
+        # Keep whole turns, a session never starts with an orphaned answer
+        while len(messages) > first and messages[first].role == "assistant":
+            del messages[first]
+
+
+class SessionBackend(ABC):
+    """Persistent storage of sessions shared by all workers, e.g. SQLite or Redis"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[ChatSession]:
+        """Session of the id, None when it doesn't exist"""
+
+    @abstractmethod
+    def save(self, session: ChatSession) -> None:
+        """Store a session, replacing a stored session of the same id"""
+
+    @abstractmethod
+    def update(self, session_id: str, change: Callable[[ChatSession], bool]) -> bool:
+        """
+        Load, change and save a session atomically with respect to every other worker.
+
+        Arguments:
+            - session_id: str - Id of the session
+            - change: Callable[[ChatSession], bool] - Modifies the session in place, returns
+              False to leave it unchanged
+
+        Returns:
+            - bool - Whether the session existed and was changed
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove a session if it exists"""
+
+    @abstractmethod
+    def delete_expired(self, before: float) -> None:
+        """Remove the sessions last updated before the given time"""
+
+
+class SqliteSessionBackend(SessionBackend):
+    """Stores sessions as JSON rows of a SQLite database"""
+
+    def __init__(self, path: str):
+        # Every worker process opens its own connection, SQLite locks the file between them
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions "
+                "(session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _load(self, session_id: str) -> Optional[ChatSession]:
+        row = self._connection.execute(
+            "SELECT messages, updated_at FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        messages = [SessionMessage(**message) for message in json.loads(row[0])]
+        return ChatSession(session_id=session_id, messages=messages, updated_at=row[1])
+
+    def _save(self, session: ChatSession) -> None:
+        messages = json.dumps([asdict(message) for message in session.messages])
+        self._connection.execute(
+            "INSERT OR REPLACE INTO chat_sessions (session_id, messages, updated_at) VALUES (?, ?, ?)",
+            (session.session_id, messages, session.updated_at)
+        )
+
+    def load(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            return self._load(session_id)
+
+    def save(self, session: ChatSession) -> None:
+        with self._lock, self._connection:
+            self._save(session)
+
+    def update(self, session_id: str, change: Callable[[ChatSession], bool]) -> bool:
+        with self._lock, self._connection:
+            # Take the write lock before reading, so no other worker appends in between
+            self._connection.execute("BEGIN IMMEDIATE")
+            session = self._load(session_id)
+            if session is None or not change(session):
+                return False
+            self._save(session)
+            return True
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def delete_expired(self, before: float) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (before,))
+
+
+class ChatSessionStore:
+    """
+    Session store with TTL expiry. Without a backend sessions are kept in an in-memory LRU
+    capped at max_sessions, with a backend every call goes to the backend.
+    """
+
+    def __init__(
+            self,
+            ttl: int = CHAT_SESSION_TTL,
+            max_sessions: int = CHAT_SESSION_MAX_SESSIONS,
+            max_messages: int = CHAT_SESSION_MAX_MESSAGES,
+            backend: Optional[SessionBackend] = None
+        ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.backend = backend
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+
+    def _expired(self, session: ChatSession, now: float) -> bool:
+        return self.ttl > 0 and now - session.updated_at > self.ttl
+
+    def _cache(self, session: ChatSession) -> None:
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def create(self) -> ChatSession:
+        # Expired sessions are otherwise only dropped when they are looked up again
+        if self.ttl > 0 and time.time() - self._last_purge > min(self.ttl, 60):
+            self._last_purge = time.time()
+            self.purge_expired()
+        session = ChatSession(session_id=str(uuid4()))
+        if self.backend:
+            self.backend.save(session)
+        else:
+            with self._lock:
+                self._cache(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Session for session_id, None when it does not exist or has expired"""
+        now = time.time()
+        if self.backend:
+            # Read through, another worker may have appended a turn since
+            session = self.backend.load(session_id)
+        else:
+            with self._lock:
+                session = self._sessions.get(session_id)
+                if session is not None:
+                    self._sessions.move_to_end(session_id)
+                    session = ChatSession(session.session_id, list(session.messages), session.updated_at)
+        if session is None or self._expired(session, now):
+            if session is not None:
+                self.delete(session_id)
+            return None
+        return session
+
+    def history(self, session_id: str) -> Optional[List[SessionMessage]]:
+        """Messages of a session, None when it does not exist or has expired"""
+        session = self.get(session_id)
+        return None if session is None else session.messages
+
+    def append(self, session_id: str, messages: List[SessionMessage]) -> None:
+        """
+        Append a completed turn to a session, dropping the oldest messages beyond max_messages
+        except a leading system message.
+
+        Arguments:
+            - session_id: str - Id of the session
+            - messages: List[SessionMessage] - Sanitized and escaped messages of the turn
+        """
+        def extend(session: ChatSession) -> bool:
+            now = time.time()
+            if self._expired(session, now):
+                return False
+            session.messages.extend(messages)
+            _trim(session.messages, self.max_messages)
+            session.updated_at = now
+            return True
+
+        if self.backend:
+            appended = self.backend.update(session_id, extend)
+        else:
+            with self._lock:
+                session = self._sessions.get(session_id)
+                appended = session is not None and extend(session)
+        if not appended:
+            logger.warning("Chat session %s expired before its turn was stored", session_id)
+
+    def delete(self, session_id: str) -> bool:
+        if self.backend:
+            deleted = self.backend.load(session_id) is not None
+            self.backend.delete(session_id)
+            return deleted
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def purge_expired(self) -> int:
+        """Remove expired sessions, returns the number of sessions removed from memory"""
+        now = time.time()
+        if self.backend:
+            if self.ttl > 0:
+                self.backend.delete_expired(now - self.ttl)
+            return 0
+        with self._lock:
+            expired = [session_id for session_id, session in self._sessions.items() if self._expired(session, now)]
+            for session_id in expired:
+                del self._sessions[session_id]
+        if expired:
+            logger.info("Purged %d expired chat sessions", len(expired))
+        return len(expired)
+
+
+def get_session_store() -> ChatSessionStore:
+    """Session store configured by the CHAT_SESSION_* environment variables"""
+    backend = SqliteSessionBackend(CHAT_SESSION_DB_PATH) if CHAT_SESSION_DB_PATH else None
+    return ChatSessionStore(backend=backend)
@@ -0,0 +1,160 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Token budgeted context assembly for the RAG prompt.
+
+Retrieved chunks are ordered by relevance, near-identical chunks (repeated slides,
+syllabus boilerplate) are dropped and the rest is packed until the token budget is used up.
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, FrozenSet, List, Optional
+
+from langchain_core.documents import Document
+
+from .utils import format_document_with_source
+
+if TYPE_CHECKING:
+    from .observability.otel_metrics import OtelMetrics
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of tokens of retrieved context put into the prompt, 0 disables the budget
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 0))
+# Jaccard similarity of word shingles above which two chunks count as duplicates, 1 disables deduplication
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.8))
+# HuggingFace tokenizer used to count context tokens, ideally the tokenizer of the served LLM
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "").strip('"')
+
+_SHINGLE_SIZE = 5
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache
+def get_token_counter(tokenizer_name: str = CONTEXT_TOKENIZER) -> Callable[[str], int]:
+    """
+    Token counting function backed by the HuggingFace tokenizer tokenizer_name, falling back
+    to tiktoken's cl100k_base and finally to a character based estimate when neither is available.
+    Loading may download the tokenizer files, warm_up() calls this before the first request.
+    """
+    if tokenizer_name:
+        try:
+            from transformers import AutoTokenizer  # pylint: disable=import-outside-toplevel
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            logger.info("Counting context tokens with the %s tokenizer", tokenizer_name)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            logger.warning("Unable to load tokenizer %s: %s", tokenizer_name, e)
+    try:
+        import tiktoken  # pylint: disable=import-outside-toplevel
+        encoding = tiktoken.get_encoding("cl100k_base")
+        logger.info("Counting context tokens with tiktoken cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        # tiktoken fetches its BPE file on first use, offline without TIKTOKEN_CACHE_DIR this fails
+        logger.warning("No tokenizer available, estimating context tokens from character counts: %s", e)
+        return lambda text: len(text) // 4 + 1
+
+
+def _shingles(text: str) -> FrozenSet[int]:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= _SHINGLE_SIZE:
+        return frozenset([hash(tuple(words))])
+    return frozenset(hash(tuple(words[i:i + _SHINGLE_SIZE])) for i in range(len(words) - _SHINGLE_SIZE + 1))
+
+
+def _jaccard(first: FrozenSet[int], second: FrozenSet[int]) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+@dataclass
+class BuiltContext:
+    """Result of ContextBuilder.build"""
+    documents: List[Document] = field(default_factory=list)
+    context: List[str] = field(default_factory=list)
+    tokens_used: int = 0
+    tokens_saved: int = 0
+    duplicates_dropped: int = 0
+    over_budget_dropped: int = 0
+
+
+class ContextBuilder:
+    """Deduplicates retrieved chunks and packs them by relevance into a token budget"""
+
+    def __init__(
+            self,
+            token_budget: int = CONTEXT_TOKEN_BUDGET,
+            dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+            metrics: Optional["OtelMetrics"] = None
+        ):
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        # Set by the server once tracing is instrumented
+        self.metrics = metrics
+
+    def build(self, documents: List[Document]) -> BuiltContext:
+        """
+        Arguments:
+            - documents: List[Document] - Retrieved (and possibly reranked) documents
+
+        Returns:
+            - BuiltContext - Kept documents, their prompt formatted text and token accounting
+        """
+        count_tokens = get_token_counter()
+        # Reranked documents carry a relevance score, plain retrieval is already ordered by similarity
+        ranked = sorted(
+            documents,
+            key=lambda document: document.metadata.get("relevance_score", 0) if hasattr(document, "metadata") else 0,
+            reverse=True,
+        )
+
+        result = BuiltContext()
+        kept_shingles: List[FrozenSet[int]] = []
+        total_tokens = 0
+        for document in ranked:
+            text = format_document_with_source(document)
+            tokens = count_tokens(text)
+            total_tokens += tokens
+
+            if self.dedup_threshold < 1:
+                shingles = _shingles(document.page_content)
+                if any(_jaccard(shingles, kept) >= self.dedup_threshold for kept in kept_shingles):
+                    result.duplicates_dropped += 1
+                    continue
+            else:
+                shingles = frozenset()
+
+            # Always keep the most relevant chunk, even if it alone exceeds the budget
+            if self.token_budget > 0 and result.context and result.tokens_used + tokens > self.token_budget:
+                result.over_budget_dropped += 1
+                continue
+
+            kept_shingles.append(shingles)
+            result.documents.append(document)
+            result.context.append(text)
+            result.tokens_used += tokens
+
+        result.tokens_saved = total_tokens - result.tokens_used
+        logger.info("Context: kept %d of %d chunks, %d tokens (%d saved, %d duplicates, %d over budget)",
+                    len(result.documents), len(documents), result.tokens_used, result.tokens_saved,
+                    result.duplicates_dropped, result.over_budget_dropped)
+        if self.metrics:
+            self.metrics.update_context_tokens(used=result.tokens_used, saved=result.tokens_saved)
+        return result
@@ -0,0 +1,196 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Rolling conversation summaries for multiturn RAG.
+
+Only the most recent turns are sent verbatim, older turns are replaced by a summary.
+The server is stateless, so summaries are cached by a hash of the conversation prefix
+they cover and refreshed in the background once a response has been streamed.
+"""
+import hashlib
+import html
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import bleach
+from langchain_core.output_parsers.string import StrOutputParser
+from langchain_core.prompts.chat import ChatPromptTemplate
+
+from .utils import get_llm, get_prompts
+
+if TYPE_CHECKING:
+    from .observability.otel_metrics import OtelMetrics
+
+logger = logging.getLogger(__name__)
+
+ENABLE_CONVERSATION_SUMMARY = os.getenv("ENABLE_CONVERSATION_SUMMARY", "False").lower() == "true"
+# Number of most recent turns (user + assistant message) kept verbatim
+CONVERSATION_SUMMARY_RECENT_TURNS = int(os.getenv("CONVERSATION_SUMMARY_RECENT_TURNS", 3))
+# Maximum number of cached summaries
+CONVERSATION_SUMMARY_CACHE_SIZE = int(os.getenv("CONVERSATION_SUMMARY_CACHE_SIZE", 2048))
+# Token limit of a generated summary
+CONVERSATION_SUMMARY_MAX_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", 256))
+
+DEFAULT_SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a student and a course assistant. "
+    "Update the existing summary with the new messages. Keep the topics, questions asked, facts "
+    "established and any open follow-ups. Be concise, do not exceed a short paragraph and "
+    "return only the updated summary."
+)
+
+Turn = Tuple[str, str]
+
+
+def _normalize(content: str) -> str:
+    # History comes back from the client sanitized by the Message validator and with braces
+    # escaped for prompt templates, while answers are tracked as generated. Both are digested
+    # in their cleaned form, otherwise an answer never matches the history it is sent back in.
+    content = bleach.clean(content.replace("{{", "{").replace("}}", "}"), strip=True)
+    return " ".join(html.unescape(content).split())
+
+
+def _prefix_digests(messages: List[Turn]) -> List[str]:
+    """digests[i] identifies messages[:i]"""
+    hasher = hashlib.sha256()
+    digests = [hasher.hexdigest()]
+    for role, content in messages:
+        hasher.update(f"{role}\x00{_normalize(content)}\x01".encode("utf-8"))
+        digests.append(hasher.hexdigest())
+    return digests
+
+
+@dataclass
+class CompactedHistory:
+    """Summary of the older turns, messages[start:] are sent verbatim"""
+    summary: str
+    start: int
+
+
+class ConversationSummarizer:
+    """Replaces older turns by a cached rolling summary, see module docstring"""
+
+    def __init__(
+            self,
+            enabled: bool = ENABLE_CONVERSATION_SUMMARY,
+            recent_turns: int = CONVERSATION_SUMMARY_RECENT_TURNS,
+            cache_size: int = CONVERSATION_SUMMARY_CACHE_SIZE,
+            max_tokens: int = CONVERSATION_SUMMARY_MAX_TOKENS
+        ):
+        self.enabled = enabled
+        self.recent_messages = max(1, recent_turns) * 2
+        self.cache_size = cache_size
+        self.max_tokens = max_tokens
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._in_progress: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="conversation-summary")
+        # Set by the server once tracing is instrumented
+        self.metrics: Optional["OtelMetrics"] = None
+
+    def _cached_prefix(self, messages: List[Turn]) -> Tuple[str, int]:
+        """Longest prefix of messages with a cached summary and its length"""
+        digests = _prefix_digests(messages)
+        with self._lock:
+            for length in range(len(messages), 0, -1):
+                summary = self._summaries.get(digests[length])
+                if summary is not None:
+                    self._summaries.move_to_end(digests[length])
+                    return summary, length
+        return "", 0
+
+    def compact(self, messages: List[Turn], max_messages: int) -> CompactedHistory:
+        """
+        Split the conversation into a summary of older turns and the turns to send verbatim.
+
+        Arguments:
+            - messages: List[Tuple[str, str]] - (role, content) of the conversation without system messages
+            - max_messages: int - Upper bound of verbatim messages if the summary lags behind
+
+        Returns:
+            - CompactedHistory - Summary of the older turns (may be empty) and where the verbatim turns start
+        """
+        older = messages[:-self.recent_messages] if len(messages) > self.recent_messages else []
+        summary, covered = self._cached_prefix(older) if older else ("", 0)
+        # Turns not yet covered by a summary stay verbatim, but never more than before
+        start = max(covered, len(messages) - max_messages)
+        if older:
+            if self.metrics:
+                self.metrics.update_cache_lookup("conversation_summary", hit=covered > 0)
+            logger.info("Conversation of %d messages: %d summarized, %d verbatim",
+                        len(messages), covered, len(messages) - start)
+        return CompactedHistory(summary=summary, start=start)
+
+    def track(
+            self,
+            stream: Iterator[str],
+            messages: List[Turn],
+            query: str,
+            llm_settings: Dict[str, Any],
+            max_messages: int
+        ) -> Iterator[str]:
+        """
+        Pass the response stream through and, once it completed, refresh the summary
+        for the conversation including this turn in the background.
+        """
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        self._executor.submit(
+            self._refresh, messages + [("user", query), ("assistant", "".join(chunks))], llm_settings, max_messages
+        )
+
+    def _refresh(self, messages: List[Turn], llm_settings: Dict[str, Any], max_messages: int) -> None:
+        older = messages[:-self.recent_messages]
+        if not older:
+            return
+        key = _prefix_digests(older)[-1]
+        with self._lock:
+            if key in self._summaries or key in self._in_progress:
+                return
+            self._in_progress.add(key)
+        try:
+            summary, covered = self._cached_prefix(older)
+            # Without a usable earlier summary (e.g. after a restart) only recent history is summarized
+            new_messages = older[covered:][-max_messages:]
+            updated = self._summarize(summary, new_messages, llm_settings)
+            with self._lock:
+                self._summaries[key] = updated
+                while len(self._summaries) > self.cache_size:
+                    self._summaries.popitem(last=False)
+            logger.info("Refreshed conversation summary covering %d messages", len(older))
+        except Exception as e:
+            logger.warning("Failed to refresh conversation summary: %s", e)
+        finally:
+            with self._lock:
+                self._in_progress.discard(key)
+
+    def _summarize(self, summary: str, messages: List[Turn], llm_settings: Dict[str, Any]) -> str:
+        llm = get_llm(**{**llm_settings, "temperature": 0.1, "top_p": 0.7, "max_tokens": self.max_tokens})
+        transcript = "\n".join(f"{role}: {_normalize(content)}" for role, content in messages)
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", get_prompts().get("conversation_summary_prompt", DEFAULT_SUMMARY_PROMPT)),
+            ("user", "Existing summary:\n{summary}\n\nNew messages:\n{transcript}"),
+        ])
+        chain = prompt | llm | StrOutputParser()
+        return chain.invoke(
+            {"summary": summary or "(none)", "transcript": transcript},
+            config={'run_name': 'conversation-summary'}
+        ).strip()
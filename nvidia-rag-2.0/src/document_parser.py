@@ -0,0 +1,155 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Process pool based document parsing and splitting used by UnstructuredRAG.ingest_docs"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes used to parse and split documents
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", os.cpu_count() or 1))
+# Maximum number of seconds a single file may spend in parsing and splitting
+INGEST_PARSE_TIMEOUT = int(os.getenv("INGEST_PARSE_TIMEOUT", 300))
+
+
+class ParseTimeoutError(TimeoutError):
+    """Raised inside a worker process when a file exceeds the per-file parse timeout"""
+
+
+def _raise_parse_timeout(signum, frame):
+    raise ParseTimeoutError()
+
+
+def load_and_split(
+        filepath: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        timeout: int
+    ) -> List["Document"]:
+    """
+    Load a single file with unstructured and split it into chunks.
+    Runs inside a worker process, so imports are kept local to the worker.
+
+    Arguments:
+        - filepath: str - Absolute filepath of the document
+        - chunk_size: int - Chunk size for text splitting
+        - chunk_overlap: int - Chunk overlap for text splitting
+        - timeout: int - Seconds after which parsing of this file is aborted
+
+    Returns:
+        - List[Document] - Split langchain documents, empty if nothing could be extracted
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter  # pylint: disable=no-name-in-module
+    from langchain_community.document_loaders import UnstructuredFileLoader
+
+    # Tasks run on the worker's main thread, so SIGALRM can interrupt a stuck parser
+    # without tearing down the worker process.
+    signal.signal(signal.SIGALRM, _raise_parse_timeout)
+    signal.alarm(timeout)
+    try:
+        raw_documents = UnstructuredFileLoader(filepath).load()
+        if not raw_documents:
+            return []
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+        return text_splitter.split_documents(raw_documents)
+    except ParseTimeoutError as e:
+        raise ParseTimeoutError(f"Parsing {os.path.basename(filepath)} exceeded {timeout}s") from e
+    finally:
+        signal.alarm(0)
+
+
+class DocumentParserPool:
+    """Lazily created process pool which parses and splits documents off the server process"""
+
+    def __init__(
+            self,
+            max_workers: int = INGEST_PARSE_WORKERS,
+            timeout: int = INGEST_PARSE_TIMEOUT
+        ):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logger.info("Starting document parser pool with %d workers", self.max_workers)
+                # spawn avoids forking a server process which holds grpc/http client threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def parse(
+            self,
+            filepaths: List[str],
+            chunk_size: int,
+            chunk_overlap: int
+        ) -> Iterator[Tuple[str, Union[List["Document"], Exception]]]:
+        """
+        Parse and split files concurrently, yielding results in completion order
+        so that callers can start embedding a file while others are still parsing.
+
+        Yields:
+            - Tuple[str, Union[List[Document], Exception]] - filepath and its documents,
+              or the exception raised while parsing it
+        """
+        executor = self._get_executor()
+        futures = {
+            executor.submit(load_and_split, filepath, chunk_size, chunk_overlap, self.timeout): filepath
+            for filepath in filepaths
+        }
+        broken = False
+        try:
+            for future in as_completed(futures):
+                filepath = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    # A worker crashed (e.g. native parser segfault), results of this batch are lost
+                    broken = True
+                    logger.error("Document parser worker died while parsing %s", filepath)
+                    result = e
+                except Exception as e:
+                    logger.error("Failed to parse %s: %s", filepath, e)
+                    result = e
+                yield filepath, result
+        finally:
+            # Don't keep parsing files nobody is going to consume
+            for future in futures:
+                future.cancel()
+            if broken:
+                self._reset_executor()
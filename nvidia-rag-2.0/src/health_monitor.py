@@ -0,0 +1,199 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Background dependency health monitoring and per-dependency circuit breakers.
+
+The monitor probes all dependencies on an interval and serves the last results,
+so health probes never fan out to the dependencies themselves. Probe outcomes feed
+circuit breakers which request handlers consult to fail fast while a dependency is down.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background dependency health checks, 0 checks on every health request instead
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 30))
+# Fraction of the interval by which each sleep is randomized, spreads probes of many replicas
+HEALTH_CHECK_JITTER = float(os.getenv("HEALTH_CHECK_JITTER", 0.2))
+# Consecutive failures after which a dependency is considered down
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 2))
+# Seconds a dependency stays marked down before a trial request is let through
+CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", 30))
+
+HealthResults = Dict[str, List[Dict[str, Any]]]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures. While open, allow()
+    returns False until reset_timeout has passed. Calls are then let through again
+    (half open) until the next recorded outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT
+        ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call to the dependency should be attempted"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            return self.state != self.OPEN
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker lets the next trial through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(1, int(self.reset_timeout - (time.monotonic() - self._opened_at)))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Dependency %s recovered, closing circuit", self.name)
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                logger.warning("Dependency %s is unavailable, opening circuit for %ss",
+                               self.name, self.reset_timeout)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+_CIRCUIT_BREAKERS: Dict[str, CircuitBreaker] = {}
+_CIRCUIT_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Process wide circuit breaker of a dependency, e.g. "Milvus", "LLM" or "NemoGuardrails" """
+    with _CIRCUIT_BREAKERS_LOCK:
+        if name not in _CIRCUIT_BREAKERS:
+            _CIRCUIT_BREAKERS[name] = CircuitBreaker(name)
+        return _CIRCUIT_BREAKERS[name]
+
+
+def _dependency_name(service: str) -> str:
+    # "LLM (meta/llama-3.1-8b-instruct)" -> "LLM"
+    return service.split(" (")[0]
+
+
+class HealthMonitor:
+    """Periodically runs a dependency health check and caches the latest results"""
+
+    def __init__(
+            self,
+            check: Callable[[], Awaitable[HealthResults]],
+            interval: float = HEALTH_CHECK_INTERVAL,
+            jitter: float = HEALTH_CHECK_JITTER,
+            on_change: Optional[Callable[[HealthResults], None]] = None
+        ):
+        self.check = check
+        self.interval = interval
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.on_change = on_change
+        self.results: Optional[HealthResults] = None
+        self.checked_at: Optional[float] = None
+        self._statuses: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+    def start(self) -> None:
+        """Start the background refresh loop on the running event loop"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        logger.info("Starting dependency health monitor, interval %ss jitter %s", self.interval, self.jitter)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def get_results(self) -> HealthResults:
+        """Latest cached results, checking once if nothing has been cached yet"""
+        if self.results is None or self.interval <= 0:
+            await self.refresh()
+        return self.results
+
+    async def refresh(self) -> HealthResults:
+        """Run the health check now and feed its outcome into the circuit breakers"""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        checked_at = self.checked_at
+        async with self._refresh_lock:
+            # A concurrent caller already refreshed while we waited for the lock
+            if self.results is not None and self.checked_at != checked_at:
+                return self.results
+
+            results = await self.check()
+            changed = False
+            for services in results.values():
+                for service in services:
+                    name = _dependency_name(service["service"])
+                    status = service["status"]
+                    if status == "healthy":
+                        get_circuit_breaker(name).record_success()
+                    elif status != "skipped":
+                        get_circuit_breaker(name).record_failure()
+                    changed = changed or self._statuses.get(name) != status
+                    self._statuses[name] = status
+
+            self.results = results
+            self.checked_at = time.time()
+            if changed and self.on_change:
+                self.on_change(results)
+            return results
+
+    def open_circuits(self, names: List[str]) -> List[str]:
+        """Subset of the dependency names whose circuit is currently open"""
+        return [name for name in names if not get_circuit_breaker(name).allow()]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Dependency health check failed: %s", e)
+            await asyncio.sleep(self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
@@ -32,6 +32,7 @@ from pymilvus import utility, connections
 from langchain_core.documents import Document
 
 from .base import BaseIngestor
+from .vdb_uploader import PipelinedVDBUploader
 from src.utils import (
     get_config,
     get_vectorstore,
@@ -64,7 +65,6 @@ class NVIngestIngestor(BaseIngestor):
     """
 
     _config = get_config()
-    _vdb_upload_bulk_size = 500
 
     @overrides
     async def ingest_docs(
@@ -154,12 +154,11 @@ class NVIngestIngestor(BaseIngestor):
         Main function called by ingestor server to delete collections in vector-DB
         """
         logger.info(f"Deleting collections {collection_names} at {vdb_endpoint}")
-        response = delete_collections(collection_names, vdb_endpoint)
+        response = delete_collections(vdb_endpoint, collection_names)
         # Delete from Minio
         for collection in collection_names:
             collection_prefix = get_unique_thumbnail_id_collection_prefix(collection)
-            delete_object_names = MINIO_OPERATOR.list_payloads(collection_prefix)
-            MINIO_OPERATOR.delete_payloads(delete_object_names)
+            MINIO_OPERATOR.delete_payloads_by_prefix(collection_prefix)
         return response
 
 
@@ -273,8 +272,7 @@ class NVIngestIngestor(BaseIngestor):
                 # Delete from Minio
                 for doc in document_names:
                     filename_prefix = get_unique_thumbnail_id_file_name_prefix(collection_name, doc)
-                    delete_object_names = MINIO_OPERATOR.list_payloads(filename_prefix)
-                    MINIO_OPERATOR.delete_payloads(delete_object_names)
+                    MINIO_OPERATOR.delete_payloads_by_prefix(filename_prefix)
                 return {f"message": "Files deleted successfully", "total_documents": len(documents), "documents": documents}
 
         except Exception as e:
@@ -382,17 +380,20 @@ class NVIngestIngestor(BaseIngestor):
     ) -> None:
         """
         Only used if ENABLE_NV_INGEST_VDB_UPLOAD=False
-        Add langchain documents to vectorstore
+        Add langchain documents to vectorstore, embedding the next batches
+        while the current batch is being inserted
 
         Arguments:
             - documents: List[Document] - List of langchain documents
             - collection_name: str - VectorDB collection name
         """
         vs = get_vectorstore(DOCUMENT_EMBEDDER, collection_name, vdb_endpoint)
-        for i in range(0, len(documents), self._vdb_upload_bulk_size):
-            sub_documents = documents[i:i+self._vdb_upload_bulk_size]
-            # Add documents to vectorstore
-            vs.add_documents(sub_documents)
+        uploader = PipelinedVDBUploader(
+            embedder=DOCUMENT_EMBEDDER,
+            vectorstore=vs,
+            embedding_dimension=self._config.embeddings.dimensions,
+        )
+        uploader.upload(documents)
 
     @staticmethod
     def _put_content_to_minio(
@@ -406,6 +407,8 @@ class NVIngestIngestor(BaseIngestor):
             logger.info(f"Skipping minio insertion for collection: {collection_name}")
             return # Don't perform minio insertion if captioning is disabled
 
+        payloads = []
+        object_names = []
         for result in results:
             for result_element in result:
                 if result_element.get("document_type") in ["image", "structured"]:
@@ -423,11 +426,15 @@ class NVIngestIngestor(BaseIngestor):
                             page_number=page_number,
                             location=location
                         )
-                        # Put payload to minio
-                        MINIO_OPERATOR.put_payload(
-                            payload={"content": content},
-                            object_name=unique_thumbnail_id
-                        )
+                        payloads.append({"content": content})
+                        object_names.append(unique_thumbnail_id)
+
+        # Put all payloads to minio concurrently
+        logger.info(f"Uploading {len(payloads)} payloads to minio for collection: {collection_name}")
+        MINIO_OPERATOR.put_payloads(
+            payloads=payloads,
+            object_names=object_names
+        )
 
     async def _nv_ingest_ingestion(
         self,
@@ -470,7 +477,8 @@ class NVIngestIngestor(BaseIngestor):
             documents = self._prepare_langchain_documents(results)
 
             # Add all documents to VectorStore
-            self._add_documents_to_vectorstore(
+            await asyncio.to_thread(
+                self._add_documents_to_vectorstore,
                 documents=documents,
                 collection_name=kwargs.get("collection_name"),
                 vdb_endpoint=kwargs.get("vdb_endpoint")
@@ -18,17 +18,19 @@ import logging
 import os
 import json
 import shutil
+from contextlib import nullcontext
 from inspect import getmembers
 from inspect import isclass
 from pathlib import Path
 from typing import List, Dict, Any
 from uuid import uuid4
 
-from fastapi import UploadFile, Request, File, FastAPI, Form, Depends, HTTPException, Query
+from fastapi import UploadFile, Request, Response, File, FastAPI, Form, Depends, HTTPException, Query
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from pydantic import Field
 from pydantic import constr
@@ -36,18 +38,23 @@ from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY
 from nv_ingest_client.util.file_processing.extract import EXTENSION_TO_DOCUMENT_TYPE
 
 from src.chains import UnstructuredRAG
+from src.utils import enable_config_hot_reload
+from src.request_profiler import PROFILE_ID_HEADER, RequestProfiler
 from .main import NVIngestIngestor
 
 logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
+enable_config_hot_reload()
+
 tags_metadata = [
     {
         "name": "Health APIs",
         "description": "APIs for checking and monitoring server liveliness and readiness.",
     },
     {"name": "Ingestion APIs", "description": "APIs for uploading, deletion and listing documents."},
-    {"name": "Vector DB APIs", "description": "APIs for managing collections in vector database."}
+    {"name": "Vector DB APIs", "description": "APIs for managing collections in vector database."},
+    {"name": "Admin APIs", "description": "APIs for downloading request profiles."}
 ]
 
 # create the FastAPI server
@@ -79,6 +86,9 @@ ENABLE_NV_INGEST = True # Configurable flag to enable/disable nv-ingest
 # Initialize the NVIngestIngestor class
 NV_INGEST_INGESTOR = NVIngestIngestor()
 
+# Per-request profiles of uploads sent with the X-Profile header, see src/request_profiler.py
+REQUEST_PROFILER = RequestProfiler()
+
 class HealthResponse(BaseModel):
     message: str = Field(max_length=4096, pattern=r'[\s\S]*', default="")
 
@@ -280,10 +290,13 @@ async def parse_json_data(
         },
     }
 )
-async def upload_document(documents: List[UploadFile] = File(...),
+async def upload_document(http_request: Request, response: Response, documents: List[UploadFile] = File(...),
     request: DocumentUploadRequest = Depends(parse_json_data)) -> DocumentListResponse:
     """Upload a document to the vector store."""
 
+    profile_id = REQUEST_PROFILER.requested(http_request.headers, http_request.query_params)
+    profile_headers = {PROFILE_ID_HEADER: profile_id} if profile_id else None
+
     if not len(documents):
         raise Exception("No files provided for uploading.")
 
@@ -328,8 +341,8 @@ async def upload_document(documents: List[UploadFile] = File(...),
             if not (hasattr(NV_INGEST_INGESTOR, "get_documents") and callable(NV_INGEST_INGESTOR.get_documents)):
                 raise NotImplementedError("Example class has not implemented get_documents method.")
 
-            response = NV_INGEST_INGESTOR.get_documents(request.collection_name, request.vdb_endpoint)
-            if upload_file in [doc.get("document_name") for doc in response['documents']]:
+            existing = NV_INGEST_INGESTOR.get_documents(request.collection_name, request.vdb_endpoint)
+            if upload_file in [doc.get("document_name") for doc in existing['documents']]:
                 logger.error(f"Document {upload_file} already exists. Upload failed. Please call PATCH /documents endpoint to delete and replace this file.")
                 raise Exception(f"Document {upload_file} already exists. Upload failed. Please call PATCH /documents endpoint to delete and replace this file.")
 
@@ -339,18 +352,32 @@ async def upload_document(documents: List[UploadFile] = File(...),
             with open(file_path, "wb") as f:
                 shutil.copyfileobj(file.file, f)
 
-            if not ENABLE_NV_INGEST:
-                UNSTRUCTURED_RAG_CHAIN.ingest_docs(str(file_path), upload_file, request.collection_name, request.vdb_endpoint)
+        if not ENABLE_NV_INGEST:
+            # Parse all files in parallel off the event loop
+            await asyncio.to_thread(
+                REQUEST_PROFILER.wrap(UNSTRUCTURED_RAG_CHAIN.ingest_multiple_docs, profile_id,
+                                      "ingest_multiple_docs", collection=request.collection_name),
+                all_file_paths,
+                request.collection_name,
+                request.vdb_endpoint
+            )
 
         if ENABLE_NV_INGEST:
-            response_dict = await NV_INGEST_INGESTOR.ingest_docs(
-                filepaths=all_file_paths,
-                vdb_endpoint=request.vdb_endpoint, # WAR to hide it from openapi schema
-                **request.model_dump()
-            )
+            # ingest_docs awaits nv-ingest on the event loop thread, so the profile also
+            # samples other requests served by this worker in the meantime
+            profiling = REQUEST_PROFILER.profile(profile_id, "ingest_docs", collection=request.collection_name,
+                                                 files=len(all_file_paths)) if profile_id else nullcontext()
+            with profiling:
+                response_dict = await NV_INGEST_INGESTOR.ingest_docs(
+                    filepaths=all_file_paths,
+                    vdb_endpoint=request.vdb_endpoint, # WAR to hide it from openapi schema
+                    **request.model_dump()
+                )
+            if profile_id:
+                response.headers[PROFILE_ID_HEADER] = profile_id
             return DocumentListResponse(**response_dict)
 
-        return JSONResponse(content="Documents uploaded successfully!", status_code=200)
+        return JSONResponse(content="Documents uploaded successfully!", status_code=200, headers=profile_headers)
 
     except asyncio.CancelledError as e:
         logger.warning(f"Request cancelled while uploading document {e}")
@@ -398,7 +425,7 @@ async def upload_document(documents: List[UploadFile] = File(...),
         },
     }
 )
-async def delete_and_upload_document(documents: List[UploadFile] = File(...),
+async def delete_and_upload_document(http_request: Request, response: Response, documents: List[UploadFile] = File(...),
     request: DocumentUploadRequest = Depends(parse_json_data)) -> DocumentListResponse:
 
     """Upload a document to the vector store. If the document already exists, it will be replaced."""
@@ -410,14 +437,13 @@ async def delete_and_upload_document(documents: List[UploadFile] = File(...),
             # Delete the existing document
             if not (hasattr(NV_INGEST_INGESTOR, "delete_documents") and callable(NV_INGEST_INGESTOR.delete_documents)):
                 raise NotImplementedError("Example class has not implemented delete_documents method.")
-            response = NV_INGEST_INGESTOR.delete_documents([file_name], document_ids=[], collection_name=request.collection_name, vdb_endpoint=request.vdb_endpoint)
-            if response["total_documents"] == 0:
+            deleted = NV_INGEST_INGESTOR.delete_documents([file_name], document_ids=[], collection_name=request.collection_name, vdb_endpoint=request.vdb_endpoint)
+            if deleted["total_documents"] == 0:
                 logger.info("Unable to remove %s from collection. Either the document does not exist or there is an error while removing. Proceeding with ingestion.", file_name)
             else:
                 logger.info("Successfully removed %s from collection %s.", file_name, request.collection_name)
 
-        response = await upload_document(documents=documents, request=request)
-        return response
+        return await upload_document(http_request=http_request, response=response, documents=documents, request=request)
 
     except asyncio.CancelledError as e:
         logger.error(f"Request cancelled while deleting and uploading document")
@@ -649,7 +675,7 @@ async def delete_collections(vdb_endpoint: str = Query(default=os.getenv("APP_VE
     """
     try:
         if hasattr(NV_INGEST_INGESTOR, "delete_collections") and callable(NV_INGEST_INGESTOR.delete_collections):
-            response = NV_INGEST_INGESTOR.delete_collections(collection_names, vdb_endpoint)
+            response = NV_INGEST_INGESTOR.delete_collections(vdb_endpoint=vdb_endpoint, collection_names=collection_names)
             return CollectionResponse(**response)
         raise NotImplementedError("Example class has not implemented the delete_collections method.")
 
@@ -658,4 +684,32 @@ async def delete_collections(vdb_endpoint: str = Query(default=os.getenv("APP_VE
         return JSONResponse(content={"message": "Request was cancelled by the client."}, status_code=499)
     except Exception as e:
         logger.error("Error from DELETE /collections endpoint. Error details: %s", e)
-        return JSONResponse(content={"message": f"Error occurred while deleting collections. Error: {e}"}, status_code=500)
\ No newline at end of file
+        return JSONResponse(content={"message": f"Error occurred while deleting collections. Error: {e}"}, status_code=500)
+
+
+@app.get(
+    "/admin/profiles",
+    tags=["Admin APIs"],
+    responses={404: {"description": "Profiling is disabled"}},
+)
+async def list_profiles() -> List[Dict[str, Any]]:
+    """List the buffered upload profiles, newest first. Requires ENABLE_PROFILING=True."""
+    if not REQUEST_PROFILER.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+    return REQUEST_PROFILER.list()
+
+
+@app.get(
+    "/admin/profiles/{profile_id}",
+    tags=["Admin APIs"],
+    response_class=PlainTextResponse,
+    responses={404: {"description": "Profile not found or profiling is disabled"}},
+)
+async def get_profile(profile_id: str) -> PlainTextResponse:
+    """Download an upload profile as folded stacks, e.g. for flamegraph.pl, inferno or speedscope."""
+    profile = REQUEST_PROFILER.get(profile_id) if REQUEST_PROFILER.enabled else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return PlainTextResponse(profile.folded(), headers={
+        "Content-Disposition": f'attachment; filename="{profile.name}-{profile_id}.folded"'
+    })
@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Pipelined embed-and-insert uploader used when ENABLE_NV_INGEST_VDB_UPLOAD=False.
+
+Batches are embedded concurrently (bounded towards the embedding NIM) while
+previously embedded batches are inserted into the vector store, so embedding
+and insertion overlap instead of running back to back.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinedVDBUploader:
+    """
+    Embeds batch N+1..N+k while batch N is being inserted into the vector store.
+
+    The batch size adapts to the observed embedding latency: it grows while batches
+    finish well under the target latency and shrinks when they exceed it. Batches
+    are additionally capped by an estimated payload size to stay below the
+    vector store insert message limit.
+    """
+
+    def __init__(
+        self,
+        embedder: Embeddings,
+        vectorstore: VectorStore,
+        embedding_dimension: int,
+        initial_batch_size: int = int(os.getenv("VDB_UPLOAD_BATCH_SIZE", 500)),
+        min_batch_size: int = int(os.getenv("VDB_UPLOAD_MIN_BATCH_SIZE", 32)),
+        max_batch_size: int = int(os.getenv("VDB_UPLOAD_MAX_BATCH_SIZE", 2048)),
+        max_batch_bytes: int = int(os.getenv("VDB_UPLOAD_MAX_BATCH_BYTES", 32 * 1024 * 1024)),
+        target_batch_latency: float = float(os.getenv("VDB_UPLOAD_TARGET_BATCH_LATENCY", 2.0)),
+        max_concurrency: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 4)),
+        max_retries: int = int(os.getenv("VDB_UPLOAD_MAX_RETRIES", 3)),
+    ):
+        self.embedder = embedder
+        self.vectorstore = vectorstore
+        self.embedding_dimension = embedding_dimension
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.batch_size = min(max(initial_batch_size, self.min_batch_size), self.max_batch_size)
+        self.max_batch_bytes = max_batch_bytes
+        self.target_batch_latency = target_batch_latency
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(1, max_retries)
+        self._lock = threading.Lock()
+
+    def upload(self, documents: List[Document]) -> Dict[str, Any]:
+        """
+        Embed and insert all documents into the vector store
+
+        Arguments:
+            - documents: List[Document] - List of langchain documents
+
+        Returns:
+            - Dict[str, Any] - Upload statistics (chunks, batches, seconds, chunks_per_second)
+        """
+        start_time = time.time()
+        total_batches = 0
+        offset = 0
+        # (batch, embedding future) in submission order, inserted first-in first-out
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as embed_pool:
+            while offset < len(documents) or pending:
+                # Keep up to max_concurrency batches embedding ahead of the insert
+                while offset < len(documents) and len(pending) < self.max_concurrency:
+                    batch = self._next_batch(documents, offset)
+                    offset += len(batch)
+                    pending.append((batch, embed_pool.submit(self._embed_batch, batch)))
+
+                batch, embedding_future = pending.popleft()
+                embeddings = embedding_future.result()
+                self._with_retries(self._insert_batch, batch, embeddings)
+                total_batches += 1
+
+        elapsed = time.time() - start_time
+        stats = {
+            "chunks": len(documents),
+            "batches": total_batches,
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": round(len(documents) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+        logger.info(
+            "Vector DB upload complete: %d chunks in %d batches, %.2fs (%.2f chunks/sec)",
+            stats["chunks"], stats["batches"], elapsed, stats["chunks_per_second"]
+        )
+        return stats
+
+    def _next_batch(self, documents: List[Document], offset: int) -> List[Document]:
+        """Cut the next batch from offset honoring the current batch size and payload limit"""
+        with self._lock:
+            batch_size = self.batch_size
+
+        batch = []
+        batch_bytes = 0
+        for document in documents[offset:offset + batch_size]:
+            document_bytes = self._estimate_bytes(document)
+            if batch and batch_bytes + document_bytes > self.max_batch_bytes:
+                break
+            batch.append(document)
+            batch_bytes += document_bytes
+        return batch
+
+    def _estimate_bytes(self, document: Document) -> int:
+        """Rough size of a single row in the insert request"""
+        return (
+            len(document.page_content.encode("utf-8"))
+            + len(json.dumps(document.metadata, default=str))
+            + self.embedding_dimension * 4  # float32 vector
+        )
+
+    def _embed_batch(self, batch: List[Document]) -> List[List[float]]:
+        """Embed a batch with retries and feed the observed latency into the batch sizing"""
+        start_time = time.time()
+        texts = [document.page_content for document in batch]
+        embeddings = self._with_retries(self.embedder.embed_documents, texts)
+        self._observe_latency(len(batch), time.time() - start_time)
+        return embeddings
+
+    def _insert_batch(self, batch: List[Document], embeddings: List[List[float]]) -> None:
+        """Insert an already embedded batch into the vector store"""
+        self.vectorstore.add_embeddings(
+            texts=[document.page_content for document in batch],
+            embeddings=embeddings,
+            metadatas=[document.metadata for document in batch],
+            batch_size=len(batch),
+        )
+
+    def _observe_latency(self, batch_len: int, latency: float) -> None:
+        """Grow or shrink the batch size towards the target latency"""
+        with self._lock:
+            if latency > self.target_batch_latency:
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            # Only grow on full batches, a short tail batch says little about throughput
+            elif latency < self.target_batch_latency / 2 and batch_len >= self.batch_size:
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+            else:
+                return
+            logger.debug("Embedding batch of %d took %.2fs, batch size is now %d",
+                         batch_len, latency, self.batch_size)
+
+    def _with_retries(self, func: Callable, *args: Any) -> Any:
+        """Call func with exponential backoff, re-raising the last failure"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("%s failed after %d attempts: %s", func.__name__, attempt, e)
+                    raise
+                backoff = 2 ** (attempt - 1)
+                logger.warning("%s failed (attempt %d/%d): %s. Retrying in %ss",
+                               func.__name__, attempt, self.max_retries, e, backoff)
+                time.sleep(backoff)
@@ -17,13 +17,19 @@
 import os
 import json
 import logging
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
 from io import BytesIO
 
 from minio import Minio
+from minio.deleteobjects import DeleteObject
 
 logger = logging.getLogger(__name__)
 
+# Number of concurrent put requests issued against minio during bulk uploads.
+# Kept at or below the default urllib3 pool size (10) of the minio client.
+MINIO_MAX_WORKERS = int(os.getenv("MINIO_MAX_WORKERS", 8))
+
 class MinioOperator:
     """Minio operator Class to store metadata using Minio-client"""
 
@@ -66,6 +72,27 @@ class MinioOperator:
             content_type="application/json"
         )
 
+    def put_payloads(
+        self,
+        payloads: List[dict],
+        object_names: List[str]
+    ) -> None:
+        """Put multiple dictionaries to S3 storage concurrently using a bounded thread pool"""
+        if len(payloads) != len(object_names):
+            raise ValueError("Number of payloads and object names must match.")
+        if not payloads:
+            return
+
+        max_workers = min(MINIO_MAX_WORKERS, len(payloads))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.put_payload, payload, object_name)
+                for payload, object_name in zip(payloads, object_names)
+            ]
+            # Surface the first upload failure, if any, to the caller
+            for future in futures:
+                future.result()
+
     def get_payload(
         self,
         object_name: str
@@ -95,8 +122,25 @@ class MinioOperator:
 
     def delete_payloads(
         self,
-        object_names: List[str]
+        object_names: Iterable[str]
+    ) -> None:
+        """Delete payloads from S3 storage using the S3 multi-object delete API.
+
+        object_names may be any iterable (e.g. a generator), minio consumes it lazily
+        and issues one DeleteObjects request per 1000 objects.
+        """
+        delete_objects = (DeleteObject(object_name) for object_name in object_names)
+        # remove_objects is lazy, iterating over the errors performs the deletion
+        for error in self.client.remove_objects(self.default_bucket_name, delete_objects):
+            logger.warning(f"Error while deleting object {error.name} from Minio: {error}")
+
+    def delete_payloads_by_prefix(
+        self,
+        prefix: str
     ) -> None:
-        """Delete payloads from S3 storage using minio client"""
-        for object_name in object_names:
-            self.client.remove_object(self.default_bucket_name, object_name)
+        """Stream object names under a prefix straight into a bulk delete without listing them up-front"""
+        object_names = (
+            obj.object_name
+            for obj in self.client.list_objects(self.default_bucket_name, prefix=prefix, recursive=True)
+        )
+        self.delete_payloads(object_names)
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import json
 import logging
 import os
@@ -37,10 +38,18 @@ from opentelemetry.semconv_ai import (
     SpanAttributes,
     TraceloopSpanKindValues,
 )
-from opentelemetry.trace import SpanKind, Tracer, set_span_in_context
+from opentelemetry.trace import SpanKind, Status, StatusCode, Tracer, set_span_in_context
 from opentelemetry.trace.span import Span
 from pydantic import BaseModel
 from .otel_metrics import OtelMetrics
+from .sampling import TRACING_MAX_ATTRIBUTE_LENGTH
+
+# How prompts, contexts and responses are put into span attributes:
+# full copies them (up to TRACING_MAX_ATTRIBUTE_LENGTH), hash only records a digest and the length,
+# none leaves them out like TRACELOOP_TRACE_CONTENT=false
+TRACING_CONTENT_MODE = os.getenv("TRACING_CONTENT_MODE", "full").lower()
+# Whether to add a span event per streamed token
+TRACING_TOKEN_EVENTS = os.getenv("TRACING_TOKEN_EVENTS", "True").lower() == "true"
 
 
 class Config:
@@ -67,11 +76,26 @@ class CallbackFilteredJSONEncoder(json.JSONEncoder):
 
 
 def should_send_prompts():
+    if TRACING_CONTENT_MODE == "none":
+        return False
     return (
         os.getenv("TRACELOOP_TRACE_CONTENT") or "true"
     ).lower() == "true" or context_api.get_value("override_enable_content_tracing")
 
 
+def _content(value: str) -> str:
+    """Prompt or response content as recorded according to TRACING_CONTENT_MODE"""
+    if TRACING_CONTENT_MODE == "hash":
+        return f"sha256:{hashlib.sha256(value.encode('utf-8')).hexdigest()} chars:{len(value)}"
+    if TRACING_MAX_ATTRIBUTE_LENGTH and len(value) > TRACING_MAX_ATTRIBUTE_LENGTH:
+        return f"{value[:TRACING_MAX_ATTRIBUTE_LENGTH]}... [{len(value) - TRACING_MAX_ATTRIBUTE_LENGTH} chars truncated]"
+    return value
+
+
+def _json_content(value: Any) -> str:
+    return _content(json.dumps(value, cls=CallbackFilteredJSONEncoder))
+
+
 def dont_throw(func):
     """
     A decorator that wraps the passed in function and logs exceptions instead of throwing them.
@@ -108,6 +132,35 @@ class SpanHolder:
     entity_path: str
     start_time: float = field(default_factory=time.time)
     request_model: Optional[str] = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+    first_token_time: Optional[float] = None
+    last_token_time: Optional[float] = None
+    token_count: int = 0
+
+
+# Pipeline stage measured by runs with these run names, see OtelMetrics.record_stage_latency
+RUN_NAME_STAGES = {
+    "query-rewriter": "query_rewriting",
+    # Scored vector searches of adaptive retrieval, plain retrievers report through on_retriever_end
+    "adaptive-retriever": "retrieval",
+    "context_reranker": "reranking",
+    "relevance-checker": "reflection",
+    "groundedness-checker": "reflection",
+    "response-regenerator": "reflection",
+    "llm-stream": "llm",
+    "llm-invoke": "llm",
+    "conversation-summary": "conversation_summary",
+}
+
+
+def _metric_labels(span_holder: SpanHolder) -> dict[str, Optional[str]]:
+    """collection and model labels from the run metadata set by the chains"""
+    metadata = span_holder.metadata
+    return {
+        "collection": metadata.get("collection"),
+        # Chat model runs know their own model, other runs inherit the request's LLM model
+        "model": metadata.get("ls_model_name") or metadata.get("model") or span_holder.request_model,
+    }
 
 
 def _message_type_to_role(message_type: str) -> str:
@@ -170,7 +223,7 @@ def _set_llm_request(
 ) -> None:
     _set_request_params(span, kwargs, span_holder)
 
-    if should_send_prompts():
+    if should_send_prompts() and span.is_recording():
         for i, msg in enumerate(prompts):
             span.set_attribute(
                 f"{SpanAttributes.LLM_PROMPTS}.{i}.role",
@@ -178,7 +231,7 @@ def _set_llm_request(
             )
             span.set_attribute(
                 f"{SpanAttributes.LLM_PROMPTS}.{i}.content",
-                msg,
+                _content(msg),
             )
 
 
@@ -191,7 +244,7 @@ def _set_chat_request(
 ) -> None:
     _set_request_params(span, serialized.get("kwargs", {}), span_holder)
 
-    if should_send_prompts():
+    if should_send_prompts() and span.is_recording():
         for i, function in enumerate(
             kwargs.get("invocation_params", {}).get("functions", [])
         ):
@@ -216,18 +269,18 @@ def _set_chat_request(
                 if isinstance(msg.content, str):
                     span.set_attribute(
                         f"{SpanAttributes.LLM_PROMPTS}.{i}.content",
-                        msg.content,
+                        _content(msg.content),
                     )
                 else:
                     span.set_attribute(
                         f"{SpanAttributes.LLM_PROMPTS}.{i}.content",
-                        json.dumps(msg.content, cls=CallbackFilteredJSONEncoder),
+                        _json_content(msg.content),
                     )
                 i += 1
 
 
 def _set_chat_response(span: Span, response: LLMResult) -> None:
-    if not should_send_prompts():
+    if not should_send_prompts() or not span.is_recording():
         return
 
     input_tokens = 0
@@ -258,7 +311,7 @@ def _set_chat_response(span: Span, response: LLMResult) -> None:
             if hasattr(generation, "text") and generation.text != "":
                 span.set_attribute(
                     f"{prefix}.content",
-                    generation.text,
+                    _content(generation.text),
                 )
                 span.set_attribute(f"{prefix}.role", "assistant")
             else:
@@ -269,14 +322,12 @@ def _set_chat_response(span: Span, response: LLMResult) -> None:
                 if generation.message.content is str:
                     span.set_attribute(
                         f"{prefix}.content",
-                        generation.message.content,
+                        _content(generation.message.content),
                     )
                 else:
                     span.set_attribute(
                         f"{prefix}.content",
-                        json.dumps(
-                            generation.message.content, cls=CallbackFilteredJSONEncoder
-                        ),
+                        _json_content(generation.message.content),
                     )
                 if generation.generation_info.get("finish_reason"):
                     span.set_attribute(
@@ -409,7 +460,7 @@ class LangchainCallbackHandler(BaseCallbackHandler):
         )
 
         self.spans[run_id] = SpanHolder(
-            span, token, None, [], workflow_name, entity_name, entity_path
+            span, token, None, [], workflow_name, entity_name, entity_path, metadata=metadata or {}
         )
 
         if parent_run_id is not None and parent_run_id in self.spans:
@@ -511,17 +562,16 @@ class LangchainCallbackHandler(BaseCallbackHandler):
             entity_path,
             metadata,
         )
-        if should_send_prompts():
+        if should_send_prompts() and span.is_recording():
             span.set_attribute(
                 SpanAttributes.TRACELOOP_ENTITY_INPUT,
-                json.dumps(
+                _json_content(
                     {
                         "inputs": inputs,
                         "tags": tags,
                         "metadata": metadata,
                         "kwargs": kwargs,
-                    },
-                    cls=CallbackFilteredJSONEncoder,
+                    }
                 ),
             )
 
@@ -539,31 +589,34 @@ class LangchainCallbackHandler(BaseCallbackHandler):
             return
         span_holder = self.spans[run_id]
         span = span_holder.span
-        if should_send_prompts():
-            if kwargs.get("inputs"):
-                inputs = kwargs.get("inputs")
-                if isinstance(inputs, dict) and "context" in inputs.keys():
-                    context = inputs.get("context")
-                    chunk_count = len(context)
-                    total_words_in_context = 0
-                    for chunk in context:
-                        total_words_in_context += len(chunk.split())
-                    avg_words_per_chunk = int(total_words_in_context / chunk_count)
-                    self.metrics.update_avg_words_per_chunk(
-                        avg_words_per_chunk=avg_words_per_chunk
-                    )
-                elif isinstance(inputs, AIMessageChunk):
-                    self.total_output_words = len(inputs.content.split())
-                    self.metrics.update_llm_tokens(
-                        input_t=self.total_input_words,
-                        output_t=self.total_output_words,
-                    )
+        stage = RUN_NAME_STAGES.get(span_holder.entity_name)
+        if stage:
+            self.metrics.record_stage_latency(
+                stage, time.time() - span_holder.start_time, **_metric_labels(span_holder)
+            )
+        # Metrics are recorded for every request, also when the trace is sampled out
+        if kwargs.get("inputs"):
+            inputs = kwargs.get("inputs")
+            if isinstance(inputs, dict) and "context" in inputs.keys():
+                context = inputs.get("context")
+                chunk_count = len(context)
+                total_words_in_context = 0
+                for chunk in context:
+                    total_words_in_context += len(chunk.split())
+                avg_words_per_chunk = int(total_words_in_context / chunk_count)
+                self.metrics.update_avg_words_per_chunk(
+                    avg_words_per_chunk=avg_words_per_chunk
+                )
+            elif isinstance(inputs, AIMessageChunk):
+                self.total_output_words = len(inputs.content.split())
+                self.metrics.update_llm_tokens(
+                    input_t=self.total_input_words,
+                    output_t=self.total_output_words,
+                )
+        if should_send_prompts() and span.is_recording():
             span.set_attribute(
                 SpanAttributes.TRACELOOP_ENTITY_OUTPUT,
-                json.dumps(
-                    {"outputs": outputs, "kwargs": kwargs},
-                    cls=CallbackFilteredJSONEncoder,
-                ),
+                _json_content({"outputs": outputs, "kwargs": kwargs}),
             )
 
         self._end_span(span, run_id)
@@ -607,8 +660,19 @@ class LangchainCallbackHandler(BaseCallbackHandler):
     def on_llm_new_token(self, token: str, **kwargs: Any) -> Any:
         """Run on new LLM token. Only available when streaming is enabled."""
         # TODO: add error handling
-        span = self.spans[kwargs.get("run_id")].span
-        span.add_event("on_llm_new_token")
+        span_holder = self.spans[kwargs.get("run_id")]
+        if TRACING_TOKEN_EVENTS and span_holder.span.is_recording():
+            span_holder.span.add_event("on_llm_new_token")
+        if not token:
+            return
+        now = time.time()
+        if span_holder.first_token_time is None:
+            span_holder.first_token_time = now
+            self.metrics.record_llm_first_token(now - span_holder.start_time, **_metric_labels(span_holder))
+        else:
+            self.metrics.record_llm_inter_token(now - span_holder.last_token_time, **_metric_labels(span_holder))
+        span_holder.last_token_time = now
+        span_holder.token_count += 1
 
     @dont_throw
     def on_llm_start(
@@ -628,7 +692,7 @@ class LangchainCallbackHandler(BaseCallbackHandler):
 
         name = self._get_name_from_callback(serialized, kwargs=kwargs)
         span = self._create_llm_span(
-            run_id, parent_run_id, name, LLMRequestTypeValues.COMPLETION
+            run_id, parent_run_id, name, LLMRequestTypeValues.COMPLETION, metadata=metadata
         )
         _set_llm_request(span, serialized, prompts, kwargs, self.spans[run_id])
 
@@ -685,9 +749,90 @@ class LangchainCallbackHandler(BaseCallbackHandler):
                 span, SpanAttributes.LLM_USAGE_TOTAL_TOKENS, total_tokens
             )
 
+        # Decoding throughput, the first token's latency is covered by the time to first token
+        span_holder = self.spans[run_id]
+        if span_holder.token_count > 1 and span_holder.last_token_time > span_holder.first_token_time:
+            output_tokens = (completion_tokens if token_usage is not None else None) or span_holder.token_count
+            self.metrics.record_llm_throughput(
+                (output_tokens - 1) / (span_holder.last_token_time - span_holder.first_token_time),
+                **_metric_labels(span_holder)
+            )
+
         _set_chat_response(span, response)
         self._end_span(span, run_id)
 
+    @dont_throw
+    def on_retriever_start(
+        self,
+        serialized: dict[str, Any],
+        query: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        tags: Optional[list[str]] = None,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Run when retriever starts running."""
+
+        if context_api.get_value(_SUPPRESS_INSTRUMENTATION_KEY):
+            return
+
+        name = self._get_name_from_callback(serialized or {}, **kwargs)
+        self._create_task_span(
+            run_id,
+            parent_run_id,
+            name,
+            TraceloopSpanKindValues.TASK,
+            self.get_workflow_name(parent_run_id),
+            name,
+            self.get_entity_path(parent_run_id),
+            metadata,
+        )
+
+    @dont_throw
+    def on_retriever_end(
+        self,
+        documents: Sequence[Document],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Run when retriever ends running."""
+
+        if context_api.get_value(_SUPPRESS_INSTRUMENTATION_KEY):
+            return
+
+        span_holder = self.spans[run_id]
+        labels = _metric_labels(span_holder)
+        # Embedding the query and the vector search, see TimedEmbeddings for the embedding share
+        self.metrics.record_stage_latency("retrieval", time.time() - span_holder.start_time, **labels)
+        self.metrics.record_retrieved_chunks(len(documents), **labels)
+        self._end_span(span_holder.span, run_id)
+
+    @dont_throw
+    def on_retriever_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Run when retriever errors, e.g. a failed vector search."""
+
+        if context_api.get_value(_SUPPRESS_INSTRUMENTATION_KEY):
+            return
+
+        span_holder = self.spans.get(run_id)
+        if span_holder is None:
+            return
+        span_holder.span.record_exception(error)
+        span_holder.span.set_status(Status(StatusCode.ERROR, str(error)))
+        self._end_span(span_holder.span, run_id)
+        del self.spans[run_id]
+
     @dont_throw
     def on_tool_start(
         self,
@@ -719,18 +864,17 @@ class LangchainCallbackHandler(BaseCallbackHandler):
             name,
             entity_path,
         )
-        if should_send_prompts():
+        if should_send_prompts() and span.is_recording():
             span.set_attribute(
                 SpanAttributes.TRACELOOP_ENTITY_INPUT,
-                json.dumps(
+                _json_content(
                     {
                         "input_str": input_str,
                         "tags": tags,
                         "metadata": metadata,
                         "inputs": inputs,
                         "kwargs": kwargs,
-                    },
-                    cls=CallbackFilteredJSONEncoder,
+                    }
                 ),
             )
 
@@ -749,13 +893,10 @@ class LangchainCallbackHandler(BaseCallbackHandler):
             return
 
         span = self._get_span(run_id)
-        if should_send_prompts():
+        if should_send_prompts() and span.is_recording():
             span.set_attribute(
                 SpanAttributes.TRACELOOP_ENTITY_OUTPUT,
-                json.dumps(
-                    {"output": output, "kwargs": kwargs},
-                    cls=CallbackFilteredJSONEncoder,
-                ),
+                _json_content({"output": output, "kwargs": kwargs}),
             )
         self._end_span(span, run_id)
 
@@ -16,8 +16,16 @@
 """Opentelemetery Metrics"""
 
 import logging
+from typing import Optional
+
 from opentelemetry import metrics
 
+# Pipeline stages of the stage latency histogram
+STAGES = (
+    "query_rewriting", "embedding", "retrieval", "reranking", "reflection",
+    "llm", "citations", "conversation_summary",
+)
+
 
 class OtelMetrics:
     """Encapsulates OpenTelemetry Metrics for API tracking."""
@@ -48,6 +56,51 @@ class OtelMetrics:
             "token_usage_distribution",
             description="Token usage distribution per request",
         )
+        self.admission_queue_depth_gauge = self.meter.create_gauge(
+            "admission_queue_depth", description="Requests waiting for a slot per stage"
+        )
+        self.admission_active_gauge = self.meter.create_gauge(
+            "admission_active_requests", description="Requests holding a slot per stage"
+        )
+        self.admission_wait_histogram = self.meter.create_histogram(
+            "admission_wait_seconds", unit="s", description="Time spent waiting for a slot per stage"
+        )
+        self.admission_rejection_counter = self.meter.create_counter(
+            "admission_rejections_total", description="Requests rejected by admission control"
+        )
+        self.context_tokens_histogram = self.meter.create_histogram(
+            "context_tokens", description="Tokens of retrieved context put into the prompt per request"
+        )
+        self.context_tokens_saved_histogram = self.meter.create_histogram(
+            "context_tokens_saved", description="Context tokens removed by deduplication and the token budget per request"
+        )
+        self.context_tokens_saved_counter = self.meter.create_counter(
+            "context_tokens_saved_total", description="Total context tokens removed by deduplication and the token budget"
+        )
+        self.stage_latency_histogram = self.meter.create_histogram(
+            "rag_stage_latency_seconds", unit="s", description="Latency per pipeline stage"
+        )
+        self.llm_ttft_histogram = self.meter.create_histogram(
+            "llm_time_to_first_token_seconds", unit="s", description="Time from the LLM call to its first streamed token"
+        )
+        self.llm_itl_histogram = self.meter.create_histogram(
+            "llm_inter_token_latency_seconds", unit="s", description="Time between consecutive streamed tokens"
+        )
+        self.llm_tokens_per_second_histogram = self.meter.create_histogram(
+            "llm_tokens_per_second", description="Output tokens per second after the first token per LLM call"
+        )
+        self.retrieved_chunks_histogram = self.meter.create_histogram(
+            "retrieved_chunks", description="Chunks returned by the retriever per call"
+        )
+        self.cache_lookup_counter = self.meter.create_counter(
+            "cache_lookups_total", description="Cache lookups by cache and result (hit or miss)"
+        )
+        self.adaptive_retrieval_counter = self.meter.create_counter(
+            "adaptive_retrieval_total", description="Queries by adaptive retrieval mode and whether they were reranked"
+        )
+        self.adaptive_candidates_histogram = self.meter.create_histogram(
+            "adaptive_retrieval_candidates", description="Candidates retrieved per query by adaptive retrieval"
+        )
         logging.info("OpenTelemetry Metrics Initialized")
 
     def update_api_requests(self, method: str = None, endpoint: str = None):
@@ -73,3 +126,56 @@ class OtelMetrics:
         if avg_words_per_chunk is not None:
             self.avg_words_per_chunk_gauge.set(avg_words_per_chunk)
             logging.info(f"Avg words per chunk: {avg_words_per_chunk}")
+
+    def update_admission_queue(self, stage: str, queued: int, active: int):
+        """Updates the admission control queue depth and active slots of a stage"""
+        self.admission_queue_depth_gauge.set(queued, {"stage": stage})
+        self.admission_active_gauge.set(active, {"stage": stage})
+
+    def record_admission_wait(self, stage: str, seconds: float):
+        """Records how long a request waited for an admission slot"""
+        self.admission_wait_histogram.record(seconds, {"stage": stage})
+
+    def update_admission_rejections(self, stage: str, reason: str):
+        """Counts a request rejected by admission control"""
+        self.admission_rejection_counter.add(1, {"stage": stage, "reason": reason})
+
+    def update_context_tokens(self, used: int, saved: int):
+        """Records the prompt context size and the tokens saved by the context builder"""
+        self.context_tokens_histogram.record(used)
+        self.context_tokens_saved_histogram.record(saved)
+        self.context_tokens_saved_counter.add(saved)
+
+    @staticmethod
+    def _labels(collection: Optional[str], model: Optional[str], **extra) -> dict:
+        return {"collection": collection or "", "model": model or "", **extra}
+
+    def record_stage_latency(self, stage: str, seconds: float, collection: str = None, model: str = None):
+        """Records the latency of a pipeline stage, see STAGES"""
+        self.stage_latency_histogram.record(seconds, self._labels(collection, model, stage=stage))
+
+    def record_llm_first_token(self, seconds: float, collection: str = None, model: str = None):
+        """Records the time to first token of an LLM call"""
+        self.llm_ttft_histogram.record(seconds, self._labels(collection, model))
+
+    def record_llm_inter_token(self, seconds: float, collection: str = None, model: str = None):
+        """Records the latency between two streamed tokens"""
+        self.llm_itl_histogram.record(seconds, self._labels(collection, model))
+
+    def record_llm_throughput(self, tokens_per_second: float, collection: str = None, model: str = None):
+        """Records the decoding throughput of an LLM call"""
+        self.llm_tokens_per_second_histogram.record(tokens_per_second, self._labels(collection, model))
+
+    def record_retrieved_chunks(self, chunks: int, collection: str = None, model: str = None):
+        """Records the number of chunks returned by a retriever call"""
+        self.retrieved_chunks_histogram.record(chunks, self._labels(collection, model))
+
+    def update_cache_lookup(self, cache: str, hit: bool):
+        """Counts a lookup of one of the server's caches, hit rate = hits / all lookups"""
+        self.cache_lookup_counter.add(1, {"cache": cache, "result": "hit" if hit else "miss"})
+
+    def record_adaptive_retrieval(self, mode: str, candidates: int, reranked: bool, collection: str = None):
+        """Records the plan of an adaptive retrieval, see adaptive_retrieval.AdaptiveRetrieval"""
+        labels = self._labels(collection, None, mode=mode, reranked=str(reranked).lower())
+        self.adaptive_retrieval_counter.add(1, labels)
+        self.adaptive_candidates_histogram.record(candidates, labels)
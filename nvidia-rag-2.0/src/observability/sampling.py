@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Head and tail based trace sampling"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanLimits, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON, ParentBased, TraceIdRatioBased
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.trace import StatusCode
+
+logger = logging.getLogger(__name__)
+
+# Fraction of traces kept, sampled out traces skip all attribute serialization
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", 1.0))
+# Additionally keep traces slower than this many seconds or with an error, 0 disables tail sampling.
+# Tail sampling records every trace in process and only decides on export.
+TRACING_TAIL_LATENCY_THRESHOLD = float(os.getenv("TRACING_TAIL_LATENCY_THRESHOLD", 0))
+# Maximum number of unfinished traces buffered for tail sampling
+TRACING_TAIL_MAX_TRACES = int(os.getenv("TRACING_TAIL_MAX_TRACES", 1000))
+# Maximum length of string span attributes, 0 disables the limit
+TRACING_MAX_ATTRIBUTE_LENGTH = int(os.getenv("TRACING_MAX_ATTRIBUTE_LENGTH", 16384))
+
+_TRACE_ID_LIMIT = (1 << 64) - 1
+
+
+def _head_sampled(trace_id: int, ratio: float) -> bool:
+    # Same decision as TraceIdRatioBased, so head and tail sampling agree
+    return trace_id & _TRACE_ID_LIMIT < round(ratio * (_TRACE_ID_LIMIT + 1))
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    Buffers the spans of a trace until its local root span ends, then passes them on
+    if the trace was head sampled, failed or took longer than latency_threshold.
+    """
+
+    def __init__(
+            self,
+            delegate: SpanProcessor,
+            sample_ratio: float = TRACING_SAMPLE_RATIO,
+            latency_threshold: float = TRACING_TAIL_LATENCY_THRESHOLD,
+            max_traces: int = TRACING_TAIL_MAX_TRACES
+        ):
+        self.delegate = delegate
+        self.sample_ratio = sample_ratio
+        self.latency_threshold = latency_threshold
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        # Decisions of finished traces, for spans ending after their local root
+        self._decisions: "OrderedDict[int, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _keep(self, root: ReadableSpan, spans: List[ReadableSpan]) -> bool:
+        if _head_sampled(root.context.trace_id, self.sample_ratio):
+            return True
+        if (root.end_time - root.start_time) / 1e9 >= self.latency_threshold:
+            return True
+        return any(span.status.status_code == StatusCode.ERROR for span in spans)
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        with self._lock:
+            decision = self._decisions.get(trace_id)
+            if decision is not None:
+                spans = [span] if decision else []
+            else:
+                self._traces.setdefault(trace_id, []).append(span)
+                if span.parent is not None and not span.parent.is_remote:
+                    if len(self._traces) > self.max_traces:
+                        self._traces.popitem(last=False)
+                        logger.debug("Tail sampling buffer is full, dropped the oldest unfinished trace")
+                    return
+                spans = self._traces.pop(trace_id)
+                decision = self._keep(span, spans)
+                self._decisions[trace_id] = decision
+                if len(self._decisions) > self.max_traces:
+                    self._decisions.popitem(last=False)
+                if not decision:
+                    spans = []
+        for buffered in spans:
+            self.delegate.on_end(buffered)
+
+    def shutdown(self) -> None:
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+def create_tracer_provider(resource: Resource, exporter: SpanExporter) -> TracerProvider:
+    """
+    Tracer provider configured by the TRACING_* environment variables. Spans are exported
+    asynchronously in batches, the batch processor is tuned with the standard OTEL_BSP_* variables.
+    """
+    span_limits = SpanLimits(max_attribute_length=TRACING_MAX_ATTRIBUTE_LENGTH or None)
+    if TRACING_TAIL_LATENCY_THRESHOLD > 0:
+        provider = TracerProvider(resource=resource, sampler=ALWAYS_ON, span_limits=span_limits)
+        provider.add_span_processor(TailSamplingSpanProcessor(BatchSpanProcessor(exporter)))
+        logger.info("Tracing with tail sampling: ratio %s, latency threshold %ss",
+                    TRACING_SAMPLE_RATIO, TRACING_TAIL_LATENCY_THRESHOLD)
+    else:
+        provider = TracerProvider(
+            resource=resource, sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)), span_limits=span_limits
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        logger.info("Tracing with head sampling ratio %s", TRACING_SAMPLE_RATIO)
+    return provider
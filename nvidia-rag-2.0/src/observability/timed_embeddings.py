@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Embedding latency metrics, embedding clients don't emit langchain callbacks"""
+
+import time
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .otel_metrics import OtelMetrics
+
+
+class TimedEmbeddings(Embeddings):
+    """Delegates to an embedding client and records the embedding stage latency"""
+
+    def __init__(self, embeddings: Embeddings, metrics: OtelMetrics, collection: Optional[str] = None):
+        self.embeddings = embeddings
+        self.metrics = metrics
+        self.collection = collection
+        self.model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+
+    def _record(self, start_time: float) -> None:
+        self.metrics.record_stage_latency(
+            "embedding", time.time() - start_time, collection=self.collection, model=self.model
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start_time = time.time()
+        try:
+            return self.embeddings.embed_documents(texts)
+        finally:
+            self._record(start_time)
+
+    def embed_query(self, text: str) -> List[float]:
+        start_time = time.time()
+        try:
+            return self.embeddings.embed_query(text)
+        finally:
+            self._record(start_time)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        start_time = time.time()
+        try:
+            return await self.embeddings.aembed_documents(texts)
+        finally:
+            self._record(start_time)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        start_time = time.time()
+        try:
+            return await self.embeddings.aembed_query(text)
+        finally:
+            self._record(start_time)
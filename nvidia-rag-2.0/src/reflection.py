@@ -20,7 +20,7 @@ from langchain_core.output_parsers.string import StrOutputParser
 from langchain_core.prompts.chat import ChatPromptTemplate
 from langchain_core.runnables import RunnableAssign
 
-from .utils import get_llm, get_prompts, get_env_variable
+from .utils import get_llm, get_prompts, get_env_variable, run_config
 
 logger = logging.getLogger(__name__)
 prompts = get_prompts()
@@ -72,7 +72,8 @@ def check_context_relevance(retriever_query: str,
                           retriever,
                           ranker,
                           reflection_counter: ReflectionCounter,
-                          enable_reranker: bool = True) -> Tuple[List[str], bool]:
+                          enable_reranker: bool = True,
+                          collection_name: str = "") -> Tuple[List[str], bool]:
     """Check relevance of retrieved context and optionally rewrite query for better results.
     
     Args:
@@ -81,6 +82,7 @@ def check_context_relevance(retriever_query: str,
         ranker: Optional document ranker instance
         reflection_counter: ReflectionCounter instance to track loop count
         enable_reranker: Whether to use the reranker if available
+        collection_name: Collection searched by the retriever, used as metric label
         
     Returns:
         Tuple[List[str], bool]: Retrieved documents and whether they meet relevance threshold
@@ -122,11 +124,11 @@ def check_context_relevance(retriever_query: str,
             })
 
             retriever = {"context": retriever} | RunnableAssign({"context": lambda input: input["context"]})
-            docs = retriever.invoke(current_query, config={'run_name':'retriever'})
-            docs = context_reranker.invoke({"context": docs.get("context", []), "question": current_query}, config={'run_name':'context_reranker'})
+            docs = retriever.invoke(current_query, config=run_config('retriever', collection_name))
+            docs = context_reranker.invoke({"context": docs.get("context", []), "question": current_query}, config=run_config('context_reranker', collection_name))
             original_docs = docs.get("context", [])
         else:
-            original_docs = retriever.invoke(current_query, config={'run_name':'retriever'})
+            original_docs = retriever.invoke(current_query, config=run_config('retriever', collection_name))
         
         docs = [d.page_content for d in original_docs]
 
@@ -135,7 +137,7 @@ def check_context_relevance(retriever_query: str,
         relevance_score = _retry_score_generation(
             relevance_chain,
             {"query": current_query, "context": context_text},
-            config={'run_name':'relevance-checker'}
+            config=run_config('relevance-checker', collection_name, model=reflection_llm_name)
         )
         
         logger.info(f"Context relevance score: {relevance_score} (threshold: {relevance_threshold})")
@@ -146,7 +148,7 @@ def check_context_relevance(retriever_query: str,
         
         if reflection_counter.remaining > 0:
             rewrite_chain = query_rewrite_template | reflection_llm | StrOutputParser()
-            current_query = rewrite_chain.invoke({"query": current_query}, config={'run_name':'query-rewriter'})
+            current_query = rewrite_chain.invoke({"query": current_query}, config=run_config('query-rewriter', collection_name, model=reflection_llm_name))
             logger.info(f"Rewritten query (iteration {reflection_counter.current_count}): {current_query}")
     
     return original_docs, False
@@ -154,6 +156,7 @@ def check_context_relevance(retriever_query: str,
 def check_response_groundedness(response: str,
                               context: List[str],
                               reflection_counter: ReflectionCounter,
+                              collection_name: str = "",
                               ) -> Tuple[str, bool]:
     """Check groundedness of generated response against retrieved context.
     
@@ -161,6 +164,7 @@ def check_response_groundedness(response: str,
         response (str): Generated response to check
         context (List[str]): List of context documents
         reflection_counter: ReflectionCounter instance to track loop count
+        collection_name: Collection the context was retrieved from, used as metric label
         
     Returns:
         Tuple[str, bool]: Final response and whether it meets groundedness threshold
@@ -193,7 +197,8 @@ def check_response_groundedness(response: str,
         groundedness_chain = groundedness_template | reflection_llm | StrOutputParser()
         groundedness_score = _retry_score_generation(
             groundedness_chain,
-            {"context": context_text, "response": current_response}
+            {"context": context_text, "response": current_response},
+            config=run_config('groundedness-checker', collection_name, model=reflection_llm_name)
         )
         
         logger.info(f"Response groundedness score: {groundedness_score} (threshold: {groundedness_threshold})")
@@ -210,7 +215,7 @@ def check_response_groundedness(response: str,
             ])
             
             regen_chain = regen_prompt | reflection_llm | StrOutputParser()
-            current_response = regen_chain.invoke({}, config={'run_name':'response-regenerator'})
+            current_response = regen_chain.invoke({}, config=run_config('response-regenerator', collection_name, model=reflection_llm_name))
             logger.info(f"Regenerated response (iteration {reflection_counter.current_count})")
     
     return current_response, False 
\ No newline at end of file
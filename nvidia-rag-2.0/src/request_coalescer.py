@@ -0,0 +1,280 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Single-flight coalescing of identical in-flight requests.
+
+The first request for a key (the leader) runs the pipeline, identical requests arriving
+while it is in flight subscribe to the same result or token stream. Nothing is kept once
+the flight has finished, so this is not an answer cache.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Generator, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .observability.otel_metrics import OtelMetrics
+
+logger = logging.getLogger(__name__)
+
+ENABLE_REQUEST_COALESCING = os.getenv("ENABLE_REQUEST_COALESCING", "True").lower() == "true"
+
+_END = object()
+
+
+def normalize_text(text: str) -> str:
+    """Case and whitespace insensitive form of a query"""
+    return " ".join((text or "").split()).casefold()
+
+
+def request_key(endpoint: str, payload: Dict[str, Any]) -> str:
+    """
+    Stable hash of a request payload. Messages are normalized so that queries differing
+    only in case or whitespace share a key, every other field must match exactly.
+    """
+    payload = dict(payload)
+    if payload.get("messages"):
+        payload["messages"] = [
+            (message.get("role"), normalize_text(message.get("content")))
+            for message in (m if isinstance(m, dict) else dict(m) for m in payload["messages"])
+        ]
+    if payload.get("query"):
+        payload["query"] = normalize_text(payload["query"])
+    encoded = json.dumps([endpoint, payload], sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SharedStream:
+    """
+    Token stream produced once in a background thread and replayed to every subscriber.
+
+    Subscribers are counted from the moment they join until they stop reading. The shared
+    execution outlives the leader's request and is stopped only once no subscriber is left;
+    a stream nobody reads any more is closed and never joined again.
+    """
+
+    def __init__(self, on_finish: Callable[[], None]):
+        # Resolves to the value published alongside the stream, e.g. the retrieved contexts
+        self.ready: Future = Future()
+        self._chunks: List[Any] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._subscribers = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._on_finish = on_finish
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._setup: Optional[asyncio.Task] = None
+
+    def join(self) -> bool:
+        """Count a new subscriber, False when the stream was closed because everyone left"""
+        with self._condition:
+            if self._closed:
+                return False
+            self._subscribers += 1
+            return True
+
+    def leave(self) -> None:
+        """A subscriber stopped reading, the last one closes the stream and cancels its setup"""
+        with self._condition:
+            self._subscribers -= 1
+            if self._subscribers > 0 or self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            setup = self._setup
+        self._on_finish()
+        if setup is not None and not setup.done():
+            logger.info("All subscribers of a coalesced request left, cancelling it")
+            self._loop.call_soon_threadsafe(setup.cancel)
+
+    def lead(self, setup: Callable[[], Awaitable[Tuple[Iterator[Any], Any, Optional[Callable[[], None]]]]]) -> None:
+        """
+        Run setup in a task of its own and start() the stream with its result, or fail() it.
+        Cancelling the leader's request doesn't cancel the task, only leave() of the last subscriber does.
+
+        Arguments:
+            - setup: Callable - Coroutine function returning the token source, the value to publish
+              and an optional callback run once the source is drained
+        """
+        self._loop = asyncio.get_running_loop()
+        with self._condition:
+            self._setup = self._loop.create_task(self._run_setup(setup))
+
+    async def _run_setup(self, setup) -> None:
+        try:
+            source, value, on_complete = await setup()
+        except BaseException as e:
+            self.fail(e)
+            return
+        self.start(source, value, on_complete)
+
+    async def result(self) -> Any:
+        """Wait for the value published by start(), raising the leader's error"""
+        # Shielded, a subscriber cancelled while waiting must not cancel ready for the others
+        return await asyncio.shield(asyncio.wrap_future(self.ready))
+
+    def start(self, source: Iterator[Any], value: Any = None, on_complete: Optional[Callable[[], None]] = None) -> None:
+        """Publish value to waiting subscribers and start draining source"""
+        # The producer runs in the leader's context, so its spans stay part of the request trace
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._produce, source, on_complete),
+                         name="coalesced-stream", daemon=True).start()
+        self.ready.set_result(value)
+
+    def fail(self, error: BaseException) -> None:
+        """The leader could not start the pipeline, propagate its error to all subscribers"""
+        if isinstance(error, asyncio.CancelledError):
+            self.ready.cancel()
+        else:
+            self.ready.set_exception(error)
+        with self._condition:
+            self._done = True
+            self._condition.notify_all()
+        self._on_finish()
+
+    def _produce(self, source: Iterator[Any], on_complete: Optional[Callable[[], None]]) -> None:
+        try:
+            iterator = iter(source)
+            while True:
+                with self._condition:
+                    if self._closed:
+                        logger.info("All subscribers of a coalesced stream left, stopping generation")
+                        break
+                chunk = next(iterator, _END)
+                if chunk is _END:
+                    break
+                with self._condition:
+                    self._chunks.append(chunk)
+                    self._condition.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            close = getattr(source, "close", None)
+            if close:
+                close()
+            self._on_finish()
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+            if on_complete:
+                on_complete()
+
+    def subscribe(self) -> Generator[Any, None, None]:
+        """
+        Iterate over the stream from its first chunk, raising the producer's error if any.
+        The caller must have join()ed, the generator leave()s once it is closed.
+        """
+        try:
+            position = 0
+            while True:
+                with self._condition:
+                    while position >= len(self._chunks) and not self._done:
+                        self._condition.wait()
+                    chunks = self._chunks[position:]
+                    done = self._done
+                position += len(chunks)
+                yield from chunks
+                if done and position >= len(self._chunks):
+                    break
+            if self._error is not None:
+                raise self._error
+        finally:
+            self.leave()
+
+
+class _Flight:
+    """A shared awaitable result and the number of callers waiting for it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """Registry of in-flight requests keyed by request_key"""
+
+    def __init__(self, enabled: bool = ENABLE_REQUEST_COALESCING, metrics: Optional["OtelMetrics"] = None):
+        self.enabled = enabled
+        self.metrics = metrics
+        self._streams: Dict[str, SharedStream] = {}
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def join_stream(self, key: str) -> Tuple[SharedStream, bool]:
+        """
+        Join the in-flight stream for key or register a new one. The caller counts as a
+        subscriber and has to leave() it, which subscribe() does once the generator is closed.
+
+        Returns:
+            - Tuple[SharedStream, bool] - The in-flight stream for key and whether the caller
+              is its leader and therefore has to lead() it
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            # Joining is atomic with the last subscriber leaving, a closed stream is replaced
+            is_leader = stream is None or not stream.join()
+            if is_leader:
+                stream = SharedStream(on_finish=lambda: self._forget_stream(key, stream))
+                stream.join()
+                self._streams[key] = stream
+            else:
+                logger.info("Coalescing request with an identical in-flight request")
+        self._record_lookup(hit=not is_leader)
+        return stream, is_leader
+
+    def _record_lookup(self, hit: bool) -> None:
+        if self.metrics:
+            self.metrics.update_cache_lookup("request_coalescing", hit)
+
+    def _forget_stream(self, key: str, stream: SharedStream) -> None:
+        with self._lock:
+            if self._streams.get(key) is stream:
+                del self._streams[key]
+
+    def _forget_flight(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await func once for all identical concurrent callers and share its result. func runs
+        in a task of its own, it is cancelled only when every caller waiting for it was cancelled.
+        """
+        if not self.enabled:
+            return await func()
+        flight = self._flights.get(key)
+        self._record_lookup(hit=flight is not None)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(func()))
+            flight.task.add_done_callback(lambda _: self._forget_flight(key, flight))
+            self._flights[key] = flight
+        else:
+            logger.info("Coalescing request with an identical in-flight request")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
@@ -0,0 +1,248 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+On-demand sampling profiler for single requests.
+
+With ENABLE_PROFILING=True a request carrying the X-Profile header (or the profile query
+parameter) is profiled: while it runs a pipeline step, a background thread samples the
+stack of the thread executing it. The steps of a request (e.g. retrieval and token
+generation) are merged into one profile, each stack rooted at its step. Finished profiles
+are written to PROFILING_DIR, which all workers of a server share, and served as folded
+stacks, the input format of flamegraph.pl, inferno and speedscope.
+Requests without the header, and all requests while profiling is disabled, run unchanged.
+"""
+import collections
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Counter, Dict, Iterable, Iterator, List, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+ENABLE_PROFILING = os.getenv("ENABLE_PROFILING", "False").lower() == "true"
+# Directory finished profiles are written to, shared by all workers of the server
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "request_profiles"))
+# Number of finished profiles kept, older ones are discarded
+PROFILING_BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", 16))
+# Seconds between two stack samples
+PROFILING_SAMPLE_INTERVAL = float(os.getenv("PROFILING_SAMPLE_INTERVAL", 0.005))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f-]{36}$")
+
+
+@dataclass
+class Profile:
+    """Stack samples of one profiled request"""
+    profile_id: str
+    name: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    samples: int = 0
+    stacks: Counter[str] = field(default_factory=collections.Counter)
+    # Thread sampled while the profile is recorded, not stored
+    thread_id: Optional[int] = field(default=None, repr=False, compare=False)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.profile_id,
+            "name": self.name,
+            "metadata": self.metadata,
+            "started_at": self.started_at,
+            "duration": round(self.duration, 3),
+            "samples": self.samples,
+        }
+
+    def folded(self) -> str:
+        """One 'frame;frame;frame count' line per distinct stack, outermost frame first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def merge(self, other: "Profile") -> None:
+        """Add the samples of another step of the same request"""
+        if other.name not in self.name.split("+"):
+            self.name = f"{self.name}+{other.name}"
+        self.metadata = {**self.metadata, **other.metadata}
+        self.started_at = min(self.started_at, other.started_at)
+        self.duration += other.duration
+        self.samples += other.samples
+        self.stacks.update(other.stacks)
+
+
+def _folded_stack(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class RequestProfiler:
+    """Samples the threads running profiled requests and keeps the latest profiles in directory"""
+
+    def __init__(
+            self,
+            enabled: bool = ENABLE_PROFILING,
+            buffer_size: int = PROFILING_BUFFER_SIZE,
+            interval: float = PROFILING_SAMPLE_INTERVAL,
+            directory: str = PROFILING_DIR
+        ):
+        self.enabled = enabled
+        self.buffer_size = buffer_size
+        self.interval = interval
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def requested(self, headers, query_params) -> Optional[str]:
+        """Profile id for a request asking to be profiled, None if it isn't or profiling is disabled"""
+        if not self.enabled:
+            return None
+        flag = headers.get(PROFILE_HEADER) or query_params.get("profile")
+        if flag is None or flag.strip().lower() not in ("1", "true", "yes"):
+            return None
+        return str(uuid4())
+
+    @contextmanager
+    def profile(self, profile_id: str, name: str, **metadata) -> Iterator[Profile]:
+        """
+        Sample the calling thread until the block exits. The sampled thread can be changed
+        through profile.thread_id while the block runs, None pauses sampling.
+        """
+        profile = Profile(profile_id=profile_id, name=name, metadata=metadata)
+        profile.thread_id = threading.get_ident()
+        stopped = threading.Event()
+
+        def sample():
+            while not stopped.wait(self.interval):
+                thread_id = profile.thread_id
+                frame = sys._current_frames().get(thread_id) if thread_id else None  # pylint: disable=protected-access
+                if frame is not None:
+                    profile.stacks[f"{name};{_folded_stack(frame)}"] += 1
+                    profile.samples += 1
+
+        sampler = threading.Thread(target=sample, name=f"profiler-{profile_id[:8]}", daemon=True)
+        start_time = time.perf_counter()
+        sampler.start()
+        try:
+            yield profile
+        finally:
+            stopped.set()
+            sampler.join()
+            profile.duration = time.perf_counter() - start_time
+            try:
+                self._store(profile)
+            except OSError as e:
+                logger.warning("Unable to store profile %s in %s: %s", profile_id, self.directory, e)
+            logger.info("Profiled %s in %.3fs with %d samples, id %s", name, profile.duration, profile.samples, profile_id)
+
+    def wrap(self, func: Callable, profile_id: Optional[str], name: str, **metadata) -> Callable:
+        """func itself without a profile_id, otherwise func profiled in the thread it ends up running in"""
+        if profile_id is None:
+            return func
+
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            with self.profile(profile_id, name, **metadata):
+                return func(*args, **kwargs)
+        return profiled
+
+    def wrap_iterator(self, iterable: Iterable, profile_id: Optional[str], name: str, **metadata) -> Iterable:
+        """
+        iterable itself without a profile_id, otherwise an iterator profiling whichever thread
+        produces the next item, e.g. a token stream drained by another thread than the request's.
+        Sampling pauses while the consumer handles an item.
+        """
+        if profile_id is None:
+            return iterable
+
+        def profiled():
+            iterator = iter(iterable)
+            with self.profile(profile_id, name, **metadata) as profile:
+                while True:
+                    profile.thread_id = threading.get_ident()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    profile.thread_id = None
+                    yield item
+        return profiled()
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def _load(self, path: str) -> Profile:
+        with open(path) as f:
+            data = json.load(f)
+        data["stacks"] = collections.Counter(data["stacks"])
+        return Profile(**data)
+
+    def _store(self, profile: Profile) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(profile.profile_id)
+            if os.path.exists(path):
+                stored = self._load(path)
+                stored.merge(profile)
+                profile = stored
+            data = {item.name: getattr(profile, item.name) for item in fields(profile) if item.name != "thread_id"}
+            # Written to a temporary file first, so other workers never read a partial profile
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_path, path)
+            for stale in self._paths()[max(self.buffer_size, 1):]:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+    def _paths(self) -> List[str]:
+        """Stored profiles, newest first"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        paths = [os.path.join(self.directory, name) for name in names]
+        return sorted(paths, key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0, reverse=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        profiles = []
+        for path in self._paths():
+            try:
+                profiles.append(self._load(path).summary())
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            return self._load(self._path(profile_id))
+        except (OSError, ValueError):
+            return None
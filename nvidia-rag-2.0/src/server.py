@@ -31,6 +31,7 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pydantic import Field
@@ -39,11 +40,24 @@ from pydantic import validator
 from pydantic import field_validator
 from pymilvus.exceptions import MilvusException
 from pymilvus.exceptions import MilvusUnavailableException
+from starlette.background import BackgroundTask
 from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY
 from langchain_core.documents import Document
-from src.chains import UnstructuredRAG
+from src.chains import UnstructuredRAG, set_metrics, warm_up
+from src.health_monitor import HealthMonitor, get_circuit_breaker
+from src.request_coalescer import RequestCoalescer, request_key
+from src.chat_sessions import CHAT_SESSION_TTL, SessionMessage, get_session_store
+from src.request_profiler import PROFILE_ID_HEADER, RequestProfiler
+from src.admission import (
+    ADMISSION_LLM_CONCURRENCY,
+    ADMISSION_RETRIEVAL_CONCURRENCY,
+    AdmissionController,
+    AdmissionRejected,
+    parse_priority
+)
 from .utils import (
     get_config,
+    enable_config_hot_reload,
     get_minio_operator,
     get_unique_thumbnail_id,
     check_and_print_services_health,
@@ -55,6 +69,7 @@ logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
 settings = get_config()
+enable_config_hot_reload()
 default_max_tokens = 128000 if "deepseek-r1" in str(settings.llm.model_name) else 1024
 default_temperature = 0.6 if "deepseek-r1" in str(settings.llm.model_name) else 0.2
 default_top_p = 0.95 if "deepseek-r1" in str(settings.llm.model_name) else 0.7
@@ -66,6 +81,8 @@ tags_metadata = [
     },
     {"name": "Retrieval APIs", "description": "APIs for retrieving document chunks for a query."},
     {"name": "RAG APIs", "description": "APIs for retrieval followed by generation."},
+    {"name": "Session APIs", "description": "APIs for managing server-side chat sessions."},
+    {"name": "Admin APIs", "description": "APIs for downloading request profiles."},
 ]
 
 # create the FastAPI server
@@ -96,12 +113,27 @@ FALLBACK_EXCEPTION_MSG = "Error from rag-server. Please check rag-server logs fo
 logger.info("Initializing NVIDIA RAG server...")
 
 UNSTRUCTURED_RAG = UnstructuredRAG()
+# Background creation of model clients and the vector store connection, see start_warm_up
+WARMUP_TASK: Optional[asyncio.Task] = None
+# Cached dependency health, refreshed in the background and feeding the circuit breakers
+HEALTH_MONITOR = HealthMonitor(check=check_all_services_health, on_change=print_health_report)
 
 settings = get_config()
 metrics = None
 if settings.tracing.enabled:
     from .tracing import instrument
     metrics = instrument(app, settings)
+    set_metrics(metrics)
+
+# Admission control per pipeline stage, see src/admission.py
+RETRIEVAL_ADMISSION = AdmissionController("retrieval", ADMISSION_RETRIEVAL_CONCURRENCY, metrics=metrics)
+LLM_ADMISSION = AdmissionController("llm", ADMISSION_LLM_CONCURRENCY, metrics=metrics)
+# Single-flight coalescing of identical in-flight /generate and /search requests
+REQUEST_COALESCER = RequestCoalescer(metrics=metrics)
+# Server-side conversation history for clients using a session_id, see src/chat_sessions.py
+SESSION_STORE = get_session_store()
+# Per-request profiles of requests sent with the X-Profile header, see src/request_profiler.py
+REQUEST_PROFILER = RequestProfiler()
 
 class Message(BaseModel):
     """Definition of the Chat Message type."""
@@ -146,6 +178,12 @@ class Prompt(BaseModel):
         "A message with the the system role is optional, and must be the very first message if it is present.",
         max_items=50000,
     )
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Id of a chat session created with POST /sessions. "
+        "The server keeps the conversation history of a session, so messages only has to contain the new messages.",
+        max_length=64,
+    )
     use_knowledge_base: bool = Field(default=True, description="Whether to use a knowledge base")
     temperature: float = Field(
         default_temperature,
@@ -203,6 +241,12 @@ class Prompt(BaseModel):
         max_length=4096,
         pattern=r'[\s\S]*',
     )
+    document_names: Optional[List[constr(max_length=4096)]] = Field(
+        description="Restrict retrieval to these documents of the collection, e.g. the course items a user selected. "
+        "The whole collection is searched when not given, nothing when the list is empty.",
+        default=None,
+        max_items=10000,
+    )
     enable_query_rewriting: bool = Field(
         description="Enable or disable query rewriting.",
         default=os.getenv("ENABLE_QUERYREWRITER", "False").lower() in ["true", "True"],
@@ -215,6 +259,11 @@ class Prompt(BaseModel):
         description="Enable or disable guardrailing of queries/responses.",
         default=os.getenv("ENABLE_GUARDRAILS", "False").lower() in ["true", "True"],
     )
+    enable_adaptive_retrieval: bool = Field(
+        description="Pick the number of reranked candidates from the vector search scores, "
+        "skipping the reranker for confident queries and widening vdb_top_k for ambiguous ones.",
+        default=os.getenv("ENABLE_ADAPTIVE_RETRIEVAL", "False").lower() in ["true", "True"],
+    )
     enable_citations: bool = Field(
         description="Enable or disable citations as part of response.",
         default=os.getenv("ENABLE_CITATIONS", "True").lower() in ["true", "True"],
@@ -459,6 +508,18 @@ class ChainResponse(BaseModel):
     citations: Optional[Citations] = Field(default=Citations(), description="Source documents used for the response")
 
 
+class ChatSessionResponse(BaseModel):
+    """Definition of a created chat session."""
+    session_id: str = Field(description="Id to pass as session_id to /generate.")
+    ttl: int = Field(description="Seconds after its last turn when the session expires, 0 if it never expires.")
+
+
+class ChatSessionHistory(BaseModel):
+    """Definition of the conversation history of a chat session."""
+    session_id: str
+    messages: List[Message] = Field(default_factory=list)
+
+
 class DocumentSearch(BaseModel):
     """Definition of the DocumentSearch API data type."""
 
@@ -497,6 +558,12 @@ class DocumentSearch(BaseModel):
         max_length=4096,
         pattern=r'[\s\S]*',
     )
+    document_names: Optional[List[constr(max_length=4096)]] = Field(
+        description="Restrict retrieval to these documents of the collection, e.g. the course items a user selected. "
+        "The whole collection is searched when not given, nothing when the list is empty.",
+        default=None,
+        max_items=10000,
+    )
     messages: List[Message] = Field(
         ...,
         description="A list of messages comprising the conversation so far. "
@@ -569,10 +636,57 @@ class NIMServiceHealthInfo(BaseServiceHealthInfo):
 class HealthResponse(BaseModel):
     """Overall health response with specialized fields for each service type"""
     message: str = Field(max_length=4096, pattern=r'[\s\S]*', default="Service is up.")
+    ready: bool = Field(default=True, description="False while model clients and the vector store are still warming up.")
     databases: List[DatabaseHealthInfo] = Field(default_factory=list)
     object_storage: List[StorageHealthInfo] = Field(default_factory=list)
     nim: List[NIMServiceHealthInfo] = Field(default_factory=list)  # Unified category for NIM services
 
+@app.on_event("startup")
+async def start_warm_up() -> None:
+    """Preconnect to model endpoints and the vector store without delaying server startup"""
+    global WARMUP_TASK  # pylint: disable=global-statement
+    WARMUP_TASK = asyncio.create_task(asyncio.to_thread(warm_up))
+    HEALTH_MONITOR.start()
+
+
+@app.on_event("shutdown")
+async def stop_health_monitor() -> None:
+    await HEALTH_MONITOR.stop()
+
+
+def unavailable_dependencies(
+        use_knowledge_base: bool,
+        vdb_endpoint: str,
+        llm_endpoint: Optional[str] = None
+    ) -> List[str]:
+    """
+    Dependencies needed by a request whose circuit is open. Only the configured
+    endpoints are monitored, so requests overriding an endpoint are not short-circuited.
+    """
+    names = []
+    if llm_endpoint is not None and llm_endpoint == settings.llm.server_url:
+        names.append("LLM")
+    if use_knowledge_base and vdb_endpoint == settings.vector_store.url:
+        names.append("Milvus")
+    return HEALTH_MONITOR.open_circuits(names)
+
+
+def retry_after_seconds(dependencies: List[str]) -> str:
+    return str(max(get_circuit_breaker(name).retry_after() for name in dependencies))
+
+
+def admission_rejected_response(e: AdmissionRejected, streaming: bool = True):
+    """429/503 response with Retry-After for a request rejected by admission control"""
+    headers = {"Retry-After": str(e.retry_after)}
+    message = "Server is busy, please retry later."
+    if streaming:
+        return StreamingResponse(error_response_generator(message),
+                                 media_type="text/event-stream",
+                                 status_code=e.status_code,
+                                 headers=headers)
+    return JSONResponse(content={"message": message}, status_code=e.status_code, headers=headers)
+
+
 @app.exception_handler(RequestValidationError)
 async def request_validation_exception_handler(_: Request, exc: RequestValidationError) -> JSONResponse:
     return JSONResponse(
@@ -650,13 +764,12 @@ async def health_check(check_dependencies: bool = False):
     logger.info("Checking service health...")
     
     # Initialize with default response
-    response = HealthResponse(message=response_message)
+    response = HealthResponse(message=response_message, ready=WARMUP_TASK is not None and WARMUP_TASK.done())
     
     # Only perform detailed service checks if requested
     if check_dependencies:
         try:
-            health_results = await check_all_services_health()
-            print_health_report(health_results)
+            health_results = await HEALTH_MONITOR.get_results()
             
             # Process databases
             if "databases" in health_results:
@@ -702,6 +815,7 @@ def prepare_citations(
     Returns:
         - source_results: Citations
     """
+    start_time = time.time()
     citations = list()
 
     if force_citations or enable_citations:
@@ -761,6 +875,9 @@ def prepare_citations(
                 )
                 citations.append(source_result)
 
+    if metrics:
+        # Mostly MinIO round trips for image, table and chart thumbnails
+        metrics.record_stage_latency("citations", time.time() - start_time, collection=collection_name)
     return Citations(
         total_results=len(citations),
         results=citations
@@ -798,7 +915,26 @@ async def generate_answer(request: Request, prompt: Prompt) -> StreamingResponse
 
     if metrics:
         metrics.update_api_requests(method=request.method, endpoint=request.url.path)
+
+    failing = unavailable_dependencies(prompt.use_knowledge_base, prompt.vdb_endpoint, prompt.llm_endpoint)
+    if failing:
+        logger.warning("Rejecting /generate request, unavailable dependencies: %s", failing)
+        return StreamingResponse(error_response_generator(f"Service temporarily unavailable: {', '.join(failing)} is down."),
+                                 media_type="text/event-stream",
+                                 status_code=503,
+                                 headers={"Retry-After": retry_after_seconds(failing)})
+    # Optional X-Request-Priority header (high, normal, low) orders the admission queues
+    priority = parse_priority(request.headers.get("X-Request-Priority"))
+    profile_id = REQUEST_PROFILER.requested(request.headers, request.query_params)
+    release_llm_slot = None
     try:
+        session_history = []
+        if prompt.session_id:
+            session_history = await asyncio.to_thread(SESSION_STORE.history, prompt.session_id)
+            if session_history is None:
+                return StreamingResponse(error_response_generator("Chat session not found or expired."),
+                                         media_type="text/event-stream",
+                                         status_code=404)
         chat_history = prompt.messages
         collection_name = prompt.collection_name
         
@@ -814,22 +950,27 @@ async def generate_answer(request: Request, prompt: Prompt) -> StreamingResponse
             last_user_message = escape_json_content(last_user_message)
 
         # Process chat history and escape JSON-like structures
-        processed_chat_history = []
+        # Session messages were sanitized and escaped when they were stored
+        processed_chat_history = [
+            Message.model_construct(role=message.role, content=message.content) for message in session_history
+        ]
+        new_session_messages = []
         for message in chat_history:
+            new_session_messages.append(SessionMessage(role=message.role, content=escape_json_content(message.content)))
             if message.role == 'user':
                 # Skip the last user message as it's handled separately
                 continue
             # Create new Message with escaped content
-            processed_message = Message(
+            processed_message = Message.model_construct(
                 role=message.role,
-                content=escape_json_content(message.content)
+                content=new_session_messages[-1].content
             )
             processed_chat_history.append(processed_message)
 
         # All the other information from the prompt like the temperature, top_p etc., are llm_settings
         kwargs = {
             key: value
-            for key, value in vars(prompt).items() if key not in ['messages', 'use_knowledge_base', 'collection_name', 'vdb_top_k', 'reranker_top_k']
+            for key, value in vars(prompt).items() if key not in ['messages', 'session_id', 'use_knowledge_base', 'collection_name', 'vdb_top_k', 'reranker_top_k']
         }
 
         # pass the persona from the Prompt object into the chain settings
@@ -837,21 +978,54 @@ async def generate_answer(request: Request, prompt: Prompt) -> StreamingResponse
         kwargs["persona"] = prompt.persona
         
         # pylint: disable=unreachable
-        generator = None
-        # call rag_chain if use_knowledge_base is enabled
-        # Initialize contexts variable before branching
-        contexts = list()
-
-        if prompt.use_knowledge_base:
-            logger.info("Knowledge base is enabled. Using rag chain for response generation.")
-            generator, contexts = UNSTRUCTURED_RAG.rag_chain(query=last_user_message,
-                                          chat_history=processed_chat_history,
-                                          reranker_top_k=prompt.reranker_top_k,
-                                          vdb_top_k=prompt.vdb_top_k,
-                                          collection_name=collection_name,
-                                          **kwargs)
+        async def start_pipeline():
+            """Retrieval, reranking and LLM admission, returns the token stream, contexts and the LLM slot release"""
+            generator, contexts = None, list()
+            if prompt.use_knowledge_base:
+                logger.info("Knowledge base is enabled. Using rag chain for response generation.")
+                # Retrieval and reranking run eagerly inside rag_chain, keep them off the event loop
+                async with await RETRIEVAL_ADMISSION.acquire(priority):
+                    generator, contexts = await asyncio.to_thread(
+                                              REQUEST_PROFILER.wrap(UNSTRUCTURED_RAG.rag_chain, profile_id,
+                                                                    "rag_chain", collection=collection_name),
+                                              query=last_user_message,
+                                              chat_history=processed_chat_history,
+                                              reranker_top_k=prompt.reranker_top_k,
+                                              vdb_top_k=prompt.vdb_top_k,
+                                              collection_name=collection_name,
+                                              **kwargs)
+            else:
+                generator = UNSTRUCTURED_RAG.llm_chain(query=last_user_message, chat_history=processed_chat_history, **kwargs)
+            # Tokens are generated lazily by whichever thread drains the stream, it is profiled too
+            generator = REQUEST_PROFILER.wrap_iterator(generator, profile_id, "generation", collection=collection_name)
+
+            # The LLM slot is held until the stream is exhausted or all subscribers left
+            slot = await LLM_ADMISSION.acquire(priority)
+            return generator, contexts, slot.release
+
+        background = None
+        # Followers of a coalesced request receive the leader's answer, only the leader stores the turn
+        is_leader = True
+        if REQUEST_COALESCER.enabled:
+            # Identical requests in flight share one pipeline execution and its token stream
+            # The session history length is part of the key, so that a session's turns are never mixed up.
+            # A profiled request never joins another request, its profile covers its own pipeline execution.
+            stream, is_leader = REQUEST_COALESCER.join_stream(
+                request_key("/generate", {**jsonable_encoder(prompt), "session_messages": len(session_history),
+                                          "profile_id": profile_id})
+            )
+            try:
+                if is_leader:
+                    # Runs apart from this request, the leader's client leaving doesn't fail the followers
+                    stream.lead(start_pipeline)
+                contexts = await stream.result()
+            except BaseException:
+                stream.leave()
+                raise
+            generator = stream.subscribe()
         else:
-            generator = UNSTRUCTURED_RAG.llm_chain(query=last_user_message, chat_history=processed_chat_history, **kwargs)
+            generator, contexts, release_llm_slot = await start_pipeline()
+            background = BackgroundTask(release_llm_slot)
 
         def response_generator():
             """Convert generator streaming response into `data: ChainResponse` format for chunk"""
@@ -862,7 +1036,9 @@ async def generate_answer(request: Request, prompt: Prompt) -> StreamingResponse
                     logger.debug("Generated response chunks\n")
                     # Create ChainResponse object for every token generated
                     first_chunk = True
+                    answer_chunks = []
                     for chunk in generator:
+                        answer_chunks.append(chunk)
                         # TODO: This is a hack to clear contexts if we get an error response from nemoguardrails
                         if chunk == "I'm sorry, I can't respond to that.":
                             # Clear contexts if we get an error response
@@ -903,6 +1079,11 @@ async def generate_answer(request: Request, prompt: Prompt) -> StreamingResponse
                     chain_response.object = "chat.completion.chunk"
                     chain_response.created = int(time.time())
                     logger.debug(response_choice)
+                    if prompt.session_id and is_leader:
+                        # Only completed turns are added to the session
+                        answer = escape_json_content(bleach.clean("".join(answer_chunks), strip=True))
+                        SESSION_STORE.append(prompt.session_id,
+                                             new_session_messages + [SessionMessage(role="assistant", content=answer)])
                     yield "data: " + str(chain_response.json()) + "\n\n"
                 else:
                     chain_response = ChainResponse()
@@ -911,14 +1092,28 @@ async def generate_answer(request: Request, prompt: Prompt) -> StreamingResponse
             except Exception as e:
                 logger.exception("Error from response generator in /generate endpoint. Error details: %s", e)
                 yield from error_response_generator(FALLBACK_EXCEPTION_MSG)
+            finally:
+                if hasattr(generator, "close"):
+                    generator.close()
+                if release_llm_slot:
+                    release_llm_slot()
         
-        return StreamingResponse(response_generator(), media_type="text/event-stream")
+        return StreamingResponse(response_generator(), media_type="text/event-stream",
+                                 headers={PROFILE_ID_HEADER: profile_id} if profile_id else None,
+                                 background=background)
         # pylint: enable=unreachable
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+
     except asyncio.CancelledError as e:
+        if release_llm_slot:
+            release_llm_slot()
         logger.warning(f"Request cancelled during response generation. {str(e)}")
         return JSONResponse(content={"message": "Request was cancelled by the client."}, status_code=499)
 
     except (MilvusException, MilvusUnavailableException) as e:
+        if isinstance(e, MilvusUnavailableException):
+            get_circuit_breaker("Milvus").record_failure()
         exception_msg = ("Error from milvus server. Please ensure you have ingested some documents. "
                          "Please check rag-server logs for more details.")
         logger.error(
@@ -930,6 +1125,8 @@ async def generate_answer(request: Request, prompt: Prompt) -> StreamingResponse
                                  status_code=500)
 
     except Exception as e:
+        if release_llm_slot:
+            release_llm_slot()
         logger.error("Error from /generate endpoint. Error details: %s", e)
         return StreamingResponse(error_response_generator(FALLBACK_EXCEPTION_MSG),
                                  media_type="text/event-stream",
@@ -960,6 +1157,75 @@ async def v1_chat_completions(request: Request, prompt: Prompt) -> StreamingResp
     return response
 
 
+@app.post(
+    "/sessions",
+    tags=["Session APIs"],
+    response_model=ChatSessionResponse,
+)
+async def create_chat_session() -> ChatSessionResponse:
+    """Create a chat session, pass its id as session_id to /generate and send only the new messages of each turn."""
+    session = await asyncio.to_thread(SESSION_STORE.create)
+    return ChatSessionResponse(session_id=session.session_id, ttl=CHAT_SESSION_TTL)
+
+
+@app.get(
+    "/sessions/{session_id}",
+    tags=["Session APIs"],
+    response_model=ChatSessionHistory,
+    responses={404: {"description": "Session not found or expired"}},
+)
+async def get_chat_session(session_id: str) -> ChatSessionHistory:
+    """Return the conversation history stored for a chat session."""
+    history = await asyncio.to_thread(SESSION_STORE.history, session_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired.")
+    messages = [
+        Message.model_construct(role=message.role, content=message.content.replace("{{", "{").replace("}}", "}"))
+        for message in history
+    ]
+    return ChatSessionHistory(session_id=session_id, messages=messages)
+
+
+@app.delete(
+    "/sessions/{session_id}",
+    tags=["Session APIs"],
+    responses={404: {"description": "Session not found or expired"}},
+)
+async def delete_chat_session(session_id: str) -> Dict[str, str]:
+    """Delete a chat session and its conversation history."""
+    if not await asyncio.to_thread(SESSION_STORE.delete, session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired.")
+    return {"message": "Chat session deleted."}
+
+
+@app.get(
+    "/admin/profiles",
+    tags=["Admin APIs"],
+    responses={404: {"description": "Profiling is disabled"}},
+)
+async def list_profiles() -> List[Dict[str, Any]]:
+    """List the buffered request profiles, newest first. Requires ENABLE_PROFILING=True."""
+    if not REQUEST_PROFILER.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+    return REQUEST_PROFILER.list()
+
+
+@app.get(
+    "/admin/profiles/{profile_id}",
+    tags=["Admin APIs"],
+    response_class=PlainTextResponse,
+    responses={404: {"description": "Profile not found or profiling is disabled"}},
+)
+async def get_profile(profile_id: str) -> PlainTextResponse:
+    """Download a request profile as folded stacks, e.g. for flamegraph.pl, inferno or speedscope."""
+    profile = REQUEST_PROFILER.get(profile_id) if REQUEST_PROFILER.enabled else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return PlainTextResponse(profile.folded(), headers={
+        "Content-Disposition": f'attachment; filename="{profile.name}-{profile_id}.folded"'
+    })
+
+
 @app.post(
     "/search",
     tags=["Retrieval APIs"],
@@ -992,6 +1258,13 @@ async def document_search(request: Request, data: DocumentSearch) -> Dict[str, L
 
     if metrics:
         metrics.update_api_requests(method=request.method, endpoint=request.url.path)
+
+    failing = unavailable_dependencies(True, data.vdb_endpoint)
+    if failing:
+        logger.warning("Rejecting /search request, unavailable dependencies: %s", failing)
+        return JSONResponse(content={"message": f"Service temporarily unavailable: {', '.join(failing)} is down."},
+                            status_code=503,
+                            headers={"Retry-After": retry_after_seconds(failing)})
     try:
         if hasattr(UNSTRUCTURED_RAG, "document_search") and callable(UNSTRUCTURED_RAG.document_search):
 
@@ -999,15 +1272,24 @@ async def document_search(request: Request, data: DocumentSearch) -> Dict[str, L
             excluded_keys = {"query", "reranker_top_k", "vdb_top_k", "collection_name", "messages"}
             kwargs = {key: value for key, value in vars(data).items() if key not in excluded_keys}
 
-            docs = UNSTRUCTURED_RAG.document_search(content=data.query, messages=data.messages, reranker_top_k=data.reranker_top_k, vdb_top_k=data.vdb_top_k, collection_name=data.collection_name, **kwargs)
-            citations = prepare_citations(
-                collection_name=data.collection_name,
-                retrieved_documents=docs,
-                force_citations=True
-            )
+            priority = parse_priority(request.headers.get("X-Request-Priority"))
+
+            async def search() -> Citations:
+                async with await RETRIEVAL_ADMISSION.acquire(priority):
+                    docs = await asyncio.to_thread(UNSTRUCTURED_RAG.document_search, content=data.query, messages=data.messages, reranker_top_k=data.reranker_top_k, vdb_top_k=data.vdb_top_k, collection_name=data.collection_name, **kwargs)
+                return prepare_citations(
+                    collection_name=data.collection_name,
+                    retrieved_documents=docs,
+                    force_citations=True
+                )
+
+            # Identical searches in flight share one retrieval
+            citations = await REQUEST_COALESCER.run(request_key("/search", jsonable_encoder(data)), search)
             return citations
         raise NotImplementedError("UnstructuredRAG class has not implemented the document_search method.")
 
+    except AdmissionRejected as e:
+        return admission_rejected_response(e, streaming=False)
     except asyncio.CancelledError as e:
         logger.warning(f"Request cancelled during document search. {str(e)}")
         return JSONResponse(content={"message": "Request was cancelled by the client."}, status_code=499)
@@ -19,10 +19,9 @@ from typing import Any
 from opentelemetry import trace
 from opentelemetry import metrics
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
-from opentelemetry.sdk.trace import TracerProvider, Span
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace import Span
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter
 from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
 from opentelemetry.exporter.prometheus import PrometheusMetricReader
@@ -30,6 +29,7 @@ from opentelemetry.sdk.metrics import MeterProvider
 from opentelemetry.processor.baggage import BaggageSpanProcessor, ALLOW_ALL_BAGGAGE_KEYS
 from .observability.langchain_instrumentor import LangchainInstrumentor
 from .observability.otel_metrics import OtelMetrics
+from .observability.sampling import create_tracer_provider
 from opentelemetry.instrumentation.milvus import MilvusInstrumentor
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from fastapi import FastAPI
@@ -74,7 +74,6 @@ def instrument(app: FastAPI, settings):
         otel_metrics = OtelMetrics(service_name="rag")
 
         # Oberservability Tracing
-        trace.set_tracer_provider(TracerProvider(resource=resource))
         exporter_http = None
         if settings.tracing.otlp_http_endpoint != "":
             logger.debug(
@@ -86,11 +85,11 @@ def instrument(app: FastAPI, settings):
         else:
             logger.debug(f"configuring console exporter {settings.tracing}")
             exporter_http = ConsoleSpanExporter()
-        span_processor = BatchSpanProcessor(exporter_http)
+        # Sampled, size limited and exported in batches, see observability/sampling.py
+        trace.set_tracer_provider(create_tracer_provider(resource, exporter_http))
         trace.get_tracer_provider().add_span_processor(
             BaggageSpanProcessor(ALLOW_ALL_BAGGAGE_KEYS)
         )
-        trace.get_tracer_provider().add_span_processor(span_processor)
         LangchainInstrumentor().instrument(tracer_provider=trace.get_tracer_provider(), metrics=otel_metrics)
         MilvusInstrumentor().instrument(tracer_provider=trace.get_tracer_provider())
         FastAPIInstrumentor().instrument_app(
@@ -13,8 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Utility functions used across different modules of the RAG."""
+import json
 import logging
 import os
+import signal
+import threading
 from functools import lru_cache
 from functools import wraps
 from pathlib import Path
@@ -26,7 +29,6 @@ from typing import Any
 from typing import Optional
 from urllib.parse import urlparse
 
-import requests
 import yaml
 import math
 import aiohttp
@@ -35,11 +37,6 @@ import time
 
 logger = logging.getLogger(__name__)
 
-try:
-    import torch
-except Exception:
-    logger.warning("Optional module torch not installed.")
-
 try:
     from langchain.text_splitter import RecursiveCharacterTextSplitter  # pylint: disable=no-name-in-module
 except Exception:
@@ -62,12 +59,6 @@ try:
 except Exception:
     logger.warning("Optional langchain_openai module not installed.")
 
-try:
-    from langchain_community.docstore.in_memory import InMemoryDocstore
-    from langchain_community.embeddings import HuggingFaceEmbeddings
-except Exception:
-    logger.warning("Optional Langchain module langchain_community not installed.")
-
 try:
     from langchain_milvus import Milvus, BM25BuiltInFunction
 except Exception:
@@ -87,6 +78,7 @@ except Exception:
     logger.warning("Optional nv_ingest_client module not installed.")
 
 from src.minio_operator import MinioOperator
+from .health_monitor import get_circuit_breaker
 from . import configuration  # noqa: E402
 
 if TYPE_CHECKING:
@@ -141,9 +133,16 @@ def utils_cache(func: Callable) -> Callable:
     return wrapper
 
 
-# @lru_cache
-def get_config() -> "ConfigWizard":
-    """Parse the application configuration."""
+# Seconds between mtime checks of APP_CONFIG_FILE, 0 disables the file watcher (SIGHUP still reloads)
+CONFIG_RELOAD_INTERVAL = float(os.getenv("CONFIG_RELOAD_INTERVAL", 0))
+
+_CONFIG: Optional["ConfigWizard"] = None
+_CONFIG_LOCK = threading.Lock()
+_CONFIG_WATCHER: Optional[threading.Thread] = None
+
+
+def _load_config() -> "ConfigWizard":
+    """Parse the application configuration file and environment overrides."""
     config_file = os.environ.get("APP_CONFIG_FILE", "/dev/null")
     config = configuration.AppConfig.from_file(config_file)
     if config:
@@ -151,6 +150,90 @@ def get_config() -> "ConfigWizard":
     raise RuntimeError("Unable to find configuration.")
 
 
+def get_config() -> "ConfigWizard":
+    """
+    Return the current application configuration snapshot.
+    The snapshot is a frozen dataclass parsed once and shared by all callers,
+    so per-request lookups never touch the filesystem.
+    """
+    config = _CONFIG
+    if config is None:
+        with _CONFIG_LOCK:
+            if _CONFIG is None:
+                _set_config(_load_config())
+            config = _CONFIG
+    return config
+
+
+def _set_config(config: "ConfigWizard") -> None:
+    global _CONFIG  # pylint: disable=global-statement
+    # Rebinding the module reference is atomic, readers see either the old or the new snapshot
+    _CONFIG = config
+
+
+def reload_config() -> "ConfigWizard":
+    """
+    Re-parse the configuration and atomically swap in the new snapshot.
+    On a parse failure the previous snapshot is kept.
+
+    Returns:
+        - ConfigWizard - The snapshot in effect after the reload
+    """
+    with _CONFIG_LOCK:
+        try:
+            _set_config(_load_config())
+            logger.info("Reloaded application configuration from %s", os.environ.get("APP_CONFIG_FILE", "/dev/null"))
+        except Exception as e:
+            logger.error("Failed to reload application configuration, keeping previous one: %s", e)
+        return _CONFIG
+
+
+def _config_file_mtime() -> Optional[float]:
+    try:
+        return os.stat(os.environ.get("APP_CONFIG_FILE", "/dev/null")).st_mtime
+    except OSError:
+        return None
+
+
+def _watch_config_file(interval: float) -> None:
+    last_mtime = _config_file_mtime()
+    while True:
+        time.sleep(interval)
+        mtime = _config_file_mtime()
+        if mtime is not None and mtime != last_mtime:
+            last_mtime = mtime
+            reload_config()
+
+
+def enable_config_hot_reload(interval: float = CONFIG_RELOAD_INTERVAL) -> None:
+    """
+    Reload the configuration on SIGHUP and, if interval > 0, whenever APP_CONFIG_FILE changes.
+    Modules which captured the config at import time keep their original values.
+
+    Arguments:
+        - interval: float - Seconds between checks of the config file modification time
+    """
+    global _CONFIG_WATCHER  # pylint: disable=global-statement
+    try:
+        # Parse off the signal handler, it only schedules the reload
+        signal.signal(
+            signal.SIGHUP,
+            lambda signum, frame: threading.Thread(target=reload_config, daemon=True).start()
+        )
+    except (ValueError, AttributeError):
+        # Not on the main thread or SIGHUP not available on this platform
+        logger.debug("SIGHUP config reload not available in this process")
+
+    with _CONFIG_LOCK:
+        if interval > 0 and _CONFIG_WATCHER is None:
+            _CONFIG_WATCHER = threading.Thread(
+                target=_watch_config_file, args=(interval,), name="config-watcher", daemon=True
+            )
+            _CONFIG_WATCHER.start()
+            logger.info("Watching %s for configuration changes every %ss",
+                        os.environ.get("APP_CONFIG_FILE", "/dev/null"), interval)
+
+
 @lru_cache
 def get_prompts() -> Dict:
     """Retrieves prompt configurations from YAML file and return a dict.
@@ -419,16 +502,21 @@ def delete_collections(vdb_endpoint: str, collection_names: List[str]) -> dict:
             "total_failed": len(collection_names)
         }
 
-@utils_cache
-@lru_cache()
-def get_llm(**kwargs) -> LLM | SimpleChatModel:
-    """Create the LLM connection."""
+# Number of distinct (endpoint, model, guardrails) LLM clients kept alive, least recently used are evicted
+LLM_CLIENT_CACHE_SIZE = int(os.getenv("LLM_CLIENT_CACHE_SIZE", 16))
+# Sampling parameters which are bound per call instead of baked into a client
+LLM_SAMPLING_PARAMS = ("temperature", "top_p", "max_tokens", "stop")
+
+
+@lru_cache(maxsize=LLM_CLIENT_CACHE_SIZE)
+def get_llm_client(model: str, llm_endpoint: str = "", enable_guardrails: bool = False) -> LLM | SimpleChatModel:
+    """
+    Create the LLM connection for an endpoint and model. Clients hold the HTTP connection
+    pool, so they are shared by all requests and carry no sampling parameters.
+    """
     settings = get_config()
-    
-    # Check if guardrails are enabled
-    enable_guardrails = os.getenv("ENABLE_GUARDRAILS", "False").lower() == "true" and kwargs.get('enable_guardrails', False) == True
 
-    logger.info("Using %s as model engine for llm. Model name: %s", settings.llm.model_engine, kwargs.get('model'))
+    logger.info("Using %s as model engine for llm. Model name: %s", settings.llm.model_engine, model)
     if settings.llm.model_engine == "nvidia-ai-endpoints":
 
         # Use ChatOpenAI with guardrails if enabled
@@ -439,63 +527,78 @@ def get_llm(**kwargs) -> LLM | SimpleChatModel:
             if not guardrails_url:
                 logger.warning("NEMO_GUARDRAILS_URL not set, falling back to default implementation")
             else:
-                try:
-                    # Parse URL and add scheme if missing
-                    if not guardrails_url.startswith(('http://', 'https://')):
-                        guardrails_url = 'http://' + guardrails_url
-                        
-                    # Try to connect with a timeout of 5 seconds
-                    response = requests.get(guardrails_url + "/v1/health", timeout=5)
-                    response.raise_for_status()
-                    
-                    x_model_authorization = {"X-Model-Authorization": os.environ.get("NVIDIA_API_KEY", "")}
-                    return ChatOpenAI(
-                        model_name=kwargs.get('model'),
-                        openai_api_base=f"{guardrails_url}/v1/guardrail",
-                        openai_api_key="dummy-value", 
-                        default_headers=x_model_authorization,
-                        temperature=kwargs.get('temperature', None),
-                        top_p=kwargs.get('top_p', None),
-                        max_tokens=kwargs.get('max_tokens', None)
-                    )
-                except (requests.RequestException, requests.ConnectionError) as e:
-                    error_msg = f"Failed to connect to guardrails service at {guardrails_url}: {str(e)} Make sure the guardrails service is running and accessible."
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
+                # Parse URL and add scheme if missing
+                if not guardrails_url.startswith(('http://', 'https://')):
+                    guardrails_url = 'http://' + guardrails_url
+
+                x_model_authorization = {"X-Model-Authorization": os.environ.get("NVIDIA_API_KEY", "")}
+                return ChatOpenAI(
+                    model_name=model,
+                    openai_api_base=f"{guardrails_url}/v1/guardrail",
+                    openai_api_key="dummy-value", 
+                    default_headers=x_model_authorization,
+                )
         
-        if kwargs.get('llm_endpoint') and kwargs.get('llm_endpoint') != '""':
-            logger.info(f"Length of string {len(kwargs.get('llm_endpoint'))}")
-            logger.info("Using llm model %s hosted at %s", kwargs.get('model'), kwargs.get('llm_endpoint'))
-            return ChatNVIDIA(base_url=f"http://{kwargs.get('llm_endpoint')}/v1",
-                              model=kwargs.get('model'),
-                              temperature=kwargs.get('temperature', None),
-                              top_p=kwargs.get('top_p', None),
-                              max_tokens=kwargs.get('max_tokens', None))
-
-        logger.info("Using llm model %s from api catalog", kwargs.get('model'))
-        return ChatNVIDIA(model=kwargs.get('model'),
-                          temperature=kwargs.get('temperature', None),
-                          top_p=kwargs.get('top_p', None),
-                          max_tokens=kwargs.get('max_tokens', None))
+        if llm_endpoint and llm_endpoint != '""':
+            logger.info("Using llm model %s hosted at %s", model, llm_endpoint)
+            return ChatNVIDIA(base_url=f"http://{llm_endpoint}/v1", model=model)
+
+        logger.info("Using llm model %s from api catalog", model)
+        return ChatNVIDIA(model=model)
 
     raise RuntimeError(
         "Unable to find any supported Large Language Model server. Supported engine name is nvidia-ai-endpoints.")
 
 
+def get_llm(**kwargs) -> LLM | SimpleChatModel:
+    """
+    Get the pooled LLM client for the requested endpoint and model with the
+    sampling parameters (temperature, top_p, max_tokens, stop) bound to it.
+    """
+    # Check if guardrails are enabled
+    enable_guardrails = os.getenv("ENABLE_GUARDRAILS", "False").lower() == "true" and kwargs.get('enable_guardrails', False) == True
+    if enable_guardrails and os.getenv("NEMO_GUARDRAILS_URL", ""):
+        # Guardrails health is probed by the background health monitor, fail fast
+        # here instead of blocking on a health request.
+        guardrails_breaker = get_circuit_breaker("NemoGuardrails")
+        if not guardrails_breaker.allow():
+            error_msg = (f"Guardrails service at {os.getenv('NEMO_GUARDRAILS_URL')} is unavailable, retry in "
+                         f"{guardrails_breaker.retry_after()}s. Make sure the guardrails service is running and accessible.")
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+    client = get_llm_client(
+        model=kwargs.get('model'),
+        llm_endpoint=kwargs.get('llm_endpoint') or "",
+        enable_guardrails=enable_guardrails,
+    )
+    sampling_params = {key: kwargs[key] for key in LLM_SAMPLING_PARAMS if kwargs.get(key) not in (None, [])}
+    return client.bind(**sampling_params) if sampling_params else client
+
+
+def run_config(run_name: str, collection_name: str = "", **kwargs) -> Dict[str, Any]:
+    """Runnable config naming a run, its metadata carries the collection and model metric labels."""
+    return {"run_name": run_name, "metadata": {"collection": collection_name, "model": kwargs.get("model")}}
+
+
 @lru_cache
 def get_embedding_model(model: str, url: str) -> Embeddings:
     """Create the embedding model."""
-    model_kwargs = {"device": "cpu"}
-    if torch.cuda.is_available():
-        model_kwargs["device"] = "cuda:0"
-
-    encode_kwargs = {"normalize_embeddings": False}
     settings = get_config()
 
     logger.info("Using %s as model engine and %s and model for embeddings",
                 settings.embeddings.model_engine,
                 model)
     if settings.embeddings.model_engine == "huggingface":
+        # torch and sentence-transformers are only needed for local embeddings,
+        # importing them lazily keeps them out of the NIM based startup path.
+        import torch
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        model_kwargs = {"device": "cpu"}
+        if torch.cuda.is_available():
+            model_kwargs["device"] = "cuda:0"
+        encode_kwargs = {"normalize_embeddings": False}
         hf_embeddings = HuggingFaceEmbeddings(
             model_name=settings.embeddings.model_name,
             model_kwargs=model_kwargs,
@@ -601,6 +704,25 @@ def del_docs_vectorstore_langchain(vectorstore: VectorStore, filenames: List[str
         return False
 
 
+def document_filter_expr(document_names: Optional[List[str]]) -> str:
+    """Milvus filter expression restricting a search to the chunks of the given documents.
+
+    Chunks are matched by their source_name, the path of the uploaded file for NV-Ingest and
+    the file name for documents ingested through langchain. Returns "" without a restriction
+    (None) and an expression matching no chunk for an empty list, i.e. nothing was selected.
+    """
+    if document_names is None:
+        return ""
+    if not document_names:
+        return 'source["source_name"] == "" and source["source_name"] != ""'
+    upload_folder = "/tmp-data/uploaded_files"
+    sources = []
+    for document_name in document_names:
+        sources += [document_name, os.path.join(upload_folder, document_name)]
+    # JSON string literals are valid Milvus string literals, quotes in names are escaped
+    return f'source["source_name"] in {json.dumps(sources)}'
+
+
 def _combine_dicts(dict_a, dict_b):
     """Combines two dictionaries recursively, prioritizing values from dict_b.
 
@@ -1000,13 +1122,15 @@ async def check_minio_health(endpoint: str, access_key: str, secret_key: str) ->
         
     try:
         start_time = time.time()
-        minio_operator = MinioOperator(
+        # The minio client is blocking, keep it off the event loop
+        minio_operator = await asyncio.to_thread(
+            MinioOperator,
             endpoint=endpoint,
             access_key=access_key,
             secret_key=secret_key
         )
         # Test basic operation - list buckets
-        buckets = minio_operator.client.list_buckets()
+        buckets = await asyncio.to_thread(minio_operator.client.list_buckets)
         status["status"] = "healthy"
         status["latency_ms"] = round((time.time() - start_time) * 1000, 2)
         status["buckets"] = len(buckets)
@@ -1035,18 +1159,21 @@ async def check_milvus_health(url: str) -> Dict[str, Any]:
         parsed_url = urlparse(url)
         connection_alias = f"health_check_{parsed_url.hostname}_{parsed_url.port}_{int(time.time())}"
         
-        # Connect to Milvus
-        connections.connect(
-            connection_alias, 
-            host=parsed_url.hostname, 
-            port=parsed_url.port
-        )
-        
-        # Test basic operation - list collections
-        collections = utility.list_collections(using=connection_alias)
-        
-        # Disconnect
-        connections.disconnect(connection_alias)
+        def list_collections() -> List[str]:
+            # Connect to Milvus
+            connections.connect(
+                connection_alias, 
+                host=parsed_url.hostname, 
+                port=parsed_url.port
+            )
+            try:
+                # Test basic operation - list collections
+                return utility.list_collections(using=connection_alias)
+            finally:
+                connections.disconnect(connection_alias)
+
+        # pymilvus is blocking, keep it off the event loop
+        collections = await asyncio.to_thread(list_collections)
         
         status["status"] = "healthy"
         status["latency_ms"] = round((time.time() - start_time) * 1000, 2)
@@ -1224,8 +1351,8 @@ async def check_all_services_health() -> Dict[str, List[Dict[str, Any]]]:
             })
     
     # Execute all health checks concurrently
-    for category, task in tasks:
-        result = await task
+    task_results = await asyncio.gather(*(task for _, task in tasks))
+    for (category, _), result in zip(tasks, task_results):
         results[category].append(result)
     
     return results